@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'task', 'status', 'priority', 'run_at', 'attempts',
+        'locked_by',
+    )
+    list_filter = ('status',)
+    search_fields = ('task', 'key')
+    readonly_fields = ('created', 'finished', 'locked_at', 'last_error')
+
+
+admin.site.register(Job, JobAdmin)
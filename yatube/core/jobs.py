@@ -0,0 +1,251 @@
+"""Простая очередь фоновых задач поверх таблицы `core_job`.
+
+Задача — обычная функция, помеченная декоратором `task`:
+
+    @task
+    def send_email(subject, body, recipient_list):
+        ...
+
+    enqueue(send_email, args=('Тема', 'Текст', ['a@b.c']))
+
+Задачи выполняет `python manage.py run_worker`. Пока задача
+выполняется, обработчик раз в `JOB_HEARTBEAT_INTERVAL` секунд обновляет
+её `locked_at`; задачи, не отмечавшиеся дольше `JOB_LOCK_TIMEOUT`,
+другие обработчики возвращают в очередь.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import (IntegrityError, OperationalError, connection,
+                       transaction)
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 10
+
+
+def task(func):
+    func.is_task = True
+    func.task_name = f'{func.__module__}.{func.__name__}'
+    return func
+
+
+def enqueue(func, args=(), kwargs=None, priority=0, delay=None,
+            run_at=None, key='', max_attempts=None):
+    """Ставит задачу в очередь и сразу возвращает управление.
+
+    Если передан `key` и задача с таким ключом ещё ждёт в очереди,
+    новая не создаётся — так схлопываются частые одинаковые задачи.
+    Уникальность ключа среди ждущих задач держит база, поэтому и при
+    одновременной постановке в очереди окажется одна задача.
+    """
+    if not getattr(func, 'is_task', False):
+        raise ValueError(f'{func!r} не помечена декоратором @task')
+    if run_at is None:
+        run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+    while True:
+        if key:
+            queued = Job.objects.filter(key=key, status=Job.QUEUED).first()
+            if queued is not None:
+                return queued
+        try:
+            with transaction.atomic():
+                return Job.objects.create(
+                    task=func.task_name,
+                    payload=json.dumps(
+                        {'args': list(args), 'kwargs': kwargs or {}}
+                    ),
+                    key=key,
+                    priority=priority,
+                    run_at=run_at,
+                    max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+                )
+        except IntegrityError:
+            # Такую же задачу только что поставил другой процесс; её
+            # могли уже и захватить — тогда пробуем поставить снова.
+            if not key:
+                raise
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_job(worker_name):
+    """Захватывает одну готовую к запуску задачу.
+
+    На PostgreSQL используется `SELECT ... FOR UPDATE SKIP LOCKED`.
+    SQLite так не умеет, поэтому там задача захватывается условным
+    `UPDATE ... WHERE status = 'queued'`: из нескольких обработчиков
+    строку обновит только один.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.QUEUED,
+        run_at__lte=now
+    ).order_by('-priority', 'run_at', 'pk')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = candidates.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = Job.RUNNING
+            job.locked_by = worker_name
+            job.locked_at = now
+            job.attempts += 1
+            job.save(update_fields=(
+                'status', 'locked_by', 'locked_at', 'attempts'
+            ))
+            return job
+    for pk in candidates.values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker_name,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def retry_delay(attempts):
+    return min(
+        settings.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_DELAY
+    )
+
+
+class Heartbeat(threading.Thread):
+    """Пока задача выполняется, обновляет её `locked_at`."""
+
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                try:
+                    Job.objects.filter(
+                        pk=self.job.pk,
+                        status=Job.RUNNING,
+                        locked_by=self.job.locked_by
+                    ).update(locked_at=timezone.now())
+                except OperationalError:
+                    # База занята записью самой задачи; отметимся
+                    # на следующем такте.
+                    logger.warning('Задача %s не отметилась', self.job)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _finish(job, **fields):
+    """Записывает итог, если задачу не забрал другой обработчик."""
+    fields['locked_by'] = ''
+    try:
+        with transaction.atomic():
+            finished = Job.objects.filter(
+                pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+            ).update(**fields)
+    except IntegrityError:
+        # Повтор не встанет в очередь: там уже ждёт задача с тем же
+        # ключом, она и сделает ту же работу.
+        fields.update(status=Job.FAILED, finished=timezone.now())
+        finished = Job.objects.filter(
+            pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+        ).update(**fields)
+    if not finished:
+        logger.warning('Задачу %s уже вернули в очередь', job)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return job
+
+
+def run_job(job):
+    heartbeat = Heartbeat(job)
+    heartbeat.start()
+    try:
+        func = import_string(job.task)
+        if not getattr(func, 'is_task', False):
+            raise ValueError(f'{job.task} не помечена декоратором @task')
+        payload = json.loads(job.payload)
+        func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        heartbeat.stop()
+        last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.exception('Задача %s окончательно упала', job)
+            return _finish(
+                job, status=Job.FAILED, finished=timezone.now(),
+                last_error=last_error
+            )
+        logger.warning('Задача %s упала, повторим позже', job)
+        return _finish(
+            job, status=Job.QUEUED, last_error=last_error,
+            run_at=timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+        )
+    heartbeat.stop()
+    return _finish(job, status=Job.DONE, finished=timezone.now())
+
+
+def requeue_stale_jobs():
+    """Возвращает в очередь задачи, обработчик которых перестал отмечаться."""
+    stale = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    requeued = 0
+    for job in Job.objects.filter(status=Job.RUNNING, locked_at__lt=stale):
+        logger.warning('Задача %s брошена обработчиком %s', job, job.locked_by)
+        requeued += _finish(job, status=Job.QUEUED).status == Job.QUEUED
+    return requeued
+
+
+def work(worker_name=None, burst=False, sleep=1.0, should_stop=None):
+    """Выполняет задачи, пока не попросят остановиться.
+
+    С `burst=True` возвращается, как только очередь опустеет.
+    """
+    worker_name = worker_name or default_worker_name()
+    should_stop = should_stop or (lambda: False)
+    processed = 0
+    checked = None
+    while not should_stop():
+        try:
+            if (checked is None or time.monotonic() - checked
+                    >= settings.JOB_HEARTBEAT_INTERVAL):
+                requeue_stale_jobs()
+                checked = time.monotonic()
+            job = claim_job(worker_name)
+        except OperationalError:
+            # SQLite отвечает «database is locked», пока пишет другой
+            # процесс; просто попробуем ещё раз.
+            time.sleep(sleep)
+            continue
+        if job is None:
+            if burst:
+                break
+            time.sleep(sleep)
+            continue
+        run_job(job)
+        processed += 1
+    return processed
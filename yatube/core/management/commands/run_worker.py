@@ -0,0 +1,79 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import default_worker_name, work
+
+
+class GracefulStop:
+    """Дожидается конца текущей задачи после SIGTERM/SIGINT."""
+
+    def __init__(self):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def __call__(self):
+        return self.stopping
+
+
+def run_process(burst, sleep):
+    work(
+        worker_name=default_worker_name(),
+        burst=burst,
+        sleep=sleep,
+        should_stop=GracefulStop(),
+    )
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчики фоновых задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Сколько процессов-обработчиков запустить.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Выйти, когда очередь опустеет.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] == 1:
+            run_process(options['burst'], options['sleep'])
+            return
+        # Дочерние процессы не должны делить соединение с базой родителя.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=run_process,
+                args=(options['burst'], options['sleep'])
+            )
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        stop = GracefulStop()
+        for process in processes:
+            while process.is_alive():
+                process.join(timeout=1)
+                if stop():
+                    for child in processes:
+                        if child.is_alive():
+                            child.terminate()
@@ -0,0 +1,22 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # Таблица общего кэша нужна, пока не настроен memcached; для
+    # кэшей других типов команда ничего не делает.
+    call_command(
+        'createcachetable', database=schema_editor.connection.alias,
+        verbosity=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
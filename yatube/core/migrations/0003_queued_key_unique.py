@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:58
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_queued_duplicates(apps, schema_editor):
+    # Из ждущих задач с одинаковым ключом остаётся самая ранняя: она
+    # делает ту же работу.
+    Job = apps.get_model('core', 'Job')
+    queued = Job.objects.filter(status='queued').exclude(key='')
+    keep = queued.values('key').annotate(first=Min('pk')).values('first')
+    queued.exclude(pk__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_shared_cache_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_queued_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued'), models.Q(_negated=True, key='')), fields=('key',), name='core_job_queued_key_unique'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    task = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы', default='{}')
+    key = models.CharField(
+        'Ключ',
+        max_length=200,
+        blank=True,
+        db_index=True,
+        help_text='Пока задача с этим ключом в очереди, дубль не ставится'
+    )
+    priority = models.SmallIntegerField('Приоритет', default=0)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED
+    )
+    run_at = models.DateTimeField('Запустить не раньше', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток',
+        default=5
+    )
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Захвачена', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    finished = models.DateTimeField('Завершена', null=True, blank=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at']
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='core_job_claim_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(status='queued') & ~models.Q(key=''),
+                name='core_job_queued_key_unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
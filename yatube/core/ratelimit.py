@@ -0,0 +1,136 @@
+"""Ограничение частоты запросов алгоритмом «ведро с токенами».
+
+Лимиты задаются в `RATE_LIMITS` по имени действия, отдельно для
+пользователя и для IP-адреса, в виде «число/период»:
+
+    RATE_LIMITS = {
+        'comment': {'user': '10/m', 'ip': '30/m'},
+    }
+
+В ведре помещается «число» токенов, и за «период» оно заполняется
+заново; каждый запрос забирает один токен. Вместо самого ведра в кэше
+хранится одно целое число — момент, когда ведро снова станет полным
+(алгоритм GCRA). Проверка — пара операций кэша `incr`/`add`; в memcached
+они атомарны, поэтому лимит соблюдается и при одновременных запросах из
+нескольких процессов. Вёдра лежат в общем кэше `RATE_LIMIT_CACHE`.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+KEY = 'ratelimit:{}:{}:{}'
+
+
+def parse_rate(rate):
+    """'10/m' -> (10, 60): ёмкость ведра и время его заполнения."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def _seconds(milliseconds):
+    # memcached понимает только целые секунды, а 0 для него — «вечно».
+    return max(1, math.ceil(milliseconds / 1000))
+
+
+def _interval(rate):
+    capacity, period = parse_rate(rate)
+    return period * 1000 // capacity
+
+
+def _give_back(cache, key, interval):
+    try:
+        full_at = cache.decr(key, interval)
+    except ValueError:
+        return
+    # Не всякий кэш сохраняет срок жизни ключа при decr.
+    cache.touch(key, _seconds(full_at - _now_ms()))
+
+
+def consume(key, rate):
+    """Забирает токен из ведра; возвращает 0 или секунды до повтора."""
+    cache = caches[settings.RATE_LIMIT_CACHE]
+    capacity, _ = parse_rate(rate)
+    interval = _interval(rate)
+    window = capacity * interval
+    now = _now_ms()
+    if cache.add(key, now + interval, _seconds(interval)):
+        return 0
+    try:
+        full_at = cache.incr(key, interval)
+    except ValueError:
+        # Ключ истёк между add и incr — ведро уже полное.
+        cache.add(key, now + interval, _seconds(interval))
+        return 0
+    if full_at - now > window:
+        # Запрос не пропускаем, поэтому и токен возвращаем.
+        _give_back(cache, key, interval)
+        return _seconds(full_at - now - window)
+    # Ключ живёт, пока ведро не заполнится: нет ключа — ведро полное,
+    # поэтому значение в кэше не отстаёт от времени больше чем на секунду.
+    cache.touch(key, _seconds(full_at - now))
+    return 0
+
+
+def refund(key, rate):
+    """Возвращает в ведро токен, взятый `consume`."""
+    _give_back(caches[settings.RATE_LIMIT_CACHE], key, _interval(rate))
+
+
+def client_ip(request):
+    address = request.META.get(settings.RATE_LIMIT_IP_HEADER, '')
+    return address.split(',')[0].strip()
+
+
+def check_limits(request, action):
+    """Проверяет лимиты действия; возвращает 0 или секунды до повтора."""
+    limits = settings.RATE_LIMITS.get(action, {})
+    buckets = []
+    if 'ip' in limits:
+        buckets.append(('ip', client_ip(request), limits['ip']))
+    if 'user' in limits and request.user.is_authenticated:
+        buckets.append(('user', request.user.pk, limits['user']))
+    taken = []
+    for scope, ident, rate in buckets:
+        key = KEY.format(action, scope, ident)
+        retry_after = consume(key, rate)
+        if retry_after:
+            # Запрос не пропущен — токены других вёдер возвращаем.
+            for taken_key, taken_rate in taken:
+                refund(taken_key, taken_rate)
+            return retry_after
+        taken.append((key, rate))
+    return 0
+
+
+def too_many_requests(request, retry_after):
+    response = render(
+        request, 'core/429.html', {'retry_after': retry_after}, status=429
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(action, methods=('POST',)):
+    """Ограничивает частоту запросов к представлению.
+
+    Считаются только запросы методами из `methods`; `None` — все.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                retry_after = check_limits(request, action)
+                if retry_after:
+                    return too_many_requests(request, retry_after)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,113 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..jobs import (claim_job, enqueue, requeue_stale_jobs, run_job, task,
+                    work)
+from ..models import Job
+
+User = get_user_model()
+
+calls = []
+
+
+@task
+def remember(value):
+    calls.append(value)
+
+
+@task
+def explode():
+    raise RuntimeError('boom')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_worker_runs_jobs_by_priority(self):
+        enqueue(remember, args=('low',))
+        enqueue(remember, args=('high',), priority=10)
+        self.assertEqual(work(burst=True), 2)
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+    def test_scheduled_job_waits(self):
+        enqueue(remember, args=('later',), delay=60)
+        self.assertEqual(work(burst=True), 0)
+        self.assertEqual(calls, [])
+
+    def test_same_key_is_not_queued_twice(self):
+        first = enqueue(remember, args=(1,), key='once')
+        second = enqueue(remember, args=(2,), key='once')
+        self.assertEqual(first.pk, second.pk)
+
+    def test_concurrent_enqueue_keeps_one_job(self):
+        first = enqueue(remember, args=(1,), key='once')
+        # Второй процесс заглянул в очередь до того, как первый записал
+        # задачу, и тоже пытается её вставить.
+        with mock.patch.object(QuerySet, 'first', side_effect=[None, first]):
+            second = enqueue(remember, args=(2,), key='once')
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(Job.objects.filter(key='once').count(), 1)
+
+    def test_running_job_with_same_key_allows_new_one(self):
+        first = enqueue(remember, args=(1,), key='again')
+        claim_job('worker')
+        second = enqueue(remember, args=(2,), key='again')
+        self.assertNotEqual(first.pk, second.pk)
+
+    def test_only_jobs_without_heartbeat_are_requeued(self):
+        enqueue(remember, args=(1,))
+        enqueue(remember, args=(2,))
+        alive = claim_job('alive')
+        dead = claim_job('dead')
+        Job.objects.filter(pk=dead.pk).update(
+            locked_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(
+            Job.objects.get(pk=alive.pk).status, Job.RUNNING
+        )
+        self.assertEqual(Job.objects.get(pk=dead.pk).status, Job.QUEUED)
+        # Обработчик всё-таки доработал, но задачу уже забрал другой.
+        claim_job('other')
+        run_job(dead)
+        self.assertEqual(Job.objects.get(pk=dead.pk).locked_by, 'other')
+
+    def test_claimed_job_is_not_claimed_again(self):
+        enqueue(remember, args=(1,))
+        self.assertIsNotNone(claim_job('first'))
+        self.assertIsNone(claim_job('second'))
+
+    @override_settings(JOB_MAX_ATTEMPTS=2)
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue(explode)
+        work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('boom', job.last_error)
+        Job.objects.filter(pk=job.pk).update(run_at=job.created)
+        work(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_password_reset_email_is_sent_by_worker(self):
+        User.objects.create_user(
+            username='test', email='test@example.com', password='pass'
+        )
+        self.client.post(
+            reverse('users:password_reset'),
+            {'email': 'test@example.com'}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        work(burst=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from ..ratelimit import consume
+
+User = get_user_model()
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        caches[settings.RATE_LIMIT_CACHE].clear()
+
+    def test_bucket_allows_burst_then_refills(self):
+        with mock.patch('core.ratelimit._now_ms', return_value=1_000_000):
+            self.assertEqual(
+                [consume('bucket', '3/m') for _ in range(4)], [0, 0, 0, 20]
+            )
+        # Через 20 секунд в ведре снова есть один токен.
+        with mock.patch('core.ratelimit._now_ms', return_value=1_020_000):
+            self.assertEqual(consume('bucket', '3/m'), 0)
+            self.assertEqual(consume('bucket', '3/m'), 20)
+
+
+@override_settings(RATE_LIMITS={
+    'comment': {'user': '2/m', 'ip': '3/m'},
+    'signup': {'ip': '1/h'},
+})
+class RateLimitViewTests(TestCase):
+    def setUp(self):
+        caches[settings.RATE_LIMIT_CACHE].clear()
+        self.user = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(author=self.user, text='Пост')
+        self.url = reverse('posts:add_comment', args=(self.post.pk,))
+
+    def test_comments_are_limited_per_user(self):
+        self.client.force_login(self.user)
+        for number in range(2):
+            self.client.post(self.url, {'text': f'Комментарий {number}'})
+        response = self.client.post(self.url, {'text': 'Лишний'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_comments_are_limited_per_ip(self):
+        for number in range(4):
+            user = User.objects.create_user(username=f'user{number}')
+            self.client.force_login(user)
+            response = self.client.post(self.url, {'text': 'Текст'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Comment.objects.count(), 3)
+
+    def test_rejected_request_keeps_other_buckets(self):
+        self.client.force_login(self.user)
+        for number in range(3):
+            self.client.post(self.url, {'text': f'Комментарий {number}'})
+        # Третий отклонён по лимиту пользователя и токен IP не тратит.
+        self.client.force_login(User.objects.create_user(username='other'))
+        response = self.client.post(self.url, {'text': 'С того же адреса'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Comment.objects.count(), 3)
+
+    def test_get_requests_are_not_counted(self):
+        for _ in range(3):
+            self.assertEqual(
+                self.client.get(reverse('users:signup')).status_code, 200
+            )
+        response = self.client.post(reverse('users:signup'), {})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('users:signup'), {})
+        self.assertEqual(response.status_code, 429)
@@ -1,21 +1,210 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth.models import AnonymousUser
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Max
+from django.http import HttpRequest, QueryDict
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.http import urlencode
 
-from .models import Post, Group, Comment
+from .models import BulkAction, Post, Group, Comment, UserDeletion
+from .moderation import start_bulk_action
 
 
-class PostAdmin(admin.ModelAdmin):
+def estimated_count(model):
+    """Примерное число строк таблицы без полного `COUNT(*)`.
+
+    PostgreSQL хранит оценку в `pg_class.reltuples`; в SQLite берём
+    наибольший первичный ключ — это один шаг по индексу, а ошибка
+    равна числу удалённых строк.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
+    return model._default_manager.aggregate(last=Max('pk'))['last'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для большой таблицы без фильтров показывает оценку числа строк."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate >= settings.ADMIN_ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def selection_filters(request):
+    """Параметры выборки действия: фильтры списка или отмеченные строки."""
+    if request.POST.get('select_across') == '1':
+        return request.GET.urlencode()
+    return urlencode({
+        'pk__in': ','.join(request.POST.getlist(ACTION_CHECKBOX_NAME))
+    })
+
+
+def queue_bulk_action(modeladmin, request, queryset, action, group=None):
+    bulk = start_bulk_action(
+        action, selection_filters(request), request.user, group
+    )
+    url = reverse('admin:posts_bulkaction_change', args=(bulk.pk,))
+    modeladmin.message_user(request, format_html(
+        '{} поставлено в очередь, ход выполнения — <a href="{}">здесь</a>.',
+        bulk, url
+    ))
+
+
+def delete_posts(modeladmin, request, queryset):
+    queue_bulk_action(modeladmin, request, queryset, BulkAction.DELETE_POSTS)
+
+
+delete_posts.short_description = 'Удалить выбранные посты (в фоне)'
+
+
+class MoveToGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        empty_label='Без группы',
+        label='Группа'
+    )
+
+
+def move_posts(modeladmin, request, queryset):
+    form = MoveToGroupForm(request.POST if 'apply' in request.POST else None)
+    if form.is_valid():
+        queue_bulk_action(
+            modeladmin, request, queryset, BulkAction.MOVE_POSTS,
+            group=form.cleaned_data['group']
+        )
+        return None
+    return render(request, 'admin/posts/move_posts.html', {
+        **modeladmin.admin_site.each_context(request),
+        'title': 'Перенос постов в группу',
+        'opts': modeladmin.model._meta,
+        'form': form,
+        'action': 'move_posts',
+        'selected': request.POST.getlist(ACTION_CHECKBOX_NAME),
+        'select_across': request.POST.get('select_across', '0'),
+        'action_checkbox_name': ACTION_CHECKBOX_NAME,
+    })
+
+
+move_posts.short_description = 'Перенести выбранные посты в группу (в фоне)'
+
+
+def delete_comments(modeladmin, request, queryset):
+    queue_bulk_action(
+        modeladmin, request, queryset, BulkAction.DELETE_COMMENTS
+    )
+
+
+delete_comments.short_description = 'Удалить выбранные комментарии (в фоне)'
+
+
+class SelectionChangeList(ChangeList):
+    """Только выборка списка, без подсчёта строк и первой страницы."""
+
+    def get_results(self, request):
+        pass
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Сортировка по первичному ключу идёт по индексу и не требует
+    # добавочной сортировки для однозначного порядка.
+    ordering = ('-pk',)
+
+    def selection(self, filters, user=None):
+        """Строки списка с параметрами адреса `filters` — для фоновых задач."""
+        request = HttpRequest()
+        request.GET = QueryDict(filters)
+        request.user = user or AnonymousUser()
+        request.selection_only = True
+        return self.get_changelist_instance(request).queryset
+
+    def get_changelist(self, request, **kwargs):
+        if getattr(request, 'selection_only', False):
+            return SelectionChangeList
+        return super().get_changelist(request, **kwargs)
+
+    def get_actions(self, request):
+        # Стандартное удаление грузит каждый объект и шлёт сигналы по
+        # одному прямо в запросе; вместо него — фоновые действия.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    actions = (delete_posts, move_posts)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = (
         'pk', 'created', 'author', 'post', 'text',)
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    date_hierarchy = 'created'
+    actions = (delete_comments,)
+
+
+class UserDeletionAdmin(admin.ModelAdmin):
+    list_display = (
+        'username', 'requested', 'finished', 'comments_deleted',
+        'posts_deleted', 'follows_deleted', 'files_deleted',)
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+
+class BulkActionAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'action', 'requested_by', 'requested', 'progress', 'finished',)
+    readonly_fields = (
+        'action', 'group', 'requested_by', 'requested', 'progress',
+        'finished',)
+    fields = readonly_fields
+    list_select_related = ('requested_by',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def progress(self, obj):
+        if obj.total is None:
+            return 'ожидает запуска'
+        percent = obj.processed * 100 // obj.total if obj.total else 100
+        return f'{obj.processed} из {obj.total} ({percent}%)'
+
+    progress.short_description = 'Ход выполнения'
 
 
 admin.site.register(Group)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(UserDeletion, UserDeletionAdmin)
+admin.site.register(BulkAction, BulkActionAdmin)
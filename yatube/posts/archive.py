@@ -0,0 +1,53 @@
+"""Архив старых постов.
+
+Посты старше `ARCHIVE_AFTER_DAYS` помечаются `is_archived` и выпадают из
+лент, а частичные индексы лент (см. `Post.Meta.indexes`) содержат только
+горячие посты. Страницы поста и профиля автора показывают и архивные
+посты. Строки остаются в `posts_post`, поэтому комментарии, рейтинги и
+прочие внешние ключи на архивные посты продолжают работать.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import invalidate_page_cache
+from .models import Post
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = settings.ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_old_posts(days=None, batch_size=None, on_batch=None):
+    """Переносит старые посты в архив пачками; возвращает их число."""
+    cutoff = archive_cutoff(days)
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    archived = 0
+    while True:
+        with transaction.atomic():
+            post_ids = list(Post.objects.hot().filter(
+                pub_date__lt=cutoff
+            ).order_by('pub_date').values_list('pk', flat=True)[:batch_size])
+            if not post_ids:
+                break
+            Post.objects.filter(pk__in=post_ids).update(is_archived=True)
+        archived += len(post_ids)
+        if on_batch is not None:
+            on_batch(archived)
+    if archived:
+        invalidate_page_cache()
+    return archived
+
+
+def restore_posts(since):
+    """Возвращает в ленты архивные посты новее `since`."""
+    restored = Post.objects.filter(
+        is_archived=True, pub_date__gte=since
+    ).update(is_archived=False)
+    if restored:
+        invalidate_page_cache()
+    return restored
@@ -0,0 +1,398 @@
+"""Замеры производительности, запускаются командой `bench`.
+
+Каждый замер получает отдельную тестовую базу (для SQLite — в памяти),
+поэтому рабочие данные не затрагиваются. Замер — функция, принимающая
+`out` для вывода и именованные параметры с числами по умолчанию.
+"""
+import json
+import multiprocessing
+import random
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.core.paginator import Paginator
+from django.db.models import F
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from .archive import archive_old_posts
+from .counters import ViewCounter
+from .export import export_bytes, user_content
+from .importer import ContentImporter
+from .models import Follow, Post, Reaction, ReactionCounter
+from .reactions import flush_buffer, reaction_cache, toggle_reaction
+from .sitemaps import build_sitemaps
+from .suggestions import rebuild_suggestions
+from .views import index, index_fragment
+from .text import make_excerpt
+from .utils import FEED_ORDERING, MAX_NUM_OF_POSTS, feed_token
+
+User = get_user_model()
+
+BENCHMARKS = {}
+
+
+def benchmark(func=None, needs_file_db=False):
+    """Регистрирует замер.
+
+    `needs_file_db=True` — замеру нужна база на диске: например, в неё
+    пишут несколько процессов одновременно.
+    """
+    def register(func):
+        func.needs_file_db = needs_file_db
+        BENCHMARKS[func.__name__] = func
+        return func
+    if func is not None:
+        return register(func)
+    return register
+
+
+@contextmanager
+def measure():
+    """Собирает время и число запросов к базе внутри блока."""
+    result = {'queries': 0, 'writes': 0}
+
+    def count_queries(execute, sql, params, many, context):
+        result['queries'] += 1
+        if sql.lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+            result['writes'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_queries):
+        started = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - started
+
+
+def make_posts(count, batch_size=5000, author=None, **fields):
+    if author is None:
+        author = User.objects.create_user(username=f'bench{time.time_ns()}')
+    for start in range(0, count, batch_size):
+        Post.objects.bulk_create(
+            Post(author=author, **{'text': f'Пост {number}', **fields})
+            for number in range(start, min(start + batch_size, count))
+        )
+    return author
+
+
+@benchmark
+def view_counters(out, views=20000, posts=500, flush_size=200):
+    """Запись просмотров: UPDATE на каждый просмотр против буфера."""
+    author = make_posts(posts)
+    post_ids = list(
+        Post.objects.filter(author=author).values_list('pk', flat=True)
+    )
+    stream = [post_ids[i * 7919 % len(post_ids)] for i in range(views)]
+
+    with measure() as direct:
+        for post_id in stream:
+            Post.objects.filter(pk=post_id).update(views=F('views') + 1)
+
+    counter = ViewCounter(flush_size=flush_size, flush_interval=3600)
+    with measure() as buffered:
+        for post_id in stream:
+            counter.add(post_id)
+        counter.flush()
+
+    out(f'{views} просмотров по {posts} постам')
+    for name, result in (('UPDATE на просмотр', direct),
+                         ('буфер', buffered)):
+        out(
+            f'{name:>20}: {result["writes"]:>7} записей, '
+            f'{result["seconds"]:.3f} с, '
+            f'{views / result["writes"]:.1f} просмотров на запись'
+        )
+
+
+@benchmark
+def suggestions(out, users=5000, follows_per_user=40):
+    """Пакетный расчёт рекомендаций: время и пик памяти Python."""
+    User.objects.bulk_create(
+        User(username=f'reader{number}') for number in range(users)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    rng = random.Random(0)
+    for start in range(0, len(user_ids), 500):
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id in user_ids[start:start + 500]
+             for author_id in set(rng.sample(user_ids, follows_per_user))
+             if author_id != user_id),
+            ignore_conflicts=True
+        )
+    edges = Follow.objects.count()
+    tracemalloc.start()
+    with measure() as result:
+        rebuild_suggestions()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    out(
+        f'{edges} подписок, {users} пользователей: '
+        f'{result["seconds"]:.1f} с, пик памяти {peak / 2 ** 20:.1f} МиБ'
+    )
+
+
+def _feed_timings(pages):
+    """Время первой и дальних страниц ленты вместе с подсчётом страниц."""
+    feed = Post.objects.hot().order_by('-pub_date')
+    timings = {}
+    for number in pages:
+        with measure() as result:
+            page = Paginator(feed, 10).get_page(number)
+            list(page)
+        timings[number] = result['seconds']
+    return timings
+
+
+@benchmark
+def archive(out, posts=10_000_000, hot_days=365, days=3650):
+    """Лента до и после переноса старых постов в архив."""
+    now = timezone.now()
+    author = User.objects.create_user(username='archive_bench')
+    step = timedelta(days=days) / posts
+    batch_size = 10000
+    last_pk = 0
+    for start in range(0, posts, batch_size):
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}')
+            for number in range(start, min(start + batch_size, posts))
+        )
+        # pub_date ставится при вставке (auto_now_add), раздвигаем даты
+        # пачками: самые старые посты вставлены первыми.
+        batch = Post.objects.filter(pk__gt=last_pk)
+        last_pk = batch.order_by('-pk').values_list('pk', flat=True)[0]
+        batch.update(pub_date=now - step * (posts - start))
+    pages = (1, 10, 100)
+    before = _feed_timings(pages)
+    with measure() as moved:
+        archived = archive_old_posts(days=hot_days)
+    after = _feed_timings(pages)
+    out(
+        f'{posts} постов, в архив ушло {archived} '
+        f'за {moved["seconds"]:.1f} с'
+    )
+    for number in pages:
+        out(
+            f'страница {number:>4}: {before[number] * 1000:8.1f} мс -> '
+            f'{after[number] * 1000:8.1f} мс'
+        )
+
+
+@benchmark
+def excerpts(out, posts=5000, words=3000, pages=50):
+    """Ленты длинных постов: полный текст против отрывка."""
+    text = ' '.join(['слово'] * words)
+    author = make_posts(
+        posts, batch_size=500, text=text, excerpt=make_excerpt(text)
+    )
+    feed = Post.objects.filter(author=author).order_by('-pub_date')
+    for name, queryset, field in (('полный текст', feed, 'text'),
+                                  ('отрывок', feed.for_list(), 'excerpt')):
+        tracemalloc.start()
+        with measure() as result:
+            shown = 0
+            for number in range(1, pages + 1):
+                page = Paginator(queryset, 10).get_page(number)
+                shown += sum(len(getattr(post, field)) for post in page)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        out(
+            f'{name:>14}: {pages} страниц за {result["seconds"]:.3f} с, '
+            f'{shown / pages / 1024:.1f} КиБ текста на страницу, '
+            f'пик памяти {peak / 2 ** 20:.1f} МиБ'
+        )
+
+
+def _react_worker(post_id, user_ids):
+    """Ставит реакции в отдельном процессе; возвращает число ошибок."""
+    # Соединение родителя после fork использовать нельзя.
+    connection.close()
+    failed = 0
+    for user_id in user_ids:
+        try:
+            toggle_reaction(User(pk=user_id), post_id, Reaction.LIKE)
+        except OperationalError:
+            failed += 1
+    connection.close()
+    return failed
+
+
+@benchmark(needs_file_db=True)
+def reactions(out, workers=8, likes=200):
+    """Одновременные реакции на один пост: счётчик в транзакции и в кэше."""
+    author = make_posts(1)
+    post_id = Post.objects.get(author=author).pk
+    User.objects.bulk_create(
+        User(username=f'fan{number}') for number in range(workers * likes)
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith='fan'
+    ).values_list('pk', flat=True))
+    batches = [user_ids[number::workers] for number in range(workers)]
+    context = multiprocessing.get_context('fork')
+    out(f'общий кэш: {type(reaction_cache()).__name__}')
+    for buffered in (False, True):
+        Reaction.objects.all().delete()
+        ReactionCounter.objects.all().delete()
+        reaction_cache().clear()
+        connection.close()
+        started = time.perf_counter()
+        with override_settings(REACTION_BUFFER=buffered), \
+                context.Pool(workers) as pool:
+            failed = sum(pool.starmap(
+                _react_worker, [(post_id, batch) for batch in batches]
+            ))
+        seconds = time.perf_counter() - started
+        if buffered:
+            flush_buffer([post_id])
+        done = len(user_ids) - failed
+        counted = ReactionCounter.objects.get(post_id=post_id).count
+        mode = 'буфер в кэше' if buffered else 'в транзакции'
+        out(
+            f'{mode:>14}: {done} реакций за {seconds:.2f} с '
+            f'({done / seconds:.0f}/с), ошибок блокировки {failed}, '
+            f'счётчик {counted}'
+        )
+
+
+@benchmark
+def export(out, posts=20000, steps=4, words=200):
+    """Пик памяти выгрузки при росте истории пользователя."""
+    text = ' '.join(['слово'] * words)
+    author = make_posts(0)
+    for step in range(1, steps + 1):
+        make_posts(posts, text=text, author=author)
+        tracemalloc.start()
+        with measure() as result:
+            size = sum(
+                len(chunk)
+                for chunk in export_bytes(*user_content(author), 'jsonl')
+            )
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        out(
+            f'{step * posts:>8} постов: {size / 2 ** 20:7.1f} МиБ '
+            f'за {result["seconds"]:.2f} с, '
+            f'пик памяти {peak / 2 ** 20:.1f} МиБ'
+        )
+
+
+def _content_rows(users, posts, comments, follows, prefix):
+    yield {'type': 'group', 'slug': f'{prefix}group', 'title': 'Группа',
+           'description': 'Импорт'}
+    for number in range(users):
+        yield {'type': 'user', 'username': f'{prefix}{number}'}
+    for number in range(posts):
+        yield {'type': 'post', 'id': number,
+               'author': f'{prefix}{number % users}',
+               'group': f'{prefix}group' if number % 3 == 0 else None,
+               'date': '2015-03-01T10:00:00+00:00',
+               'text': f'Пост номер {number} про #импорт'}
+    for number in range(comments):
+        yield {'type': 'comment', 'post_id': number % posts,
+               'author': f'{prefix}{number * 7 % users}',
+               'date': '2015-03-02T10:00:00+00:00',
+               'text': f'Комментарий {number}'}
+    for number in range(follows):
+        user, author = number % users, number * 31 % users
+        if user != author:
+            yield {'type': 'follow', 'user': f'{prefix}{user}',
+                   'author': f'{prefix}{author}'}
+
+
+@benchmark
+def import_content(out, users=2000, posts=100000, comments=200000,
+                   follows=50000, orm_rows=2000):
+    """Импорт JSONL: save() по строке против пачек bulk_create."""
+    author = User.objects.create_user(username='orm')
+    with measure() as orm:
+        for number in range(orm_rows):
+            Post.objects.create(author=author, text=f'Пост {number} #импорт')
+    out(
+        f'ORM по одной: {orm_rows} постов за {orm["seconds"]:.2f} с '
+        f'({orm_rows / orm["seconds"]:.0f} строк/с, '
+        f'{orm["queries"] / orm_rows:.1f} запросов на строку)'
+    )
+    lines = [
+        json.dumps(row, ensure_ascii=False)
+        for row in _content_rows(users, posts, comments, follows, 'imp')
+    ]
+    importer = ContentImporter()
+    with measure() as result:
+        counts = importer.read(lines)
+    out(
+        f'import_content: {importer.rows} строк за '
+        f'{result["seconds"]:.2f} с ({importer.rows_per_second:.0f} '
+        f'строк/с, запросов {result["queries"]}), ошибок '
+        f'{counts["errors"]}'
+    )
+
+
+@benchmark
+def sitemaps(out, posts=500_000, chunk_size=50_000):
+    """Полная сборка карты сайта против пересборки одного куска."""
+    make_posts(posts)
+    with tempfile.TemporaryDirectory() as root, override_settings(
+        SITEMAP_ROOT=root, SITEMAP_CHUNK_SIZE=chunk_size
+    ):
+        tracemalloc.start()
+        with measure() as full:
+            built = build_sitemaps(full=True)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        out(
+            f'полная сборка: {len(built)} файлов, {posts} адресов за '
+            f'{full["seconds"]:.2f} с, запросов {full["queries"]}, '
+            f'пик памяти {peak / 2 ** 20:.1f} МиБ'
+        )
+        middle = Post.objects.order_by('pk').values_list(
+            'pk', flat=True
+        )[posts // 2]
+        Post.objects.filter(pk=middle).delete()
+        with measure() as incremental:
+            built = build_sitemaps()
+        out(
+            f'после удаления поста: файлов пересобрано: {len(built)} за '
+            f'{incremental["seconds"]:.2f} с, '
+            f'запросов {incremental["queries"]}'
+        )
+
+
+@benchmark
+def feed_fragment(out, posts=100_000, pages=(2, 100, 5000), repeat=20):
+    """Следующая порция ленты: страница целиком против фрагмента."""
+    if isinstance(pages, int):
+        pages = (pages,)
+    reader = make_posts(posts)
+    factory = RequestFactory()
+
+    def timed(view, params):
+        request = factory.get('/', params)
+        # Авторизованный запрос не попадает в кэш страниц.
+        request.user = reader
+        started = time.perf_counter()
+        for _ in range(repeat):
+            response = view(request)
+        return response, (time.perf_counter() - started) / repeat
+
+    ordered = Post.objects.order_by(*FEED_ORDERING)
+    for page in pages:
+        # Курсор, который страница `page - 1` отдаёт фрагменту.
+        token = feed_token(ordered[(page - 1) * MAX_NUM_OF_POSTS - 1])
+        full, full_seconds = timed(index, {'page': page})
+        with measure() as fragment_queries:
+            fragment, fragment_seconds = timed(
+                index_fragment, {'after': token}
+            )
+        out(
+            f'страница {page:>5}: целиком {len(full.content):>6} Б за '
+            f'{full_seconds * 1000:6.1f} мс, фрагмент '
+            f'{len(fragment.content):>6} Б за '
+            f'{fragment_seconds * 1000:6.1f} мс '
+            f'({fragment_queries["queries"] // repeat} запроса)'
+        )
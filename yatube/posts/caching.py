@@ -0,0 +1,179 @@
+"""Кэш страниц для анонимных посетителей.
+
+Страница кэшируется в памяти процесса под ключом с версиями двух
+областей: общей (`invalidate_page_cache` сбрасывает весь сайт — для
+массовых операций) и области самой страницы, например `group:<slug>`
+(`invalidate_pages` сбрасывает только её). Версии лежат в общем кэше:
+их сдвигает и воркер задач. Страницы без области, как и изменения,
+не задевающие область страницы, живут до `PAGE_CACHE_TIMEOUT`.
+"""
+import secrets
+from functools import wraps
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import resolve
+from django.utils.cache import (get_cache_key, learn_cache_key,
+                                patch_cache_control, patch_response_headers,
+                                patch_vary_headers)
+
+from .models import Group, Post
+
+PAGE_VERSION_KEY = 'pages:version:{}'
+SITE_SCOPE = 'site'
+
+
+def version_cache():
+    # Версии сдвигают и воркер задач, и другие процессы сайта, поэтому
+    # они лежат в общем кэше, а сами страницы — в кэше процесса.
+    return caches[settings.PAGE_CACHE_VERSION_CACHE]
+
+
+def _new_version():
+    # Случайная, а не счётчик: если ключ версии вытеснят, заведённая
+    # заново версия не совпадёт ни с одной из прошлых.
+    return secrets.token_hex(4)
+
+
+def page_cache_versions(scopes):
+    """Текущие версии областей; недостающие заводятся одним махом."""
+    cache = version_cache()
+    keys = [PAGE_VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), settings.PAGE_CACHE_TIMEOUT)
+            versions[key] = cache.get(key, '')
+    return [versions[key] for key in keys]
+
+
+def invalidate_pages(scopes):
+    """Устаревают закэшированные страницы перечисленных областей."""
+    version_cache().set_many(
+        {PAGE_VERSION_KEY.format(scope): _new_version() for scope in scopes},
+        settings.PAGE_CACHE_TIMEOUT
+    )
+
+
+def invalidate_page_cache():
+    """Устаревают все закэшированные страницы сайта."""
+    invalidate_pages([SITE_SCOPE])
+
+
+def post_page_scopes(post, previous_group_id=None):
+    """Области страниц с постом; при переносе — и прежней группы."""
+    scopes = [
+        'index',
+        f'profile:{post.author.username}',
+        f'post:{post.pk}',
+    ]
+    group_ids = {post.group_id, previous_group_id} - {None}
+    if Post.group.is_cached(post) and post.group is not None:
+        scopes.append(f'group:{post.group.slug}')
+        group_ids.discard(post.group_id)
+    if group_ids:
+        scopes += [
+            f'group:{slug}'
+            for slug in Group.objects.filter(
+                pk__in=group_ids
+            ).values_list('slug', flat=True)
+        ]
+    return scopes
+
+
+def anonymous_request(path, params=None):
+    """GET-запрос анонима к `SITE_URL` для отрисовки страницы вне запроса.
+
+    Окружение WSGI то же, что у настоящего запроса к сайту, поэтому
+    ключи кэша страниц совпадают с ключами запросов посетителей.
+    Запрос помечен как внутренний: такие отрисовки не считаются
+    просмотрами.
+    """
+    site = urlsplit(settings.SITE_URL)
+    request = WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': urlencode(params or {}),
+        'HTTP_HOST': site.netloc,
+        'SERVER_NAME': site.hostname,
+        'SERVER_PORT': str(
+            site.port or (443 if site.scheme == 'https' else 80)
+        ),
+        'wsgi.url_scheme': site.scheme,
+        'wsgi.input': BytesIO(),
+    })
+    request.user = AnonymousUser()
+    request.is_internal = True
+    request.resolver_match = resolve(path)
+    return request
+
+
+def private_response(response):
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _cached_response(request, view_func, args, kwargs, key_prefix,
+                     timeout):
+    """То же, что `cache_page`, но с префиксом ключа на каждый запрос."""
+    cache = caches[settings.PAGE_CACHE]
+    if request.method != 'GET':
+        return view_func(request, *args, **kwargs)
+    key = get_cache_key(request, key_prefix, 'GET', cache=cache)
+    if key is not None:
+        response = cache.get(key)
+        if response is not None:
+            return response
+    response = view_func(request, *args, **kwargs)
+    if (response.streaming or response.status_code != 200
+            or 'private' in response.get('Cache-Control', ())):
+        return response
+    patch_response_headers(response, timeout)
+    key = learn_cache_key(request, response, timeout, key_prefix, cache=cache)
+    if hasattr(response, 'render') and callable(response.render):
+        response.add_post_render_callback(
+            lambda rendered: cache.set(key, rendered, timeout)
+        )
+    else:
+        cache.set(key, response, timeout)
+    return response
+
+
+def anonymous_cache_page(scope=None, timeout=None):
+    """Кэширует страницу целиком, но только для анонимных посетителей.
+
+    `scope` — шаблон области страницы по аргументам представления,
+    например `'group:{slug}'`. Авторизованные пользователи получают
+    свежий ответ с `Cache-Control: private`, чтобы ни наш кэш, ни
+    обратный прокси не отдали чужой персональный контент.
+    """
+    if timeout is None:
+        timeout = settings.PAGE_CACHE_TIMEOUT
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return private_response(view_func(request, *args, **kwargs))
+            scopes = [SITE_SCOPE]
+            if scope is not None:
+                scopes.append(scope.format(**kwargs))
+            versions = page_cache_versions(scopes)
+            key_prefix = 'anon:' + ':'.join(
+                f'{name}.{version}' for name, version in zip(scopes, versions)
+            )
+            response = _cached_response(
+                request, view_func, args, kwargs, key_prefix, timeout
+            )
+            # Vary добавляется уже после записи в кэш: иначе каждая
+            # анонимная кука csrftoken порождала бы свою копию страницы.
+            patch_cache_control(response, public=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
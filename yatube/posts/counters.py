@@ -0,0 +1,115 @@
+"""Буферизованные счётчики просмотров постов.
+
+Просмотр не пишет в базу сразу: приращения копятся в памяти процесса и
+сбрасываются несколькими массовыми `UPDATE` на пачку постов — когда в буфере
+набирается `VIEW_COUNTER_FLUSH_SIZE` постов, когда с прошлого сброса
+прошло `VIEW_COUNTER_FLUSH_INTERVAL` секунд и при завершении процесса.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+
+from . import trending
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# У SQLite ограничение на число параметров в запросе (999).
+UPDATE_CHUNK_SIZE = 900
+
+
+def bulk_increment_views(counts):
+    """Прибавляет просмотры пачкой; возвращает число UPDATE-запросов.
+
+    Посты группируются по величине приращения: при равномерном потоке
+    просмотров групп немного, и каждая уходит одним
+    `UPDATE ... SET views = views + n WHERE id IN (...)`.
+    """
+    by_count = defaultdict(list)
+    for post_id, count in counts.items():
+        by_count[count].append(post_id)
+    statements = 0
+    for count, post_ids in by_count.items():
+        for start in range(0, len(post_ids), UPDATE_CHUNK_SIZE):
+            Post.objects.filter(
+                pk__in=post_ids[start:start + UPDATE_CHUNK_SIZE]
+            ).update(views=F('views') + count)
+            statements += 1
+    return statements
+
+
+class ViewCounter:
+    def __init__(self, flush_size=None, flush_interval=None):
+        self.flush_size = flush_size or settings.VIEW_COUNTER_FLUSH_SIZE
+        self.flush_interval = (
+            flush_interval or settings.VIEW_COUNTER_FLUSH_INTERVAL
+        )
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._last_flush = time.monotonic()
+        self._database = None
+
+    def add(self, post_id, count=1):
+        with self._lock:
+            if not self._pending:
+                self._database = connection.settings_dict['NAME']
+            self._pending[post_id] += count
+            due = (
+                len(self._pending) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        return pending
+
+    def flush(self):
+        """Сбрасывает буфер; при ошибке базы приращения возвращаются."""
+        pending = self._take()
+        if not pending:
+            return pending
+        if connection.settings_dict['NAME'] != self._database:
+            # База сменилась (например, тестовую уже удалили): эти
+            # идентификаторы постов к текущей базе не относятся.
+            return Counter()
+        try:
+            with transaction.atomic():
+                bulk_increment_views(pending)
+                trending.record_views(pending)
+        except DatabaseError:
+            logger.exception('Не удалось сохранить просмотры, повторим')
+            with self._lock:
+                self._pending.update(pending)
+            return Counter()
+        return pending
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.flush)
+
+
+def counts_views(view_func):
+    """Засчитывает просмотр, даже если страница отдана из кэша.
+
+    Внутренние отрисовки (снимки, прогрев) просмотрами не считаются.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if getattr(request, 'is_internal', False):
+            return response
+        if request.method == 'GET' and response.status_code == 200:
+            view_counter.add(kwargs['post_id'])
+        return response
+    return wrapper
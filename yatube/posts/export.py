@@ -0,0 +1,151 @@
+"""Потоковая выгрузка постов и комментариев в JSONL или CSV.
+
+Строки читаются из базы через `.iterator(chunk_size=EXPORT_CHUNK_SIZE)`
+и сразу превращаются в байты, поэтому память не зависит от объёма
+истории. Архив zip с картинками тоже собирается на лету: `ZipFile`
+пишет в буфер, который отдаётся и очищается после каждой порции.
+"""
+import csv
+import json
+import posixpath
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Comment, Post
+
+FORMATS = ('jsonl', 'csv')
+CSV_COLUMNS = (
+    'type', 'id', 'post_id', 'date', 'author', 'group', 'text', 'image',
+)
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+def user_content(user):
+    return (
+        Post.objects.filter(author=user),
+        Comment.objects.filter(author=user),
+    )
+
+
+def group_content(group):
+    return (
+        Post.objects.filter(group=group),
+        Comment.objects.filter(post__group=group),
+    )
+
+
+def export_rows(posts, comments):
+    """Поток словарей: сначала посты, затем комментарии."""
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    post_rows = posts.order_by('pk').values_list(
+        'pk', 'pub_date', 'author__username', 'group__slug', 'text', 'image'
+    ).iterator(chunk_size=chunk_size)
+    for pk, pub_date, author, group, text, image in post_rows:
+        yield {
+            'type': 'post', 'id': pk, 'date': pub_date.isoformat(),
+            'author': author, 'group': group, 'text': text, 'image': image,
+        }
+    comment_rows = comments.order_by('pk').values_list(
+        'pk', 'post_id', 'created', 'author__username', 'text'
+    ).iterator(chunk_size=chunk_size)
+    for pk, post_id, created, author, text in comment_rows:
+        yield {
+            'type': 'comment', 'id': pk, 'post_id': post_id,
+            'date': created.isoformat(), 'author': author, 'text': text,
+        }
+
+
+class Echo:
+    """Псевдофайл для csv.writer: `write` просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row.get(column) for column in CSV_COLUMNS])
+
+
+def export_lines(posts, comments, fmt):
+    lines = jsonl_lines if fmt == 'jsonl' else csv_lines
+    return lines(export_rows(posts, comments))
+
+
+def export_bytes(posts, comments, fmt):
+    for line in export_lines(posts, comments, fmt):
+        yield line.encode()
+
+
+class ZipBuffer:
+    """Поток только для записи: копит байты, пока их не заберут."""
+
+    def __init__(self):
+        self.chunks = []
+        self.written = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.written += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.written
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_zip(posts, comments, fmt):
+    """Zip с выгрузкой и картинками постов, отдаётся кусками."""
+    buffer = ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(f'content.{fmt}', 'w', force_zip64=True) as data:
+            for line in export_lines(posts, comments, fmt):
+                data.write(line.encode())
+                if buffer.chunks:
+                    yield buffer.take()
+        images = posts.exclude(image='').order_by('image').values_list(
+            'image', flat=True
+        ).distinct().iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+        for name in images:
+            if not default_storage.exists(name):
+                continue
+            info = zipfile.ZipInfo(posixpath.join('images', name))
+            # Картинки уже сжаты, повторно их не жмём.
+            info.compress_type = zipfile.ZIP_STORED
+            with default_storage.open(name) as source, \
+                    archive.open(info, 'w', force_zip64=True) as target:
+                for chunk in iter(lambda: source.read(COPY_CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    if buffer.chunks:
+                        yield buffer.take()
+    yield buffer.take()
+
+
+def export_stream(posts, comments, fmt, images=False):
+    """Возвращает (поток байтов, тип содержимого, расширение файла)."""
+    if images:
+        return export_zip(posts, comments, fmt), 'application/zip', 'zip'
+    content_type = (
+        'application/x-ndjson' if fmt == 'jsonl' else 'text/csv'
+    )
+    return (
+        export_bytes(posts, comments, fmt),
+        f'{content_type}; charset=utf-8',
+        fmt,
+    )
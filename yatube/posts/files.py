@@ -0,0 +1,21 @@
+"""Запись файлов, которые отдаются напрямую веб-сервером.
+
+Снимки страниц и карта сайта перезаписываются, пока nginx их читает,
+поэтому файл сначала пишется рядом и подменяется целиком.
+"""
+import os
+
+
+def write_atomic(filename, content):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_name = f'{filename}.tmp{os.getpid()}'
+    with open(tmp_name, 'wb') as tmp:
+        tmp.write(content)
+    os.replace(tmp_name, filename)
+
+
+def remove_file(filename):
+    try:
+        os.remove(filename)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,92 @@
+"""Кэш подписок пользователей.
+
+Для каждого пользователя в кэше лежит отсортированный массив id авторов,
+на которых он подписан (по 8 байт на подписку). Проверка «подписан ли»
+для целой страницы делается в памяти двоичным поиском, без запросов.
+
+Кэш общий для всех процессов (`FOLLOW_CACHE`). Записи в нём не
+правятся на месте: при подписке и отписке сигналы модели Follow
+удаляют ключи, и следующее чтение берёт данные из базы. Массовые
+изменения в обход сигналов видны не позже чем через
+`FOLLOW_CACHE_TIMEOUT` секунд.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOWING_KEY = 'follows:following:{}'
+FOLLOWERS_COUNT_KEY = 'follows:followers:{}'
+
+
+def follow_cache():
+    return caches[settings.FOLLOW_CACHE]
+
+
+def _store(user_id, ids):
+    follow_cache().set(
+        FOLLOWING_KEY.format(user_id),
+        ids.tobytes(),
+        settings.FOLLOW_CACHE_TIMEOUT
+    )
+
+
+def followed_ids(user_id):
+    data = follow_cache().get(FOLLOWING_KEY.format(user_id))
+    ids = array('q')
+    if data is not None:
+        ids.frombytes(data)
+        return ids
+    ids.extend(Follow.objects.filter(
+        user_id=user_id, author__isnull=False
+    ).order_by('author_id').values_list('author_id', flat=True))
+    _store(user_id, ids)
+    return ids
+
+
+def _contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def is_following(user, author_id):
+    if not user.is_authenticated:
+        return False
+    return _contains(followed_ids(user.pk), author_id)
+
+
+def following_states(user, author_ids):
+    """Возвращает множество id из `author_ids`, на которых подписан user."""
+    if not user.is_authenticated:
+        return set()
+    ids = followed_ids(user.pk)
+    return {author_id for author_id in author_ids if _contains(ids, author_id)}
+
+
+def following_count(user_id):
+    return len(followed_ids(user_id))
+
+
+def followers_count(user_id):
+    cache = follow_cache()
+    key = FOLLOWERS_COUNT_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Follow.objects.filter(author_id=user_id).count()
+        cache.set(key, count, settings.FOLLOW_CACHE_TIMEOUT)
+    return count
+
+
+def forget_follows(user_ids, author_ids):
+    """Сбрасывает кэш подписок пользователей и счётчики подписчиков."""
+    keys = (
+        [FOLLOWING_KEY.format(user_id) for user_id in user_ids]
+        + [FOLLOWERS_COUNT_KEY.format(author_id) for author_id in author_ids]
+    )
+    follow_cache().delete_many(keys)
+    # Параллельный запрос мог успеть положить в кэш данные до коммита.
+    transaction.on_commit(lambda: follow_cache().delete_many(keys))
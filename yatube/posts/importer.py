@@ -0,0 +1,408 @@
+"""Быстрый импорт пользователей, групп, постов, комментариев и подписок.
+
+Источник — JSONL, по объекту на строку; формат постов и комментариев
+тот же, что у выгрузки (posts.export):
+
+    {"type": "user", "username": "leo", "email": "leo@ya.ru"}
+    {"type": "group", "slug": "cats", "title": "Коты", "description": ""}
+    {"type": "post", "id": 7, "author": "leo", "group": "cats",
+     "date": "2015-03-01T10:00:00+00:00", "text": "...", "image": ""}
+    {"type": "comment", "post_id": 7, "author": "leo", "date": "...",
+     "text": "..."}
+    {"type": "follow", "user": "leo", "author": "tolstoy"}
+
+Строки копятся по типам и записываются пачками по `IMPORT_BATCH_SIZE`
+через `bulk_create`, одна транзакция на пачку. Первичные ключи пачки
+назначаются заранее подряд от текущего максимума под блокировкой
+таблицы, которая держится до конца транзакции, поэтому id новых строк
+известны без повторного чтения и не пересекаются ни с обычными
+вставками, ни со вторым импортом. Пользователи и группы ищутся по
+словарям «имя — pk» в памяти; имена, которых там ещё нет, дочитываются
+из базы одним запросом на пачку.
+
+Импорт можно повторить после сбоя: записанные посты и комментарии
+отмечаются в `ImportedRow` в той же транзакции по ключу строки (её
+`id`, а без него — хэш содержимого) и источнику (`source`, обычно имя
+файла), и при повторе пропускаются. Пользователи, группы и подписки
+пропускаются по уникальным полям. Даты постов и комментариев из файла
+записываются отдельным UPDATE после вставки: `auto_now_add` ставит
+текущее время. Сигналы `post_save` при этом не срабатывают: теги, кэш
+подписок и кэш страниц обновляются один раз в конце.
+"""
+import hashlib
+import json
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .caching import invalidate_page_cache
+from .follows import forget_follows
+from .models import Comment, Follow, Group, ImportedRow, Post, User
+from .tags import reindex_all
+
+# Порядок записи внутри пачки: сначала то, на что ссылаются остальные.
+KINDS = ('user', 'group', 'post', 'comment', 'follow')
+MAX_ERRORS = 100
+# У SQLite ограничение на число параметров в запросе (999).
+LOOKUP_CHUNK_SIZE = 900
+
+
+def row_key(row):
+    """Ключ строки для повторного импорта: id из файла или хэш полей."""
+    if row.get('id') is not None:
+        return str(row['id'])
+    content = json.dumps(
+        [row.get(name) for name in (
+            'post_id', 'author', 'group', 'date', 'text'
+        )],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def reserve_pks(model):
+    """Блокирует вставки в таблицу до конца транзакции; первый свободный pk.
+
+    Без блокировки обычная вставка или второй импорт могли бы занять pk
+    между чтением максимума и записью пачки.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+    elif connection.vendor == 'sqlite':
+        # Пустое обновление сразу берёт блокировку записи всей базы.
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {table} SET {column} = {column} WHERE 0')
+    else:
+        # InnoDB блокирует и промежуток после последней строки.
+        list(model.objects.select_for_update().order_by(
+            '-pk'
+        ).values_list('pk', flat=True)[:1])
+    last = model.objects.aggregate(last=Max('pk'))['last']
+    return (last or 0) + 1
+
+
+def parse_date(value):
+    date = parse_datetime(value)
+    if date is None:
+        raise ValueError(f'не дата: {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def required_text(row, key):
+    value = row[key]
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f'пустое поле {key}')
+    return value
+
+
+class ContentImporter:
+    def __init__(self, source='', batch_size=None, on_batch=None):
+        self.source = source
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.on_batch = on_batch
+        self.pending = {kind: [] for kind in KINDS}
+        self.users = {}
+        self.groups = {}
+        # id поста в файле -> pk в базе, для комментариев.
+        self.posts = {}
+        self.post_range = None
+        self.followers = set()
+        self.followed = set()
+        self.counts = Counter()
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = 0
+
+    @property
+    def rows(self):
+        return sum(self.counts[kind] for kind in KINDS)
+
+    @property
+    def rows_per_second(self):
+        seconds = self.seconds or time.perf_counter() - self.started
+        return self.rows / seconds if seconds else 0
+
+    def error(self, line, message):
+        self.counts['errors'] += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, message))
+
+    def read(self, lines):
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                self.error(number, 'строка не в формате JSON')
+                continue
+            self.add(number, row)
+        return self.finish()
+
+    def add(self, line, row):
+        kind = row.get('type') if isinstance(row, dict) else None
+        if kind not in self.pending:
+            self.error(line, f'неизвестный тип {kind!r}')
+            return
+        self.pending[kind].append((line, row))
+        if len(self.pending[kind]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with transaction.atomic():
+            for kind in KINDS:
+                rows, self.pending[kind] = self.pending[kind], []
+                if rows:
+                    getattr(self, f'import_{kind}s')(rows)
+        if self.on_batch is not None:
+            self.on_batch(self)
+
+    def finish(self):
+        """Дописывает остаток и один раз обновляет индексы и кэши."""
+        self.flush()
+        if self.post_range is not None:
+            reindex_all(pk_range=self.post_range)
+        forget_follows(self.followers, self.followed)
+        invalidate_page_cache()
+        self.seconds = time.perf_counter() - self.started
+        return self.counts
+
+    def _insert(self, model, objects):
+        """Вставляет пачку с pk подряд из зарезервированного диапазона."""
+        if not objects:
+            return
+        first = reserve_pks(model)
+        for pk, obj in enumerate(objects, first):
+            obj.pk = pk
+        model.objects.bulk_create(objects)
+        # Последовательность сдвигается до снятия блокировки, чтобы
+        # обычные вставки после неё не попали в занятый диапазон.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [model]
+            ):
+                cursor.execute(sql)
+
+    def _insert_dated(self, kind, model, date_field, rows):
+        """Вставляет посты или комментарии `{ключ: объект}` с датами из файла.
+
+        `auto_now_add` при вставке ставит текущее время, поэтому даты
+        из файла записываются следующим UPDATE. Ключи строк отмечаются
+        в `ImportedRow` в той же транзакции.
+        """
+        objects = list(rows.values())
+        dates = [getattr(obj, date_field) for obj in objects]
+        self._insert(model, objects)
+        for obj, date in zip(objects, dates):
+            setattr(obj, date_field, date)
+        model.objects.bulk_update(objects, [date_field])
+        ImportedRow.objects.bulk_create(
+            ImportedRow(
+                source=self.source, kind=kind, key=key, object_id=obj.pk
+            )
+            for key, obj in rows.items()
+        )
+
+    def _imported(self, kind, keys):
+        """{ключ: pk} строк, записанных прошлыми запусками импорта."""
+        done = {}
+        keys = list(keys)
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            done.update(ImportedRow.objects.filter(
+                source=self.source,
+                kind=kind,
+                key__in=keys[start:start + LOOKUP_CHUNK_SIZE],
+            ).values_list('key', 'object_id'))
+        return done
+
+    def _split_new(self, kind, built):
+        """Отделяет новые строки от уже импортированных и повторов."""
+        done = self._imported(kind, [key for key, *_ in built])
+        new = {}
+        for key, *_, obj in built:
+            if key in done or key in new:
+                self.counts['skipped'] += 1
+            else:
+                new[key] = obj
+        return done, new
+
+    def _lookup(self, known, model, field, values):
+        """Дочитывает в словарь `known` записи, которых там ещё нет."""
+        missing = list({
+            value for value in values
+            if isinstance(value, str) and value not in known
+        })
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            known.update(model.objects.filter(**{
+                f'{field}__in': missing[start:start + LOOKUP_CHUNK_SIZE]
+            }).values_list(field, 'pk'))
+
+    def _user(self, name):
+        if name not in self.users:
+            raise ValueError(f'нет пользователя {name!r}')
+        return self.users[name]
+
+    def _build(self, rows, build):
+        objects = []
+        for line, row in rows:
+            try:
+                obj = build(row)
+            except (KeyError, TypeError, ValueError, ValidationError) as exc:
+                self.error(line, f'{row.get("type")}: {exc}')
+                continue
+            if obj is not None:
+                objects.append(obj)
+        return objects
+
+    def import_users(self, rows):
+        validate = UnicodeUsernameValidator()
+        self._lookup(
+            self.users, User, 'username',
+            [row.get('username') for _, row in rows]
+        )
+
+        def build(row):
+            username = row['username']
+            validate(username)
+            if username in self.users:
+                self.counts['skipped'] += 1
+                return None
+            user = User(
+                username=username,
+                email=row.get('email', ''),
+                first_name=row.get('first_name', ''),
+                last_name=row.get('last_name', ''),
+                password=make_password(None),
+            )
+            if row.get('date_joined'):
+                user.date_joined = parse_date(row['date_joined'])
+            self.users[username] = user
+            return user
+
+        users = self._build(rows, build)
+        self._insert(User, users)
+        for user in users:
+            self.users[user.username] = user.pk
+        self.counts['user'] += len(users)
+
+    def import_groups(self, rows):
+        self._lookup(
+            self.groups, Group, 'slug', [row.get('slug') for _, row in rows]
+        )
+
+        def build(row):
+            slug = required_text(row, 'slug')
+            if slug in self.groups:
+                self.counts['skipped'] += 1
+                return None
+            group = Group(
+                slug=slug,
+                title=required_text(row, 'title'),
+                description=row.get('description', ''),
+            )
+            group.full_clean(validate_unique=False)
+            self.groups[slug] = group
+            return group
+
+        groups = self._build(rows, build)
+        self._insert(Group, groups)
+        for group in groups:
+            self.groups[group.slug] = group.pk
+        self.counts['group'] += len(groups)
+
+    def import_posts(self, rows):
+        self._lookup(
+            self.users, User, 'username',
+            [row.get('author') for _, row in rows]
+        )
+        self._lookup(
+            self.groups, Group, 'slug',
+            [row['group'] for _, row in rows if row.get('group')]
+        )
+
+        def build(row):
+            group_id = None
+            if row.get('group'):
+                group_id = self.groups.get(row['group'])
+                if group_id is None:
+                    raise ValueError(f'нет группы {row["group"]!r}')
+            post = Post(
+                author_id=self._user(row['author']),
+                group_id=group_id,
+                text=required_text(row, 'text'),
+                pub_date=parse_date(row['date']),
+                image=row.get('image') or '',
+                views=int(row.get('views', 0)),
+            )
+            post.render_text()
+            return row_key(row), row.get('id'), post
+
+        built = self._build(rows, build)
+        done, new = self._split_new('post', built)
+        self._insert_dated('post', Post, 'pub_date', new)
+        pks = {**done, **{key: post.pk for key, post in new.items()}}
+        for key, file_id, _ in built:
+            if file_id is not None:
+                self.posts[file_id] = pks[key]
+        if new:
+            posts = list(new.values())
+            first = self.post_range[0] if self.post_range else posts[0].pk
+            self.post_range = (first, posts[-1].pk)
+        self.counts['post'] += len(new)
+
+    def import_comments(self, rows):
+        self._lookup(
+            self.users, User, 'username',
+            [row.get('author') for _, row in rows]
+        )
+
+        def build(row):
+            post_id = self.posts.get(row['post_id'])
+            if post_id is None:
+                raise ValueError(f'нет поста {row["post_id"]!r} в файле')
+            comment = Comment(
+                post_id=post_id,
+                author_id=self._user(row['author']),
+                text=required_text(row, 'text'),
+                created=parse_date(row['date']),
+            )
+            comment.render_text()
+            return row_key(row), comment
+
+        _, new = self._split_new('comment', self._build(rows, build))
+        self._insert_dated('comment', Comment, 'created', new)
+        self.counts['comment'] += len(new)
+
+    def import_follows(self, rows):
+        self._lookup(
+            self.users, User, 'username',
+            [row.get(key) for _, row in rows for key in ('user', 'author')]
+        )
+
+        def build(row):
+            user_id = self._user(row['user'])
+            author_id = self._user(row['author'])
+            if user_id == author_id:
+                raise ValueError('подписка на самого себя')
+            self.followers.add(user_id)
+            self.followed.add(author_id)
+            return Follow(user_id=user_id, author_id=author_id)
+
+        follows = self._build(rows, build)
+        # Уже существующие подписки пропускаются уникальным ограничением.
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        self.counts['follow'] += len(follows)
@@ -0,0 +1,122 @@
+"""Живые уведомления о новых постах и комментариях (Server-Sent Events).
+
+Каждое изменение увеличивает счётчик в кэше `LIVE_CACHE`: общий счётчик
+постов, счётчик постов автора и счётчик комментариев поста. Страница
+запоминает значение счётчиков, с которым она была отрисована, и
+открывает поток `/live/?feed=...&since=...`. Поток раз в
+`LIVE_POLL_INTERVAL` секунд читает свои счётчики одним `get_many` и
+присылает событие, когда сумма выросла:
+
+    event: posts
+    data: {"count": 3}
+
+Кэш общий для всех процессов (алиас 'shared'). С memcached простаивающее
+соединение не делает запросов к базе, сколько бы клиентов ни было
+подключено; запасной вариант без memcached — таблица кэша в базе, и
+тогда каждое чтение счётчиков — запрос.
+
+Соединение с базой представление закрывает до начала потока, но сам
+поток держит поток исполнения сервера, поэтому он закрывается через
+`LIVE_STREAM_TIMEOUT` секунд, и браузер переподключается сам.
+Под нагрузкой такие запросы стоит обслуживать отдельными воркерами
+с gevent или за nginx с большим числом соединений.
+"""
+import json
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.urls import reverse
+
+from .follows import followed_ids
+
+POSTS_KEY = 'live:posts'
+AUTHOR_KEY = 'live:author:{}'
+COMMENTS_KEY = 'live:comments:{}'
+
+
+def live_cache():
+    return caches[settings.LIVE_CACHE]
+
+
+def bump(keys):
+    cache = live_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            if not cache.add(key, 1, settings.LIVE_COUNTER_TIMEOUT):
+                cache.incr(key)
+
+
+def record_post(post):
+    bump([POSTS_KEY, AUTHOR_KEY.format(post.author_id)])
+
+
+def record_comment(comment):
+    bump([COMMENTS_KEY.format(comment.post_id)])
+
+
+def channel(feed, user, post_id=None):
+    """Имя события и ключи счётчиков ленты; None, если ленты нет."""
+    if feed == 'index':
+        return 'posts', [POSTS_KEY]
+    if feed == 'follow' and user.is_authenticated:
+        return 'posts', [
+            AUTHOR_KEY.format(author_id)
+            for author_id in followed_ids(user.pk)
+        ]
+    if feed == 'post' and post_id is not None:
+        return 'comments', [COMMENTS_KEY.format(post_id)]
+    return None
+
+
+def total(keys):
+    if not keys:
+        return 0
+    return sum(live_cache().get_many(keys).values())
+
+
+def live_url(feed, user, post_id=None):
+    """Адрес потока для страницы со значением счётчиков на момент отрисовки.
+
+    Значение попадает в закэшированную страницу вместе с её содержимым,
+    поэтому «новое» считается относительно того, что посетитель видит.
+    """
+    _, keys = channel(feed, user, post_id)
+    params = {'feed': feed, 'since': total(keys)}
+    if post_id is not None:
+        params['post'] = post_id
+    return f'{reverse("posts:live")}?{urlencode(params)}'
+
+
+def message(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def stream(event, keys, since):
+    """Поток событий SSE: сколько нового появилось после `since`.
+
+    Счётчики со сроком жизни могут пропасть из кэша и начаться заново;
+    тогда за точку отсчёта берётся их новое, меньшее значение.
+    """
+    deadline = time.monotonic() + settings.LIVE_STREAM_TIMEOUT
+    retry_ms = settings.LIVE_POLL_INTERVAL * 1000
+    yield f'retry: {retry_ms}\n\n'
+    sent = 0
+    last_write = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(settings.LIVE_POLL_INTERVAL)
+        current = total(keys)
+        if current < since:
+            since = current
+        new = current - since
+        if new != sent:
+            sent = new
+            last_write = time.monotonic()
+            yield message(event, {'count': new})
+        elif time.monotonic() - last_write >= settings.LIVE_HEARTBEAT:
+            # Комментарий держит соединение открытым через прокси.
+            last_write = time.monotonic()
+            yield ': ping\n\n'
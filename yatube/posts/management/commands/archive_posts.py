@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import archive_cutoff, archive_old_posts, restore_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит в архив посты старше ARCHIVE_AFTER_DAYS дней: они '
+        'пропадают из лент, но остаются на страницах поста и автора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Возраст в днях вместо ARCHIVE_AFTER_DAYS.',
+        )
+        parser.add_argument(
+            '--restore',
+            action='store_true',
+            help='Вернуть в ленты архивные посты моложе этого возраста.',
+        )
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            restored = restore_posts(archive_cutoff(options['days']))
+            self.stdout.write(self.style.SUCCESS(
+                f'Возвращено из архива: {restored}'
+            ))
+            return
+        archived = archive_old_posts(
+            options['days'],
+            on_batch=lambda total: self.stdout.write(f'В архиве: {total}')
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив: {archived}'
+        ))
@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.benchmarks import BENCHMARKS
+
+
+def parse_value(value):
+    """Число или, если через запятую, кортеж чисел."""
+    if ',' in value:
+        return tuple(int(part) for part in value.split(','))
+    return int(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает замер производительности на временной тестовой базе. '
+        'Параметры замера передаются как имя=число или имя=число,число.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS))
+        parser.add_argument('params', nargs='*', metavar='имя=значение')
+
+    def handle(self, *args, **options):
+        benchmark = BENCHMARKS[options['name']]
+        try:
+            params = {
+                key: parse_value(value) for key, value in (
+                    param.split('=', 1) for param in options['params']
+                )
+            }
+        except ValueError:
+            raise CommandError(
+                'Параметры задаются как имя=число или имя=число,число'
+            )
+        temp_dir = None
+        if (getattr(benchmark, 'needs_file_db', False)
+                and connection.vendor == 'sqlite'):
+            # Нескольким процессам нужна общая база на диске, а не в памяти.
+            temp_dir = tempfile.mkdtemp()
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                temp_dir, 'bench.sqlite3'
+            )
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            benchmark(self.stdout.write, **params)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            if temp_dir is not None:
+                connection.settings_dict['TEST']['NAME'] = None
+                os.rmdir(temp_dir)
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import build_sitemaps
+from posts.tasks import schedule_sitemap_refresh
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает куски карты сайта, которые изменились с прошлой '
+        'сборки, и индекс sitemap.xml. С --full пересобирает всё, '
+        'с --schedule ставит периодическое обновление в очередь '
+        'фоновых задач.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересобрать все куски, а не только изменившиеся.',
+        )
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='Не собирать сейчас, а поставить периодическую задачу.',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            job = schedule_sitemap_refresh()
+            self.stdout.write(self.style.SUCCESS(
+                f'Обновление запланировано на {job.run_at:%Y-%m-%d %H:%M}'
+            ))
+            return
+        names = build_sitemaps(full=options['full'])
+        for name in names:
+            self.stdout.write(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано файлов карты сайта: {len(names)}'
+        ))
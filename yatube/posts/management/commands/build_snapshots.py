@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.snapshots import flush_pending, rebuild_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает статические HTML-снимки горячих страниц. '
+        'С --pending обрабатывает только накопившиеся изменения '
+        '(удобно запускать из cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending',
+            action='store_true',
+            help='Перестроить только изменившиеся снимки.',
+        )
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            paths = flush_pending()
+        else:
+            paths = rebuild_all()
+        for path in paths:
+            self.stdout.write(path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перестроено снимков: {len(paths)}'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.snapshots import check_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что статические снимки совпадают с живыми страницами.'
+
+    def handle(self, *args, **options):
+        problems = check_snapshots()
+        for path, reason in sorted(problems.items()):
+            self.stdout.write(f'{path}: {reason}')
+        if problems:
+            raise CommandError(f'Устаревших снимков: {len(problems)}')
+        self.stdout.write(self.style.SUCCESS('Все снимки актуальны'))
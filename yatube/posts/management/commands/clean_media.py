@@ -0,0 +1,52 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts.media import delete_image, orphaned_images, orphaned_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит и удаляет картинки постов и миниатюры, на которые больше '
+        'нет ссылок. С --dry-run только печатает список.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Ничего не удалять, только показать осиротевшие файлы.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд (по умолчанию час).',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        images = self._collect(
+            orphaned_images(options['min_age']),
+            dry_run,
+            lambda name: delete_image(name, options['min_age'])
+        )
+        # Миниатюры ищем после удаления оригиналов: sorl уже убрал
+        # миниатюры удалённых картинок вместе с ними.
+        thumbnails = self._collect(
+            orphaned_thumbnails(options['min_age']),
+            dry_run,
+            default_storage.delete
+        )
+        verb = 'Найдено' if dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb}: картинок {images}, миниатюр {thumbnails}'
+        ))
+
+    def _collect(self, names, dry_run, delete):
+        count = 0
+        for name in names:
+            self.stdout.write(name)
+            if not dry_run:
+                delete(name)
+            count += 1
+        return count
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import rebuild_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «на кого подписаться».'
+
+    def handle(self, *args, **options):
+        processed = rebuild_suggestions()
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны для {processed} пользователей'
+        ))
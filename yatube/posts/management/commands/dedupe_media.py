@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import dedupe_images
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит загруженные раньше картинки постов в хранилище по '
+        'содержимому: одинаковые файлы схлопываются в один.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Ничего не менять, только показать, что будет сделано.',
+        )
+
+    def handle(self, *args, **options):
+        def report(name, new_name):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{name} -> {new_name}')
+
+        stats = dedupe_images(options['dry_run'], on_file=report)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {stats["moved"]}, совпало с уже сохранёнными: '
+            f'{stats["shared"]}, не найдено на диске: {stats["missing"]}'
+        ))
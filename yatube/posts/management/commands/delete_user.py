@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import User
+from posts.purge import request_user_deletion
+
+
+class Command(BaseCommand):
+    help = (
+        'Скрывает пользователя и его записи и ставит в очередь фоновое '
+        'удаление всей его истории.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        deletion = request_user_deletion(user)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удаление пользователя {deletion.username} поставлено в очередь'
+        ))
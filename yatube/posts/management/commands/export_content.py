@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import FORMATS, export_stream, group_content, user_content
+from posts.models import Group, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты и комментарии пользователя или группы '
+        'в JSONL или CSV, по желанию — zip вместе с картинками.'
+    )
+
+    def add_arguments(self, parser):
+        scope = parser.add_mutually_exclusive_group(required=True)
+        scope.add_argument('--user', help='Имя пользователя.')
+        scope.add_argument('--group', help='Slug группы.')
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--images',
+            action='store_true',
+            help='Собрать zip с выгрузкой и картинками постов.',
+        )
+        parser.add_argument(
+            '-o', '--output',
+            help='Файл для записи; по умолчанию — стандартный вывод.',
+        )
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден'
+                )
+            posts, comments = user_content(user)
+        else:
+            group = Group.objects.filter(slug=options['group']).first()
+            if group is None:
+                raise CommandError(f'Группа {options["group"]} не найдена')
+            posts, comments = group_content(group)
+        stream, _, _ = export_stream(
+            posts, comments, options['format'], images=options['images']
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                written = sum(output.write(chunk) for chunk in stream)
+            self.stderr.write(self.style.SUCCESS(
+                f'Записано {written} байт в {options["output"]}'
+            ))
+            return
+        for chunk in stream:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts.tags import reindex_all
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново извлекает теги и упоминания из всех постов пачками. '
+        'Уведомления об упоминаниях при этом не создаются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько постов обрабатывать за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        processed = reindex_all(
+            options['batch_size'],
+            on_batch=lambda total: self.stdout.write(f'Обработано: {total}')
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Теги и упоминания обновлены для {processed} постов'
+        ))
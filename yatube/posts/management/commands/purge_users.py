@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.purge import purge_pending
+
+
+class Command(BaseCommand):
+    help = (
+        'Доводит до конца незавершённые удаления пользователей без '
+        'обработчика задач. Прерванный запуск продолжается с того же места.'
+    )
+
+    def handle(self, *args, **options):
+        def report(deletion):
+            self.stdout.write(
+                f'{deletion.username}: комментариев '
+                f'{deletion.comments_deleted}, постов '
+                f'{deletion.posts_deleted}, подписок '
+                f'{deletion.follows_deleted}'
+            )
+
+        finished = purge_pending(on_step=report)
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено пользователей: {len(finished)}'
+        ))
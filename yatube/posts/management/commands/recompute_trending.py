@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Comment, GroupScore, Post, PostScore
+from posts.trending import fold_events, log_add, log_weight
+
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги «Популярного» с нуля по комментариям, '
+        'просмотрам и постам. С --check только сравнивает с текущими.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Не записывать, а показать расхождения.',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.01,
+            help='Допустимое расхождение (в log2) для --check.',
+        )
+
+    def post_scores(self, views_at=None):
+        comments = Comment.objects.order_by().values_list(
+            'post_id', 'created'
+        ).iterator(chunk_size=CHUNK_SIZE)
+        scores = fold_events(
+            (post_id, settings.TRENDING_COMMENT_WEIGHT, created)
+            for post_id, created in comments
+        )
+        # Время отдельных просмотров не хранится: при пересчёте они
+        # считаются случившимися в момент публикации поста (или
+        # в `views_at`), хотя на лету учитываются в момент просмотра.
+        viewed = Post.objects.filter(views__gt=0).order_by().values_list(
+            'pk', 'views', 'pub_date'
+        ).iterator(chunk_size=CHUNK_SIZE)
+        for pk, views, pub_date in viewed:
+            added = log_weight(
+                views * settings.TRENDING_VIEW_WEIGHT, views_at or pub_date
+            )
+            scores[pk] = log_add(scores[pk], added) if pk in scores else added
+        return scores
+
+    def group_scores(self):
+        posts = Post.objects.filter(group__isnull=False).order_by(
+        ).values_list('group_id', 'pub_date').iterator(chunk_size=CHUNK_SIZE)
+        return fold_events(
+            (group_id, 1, pub_date) for group_id, pub_date in posts
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            # Просмотры были где-то между публикацией и текущим моментом,
+            # поэтому рейтинг поста с просмотрами проверяется по границам.
+            self.check_scores(
+                PostScore, self.post_scores(), options['tolerance'],
+                upper=self.post_scores(views_at=timezone.now()),
+            )
+            self.check_scores(
+                GroupScore, self.group_scores(), options['tolerance']
+            )
+            return
+        for model, scores in ((PostScore, self.post_scores()),
+                              (GroupScore, self.group_scores())):
+            with transaction.atomic():
+                model.objects.all().delete()
+                model.objects.bulk_create(
+                    (model(pk=pk, score=score)
+                     for pk, score in scores.items()),
+                    batch_size=CHUNK_SIZE
+                )
+            self.stdout.write(
+                f'{model._meta.model_name}: {len(scores)} строк'
+            )
+
+    def check_scores(self, model, scores, tolerance, upper=None):
+        """Сравнивает с хранимыми; `upper` — верхние границы рейтингов."""
+        upper = upper or scores
+        stored = dict(model.objects.values_list('pk', 'score'))
+        missing = float('-inf')
+        diverged = [
+            pk for pk in set(stored) | set(scores)
+            if not (
+                scores.get(pk, missing) - tolerance
+                <= stored.get(pk, missing)
+                <= upper.get(pk, missing) + tolerance
+            )
+        ]
+        name = model._meta.model_name
+        if diverged:
+            self.stdout.write(self.style.WARNING(
+                f'{name}: расходится {len(diverged)} из {len(scores)}, '
+                f'например {sorted(diverged)[:10]}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{name}: все {len(scores)} совпадают'
+            ))
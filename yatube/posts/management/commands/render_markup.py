@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Post
+from posts.text import RENDERER_VERSION, render_stale
+
+
+class Command(BaseCommand):
+    help = (
+        'Перерисовывает сохранённый HTML постов и комментариев, '
+        'отрисованный старой версией рендерера.'
+    )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            rendered = render_stale(model)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {rendered}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'HTML обновлён до версии {RENDERER_VERSION}'
+        ))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import send_digests
+from posts.tasks import schedule_daily_digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассылает дайджесты непрочитанных уведомлений (удобно запускать '
+        'из cron раз в сутки). С --schedule ставит ежедневную рассылку '
+        'в очередь фоновых задач.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='Не рассылать сейчас, а поставить ежедневную задачу.',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            job = schedule_daily_digests()
+            self.stdout.write(self.style.SUCCESS(
+                f'Рассылка запланирована на {job.run_at:%Y-%m-%d %H:%M}'
+            ))
+            return
+        sent = send_digests(
+            on_batch=lambda total: self.stdout.write(f'Отправлено: {total}')
+        )
+        self.stdout.write(self.style.SUCCESS(f'Отправлено писем: {sent}'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts.warmup import run_warmup
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогревает кэш горячих страниц и создаёт их миниатюры (удобно '
+        'запускать после выкладки). LocMemCache у каждого процесса свой: '
+        'веб-процессы прогревают себя сами при запуске.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Сколько потоков использовать (по умолчанию '
+                 'WARMUP_WORKERS).',
+        )
+
+    def handle(self, *args, **options):
+        result = run_warmup(options['workers'])
+        for error in result['errors']:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прогрето страниц: {result["pages"]}, '
+            f'миниатюр: {result["thumbnails"]} '
+            f'за {result["seconds"]:.2f} с'
+        ))
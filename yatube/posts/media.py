@@ -0,0 +1,270 @@
+"""Картинки постов: удаление, дедупликация и поиск осиротевших файлов.
+
+Осиротевшие файлы ищутся слиянием двух отсортированных потоков — имён
+файлов на диске и имён, на которые ссылается база. Оба потока
+сортируются внешней сортировкой (отсортированные куски по
+`SORT_CHUNK_SIZE` строк во временных файлах и `heapq.merge`), поэтому
+память не зависит от числа файлов.
+"""
+import heapq
+import json
+import logging
+import os
+import posixpath
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+from .models import Post
+from .storage import content_name, file_digest
+
+logger = logging.getLogger(__name__)
+
+SORT_CHUNK_SIZE = 100000
+DEDUPE_BATCH_SIZE = 500
+CACHED_DB_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+
+
+def _recently_saved(storage, name, min_age):
+    try:
+        modified = os.path.getmtime(storage.path(name))
+    except FileNotFoundError:
+        return False
+    return time.time() - modified < min_age
+
+
+def delete_image(name, min_age=None):
+    """Удаляет картинку вместе с миниатюрами; True, если файл удалён.
+
+    Одинаковые картинки хранятся одним файлом, поэтому файл, на который
+    ещё ссылаются посты, остаётся на месте. Файлы моложе `min_age`
+    секунд (по умолчанию `IMAGE_DELETE_MIN_AGE`) тоже: их могли только
+    что загрузить снова для нового поста. Такие потом уберёт
+    `clean_media`.
+    """
+    if min_age is None:
+        min_age = settings.IMAGE_DELETE_MIN_AGE
+    storage = Post._meta.get_field('image').storage
+    with storage.content_lock():
+        if Post.objects.filter(image=name).exists():
+            return False
+        if _recently_saved(storage, name, min_age):
+            return False
+        try:
+            delete_with_thumbnails(name)
+        except (OSError, SuspiciousFileOperation):
+            logger.warning('Не удалось удалить файл %s', name, exc_info=True)
+            return False
+    return True
+
+
+def _spill(items):
+    run = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+    for item in items:
+        run.write(json.dumps(item) + '\n')
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    for line in run:
+        yield json.loads(line)
+
+
+def _unique(items):
+    previous = object()
+    for item in items:
+        if item != previous:
+            yield item
+            previous = item
+
+
+def external_sort(items, chunk_size=SORT_CHUNK_SIZE):
+    """Сортирует поток без повторов, держа в памяти не больше куска.
+
+    Элементы должны сериализоваться в JSON: строки или списки строк.
+    """
+    runs = []
+    chunk = []
+    try:
+        for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                chunk.sort()
+                runs.append(_spill(chunk))
+                chunk = []
+        chunk.sort()
+        if not runs:
+            yield from _unique(chunk)
+            return
+        runs.append(_spill(chunk))
+        chunk = []
+        yield from _unique(heapq.merge(*(_read_run(run) for run in runs)))
+    finally:
+        for run in runs:
+            run.close()
+
+
+def merge_join(left, right, key=lambda item: item):
+    """Пары (элемент left, есть ли его ключ в right).
+
+    Оба потока отсортированы; `right` — по самим значениям, `left` —
+    по `key`.
+    """
+    right = iter(right)
+    current = next(right, None)
+    for item in left:
+        item_key = key(item)
+        while current is not None and current < item_key:
+            current = next(right, None)
+        yield item, current == item_key
+
+
+def iter_media_files(directory, min_age=0):
+    """Имена файлов в `MEDIA_ROOT/<directory>` относительно MEDIA_ROOT.
+
+    Файлы моложе `min_age` секунд пропускаются: их могли только что
+    записать, а строку в базе — ещё не сохранить.
+    """
+    root = settings.MEDIA_ROOT
+    deadline = time.time() - min_age
+    stack = [os.path.join(root, directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.stat(follow_symlinks=False).st_mtime <= deadline:
+                    yield os.path.relpath(
+                        entry.path, root
+                    ).replace(os.sep, '/')
+
+
+def _image_names():
+    return Post.objects.exclude(image='').values_list(
+        'image', flat=True
+    ).iterator(chunk_size=SORT_CHUNK_SIZE // 10)
+
+
+def orphaned_images(min_age=0):
+    """Оригиналы в каталоге картинок постов, на которые нет ссылок."""
+    upload_to = Post._meta.get_field('image').upload_to
+    for name, referenced in merge_join(
+        external_sort(iter_media_files(upload_to, min_age)),
+        external_sort(_image_names()),
+    ):
+        if not referenced:
+            yield name
+
+
+def _kvstore_rows(identity):
+    prefix = add_prefix('', identity)
+    return KVStore.objects.filter(key__startswith=prefix).values_list(
+        'key', 'value'
+    ).iterator(chunk_size=SORT_CHUNK_SIZE // 10)
+
+
+def _live_thumbnail_names():
+    """Имена миниатюр, принадлежащих картинкам существующих постов.
+
+    Соединяет три потока по ключам хранилища sorl: ключи живых
+    оригиналов, списки миниатюр оригиналов и имена миниатюр по ключам.
+    """
+    storage = Post._meta.get_field('image').storage
+    source_keys = external_sort(
+        ImageFile(name, storage).key for name in _image_names()
+    )
+    thumbnail_lists = external_sort(
+        [del_prefix(key), thumbnail_key]
+        for key, value in _kvstore_rows('thumbnails')
+        for thumbnail_key in json.loads(value)
+    )
+    live_thumbnail_keys = external_sort(
+        thumbnail_key
+        for (_, thumbnail_key), live in merge_join(
+            thumbnail_lists, source_keys, key=lambda pair: pair[0]
+        )
+        if live
+    )
+    images = external_sort(
+        [del_prefix(key), json.loads(value)['name']]
+        for key, value in _kvstore_rows('image')
+    )
+    return external_sort(
+        name
+        for (_, name), live in merge_join(
+            images, live_thumbnail_keys, key=lambda pair: pair[0]
+        )
+        if live
+    )
+
+
+def orphaned_thumbnails(min_age=0):
+    """Миниатюры, чьих оригиналов больше нет в базе.
+
+    Работает только с хранилищем ключей sorl в базе (`cached_db`, по
+    умолчанию); с другими хранилищами ничего не возвращает.
+    """
+    if thumbnail_settings.THUMBNAIL_KVSTORE != CACHED_DB_KVSTORE:
+        logger.warning('Миниатюры не проверяются: хранилище ключей не в базе')
+        return
+    for name, live in merge_join(
+        external_sort(iter_media_files(
+            thumbnail_settings.THUMBNAIL_PREFIX, min_age
+        )),
+        _live_thumbnail_names(),
+    ):
+        if not live:
+            yield name
+
+
+def dedupe_images(dry_run=False, on_file=None):
+    """Переносит картинки со старыми именами в хранилище по содержимому.
+
+    Имена обходятся по возрастанию пачками, поэтому прерванный запуск
+    можно просто повторить: уже перенесённые файлы пропускаются.
+    Возвращает счётчики перенесённых, совпавших и пропавших файлов.
+    """
+    storage = Post._meta.get_field('image').storage
+    stats = {'moved': 0, 'shared': 0, 'missing': 0}
+    last = ''
+    while True:
+        names = list(Post.objects.filter(image__gt=last).order_by(
+            'image'
+        ).values_list('image', flat=True).distinct()[:DEDUPE_BATCH_SIZE])
+        if not names:
+            return stats
+        last = names[-1]
+        for name in names:
+            if storage.is_content_addressed(name):
+                continue
+            try:
+                with storage.open(name) as original:
+                    new_name = content_name(
+                        posixpath.dirname(name), file_digest(original), name
+                    )
+                    shared = storage.exists(new_name)
+                    if not shared and not dry_run:
+                        storage.save(name, original)
+            except (OSError, SuspiciousFileOperation):
+                stats['missing'] += 1
+                continue
+            stats['shared' if shared else 'moved'] += 1
+            if on_file is not None:
+                on_file(name, new_name)
+            if dry_run:
+                continue
+            Post.objects.filter(image=name).update(image=new_name)
+            # Под старыми именами файлы больше не сохраняются.
+            delete_image(name, min_age=0)
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDeletion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=150, verbose_name='Имя пользователя')),
+                ('requested', models.DateTimeField(auto_now_add=True, verbose_name='Запрошено')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('comments_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено комментариев')),
+                ('posts_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено постов')),
+                ('follows_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено подписок')),
+                ('files_deleted', models.PositiveIntegerField(default=0, verbose_name='Удалено файлов')),
+                ('user', models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deletion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Удаление пользователя',
+                'verbose_name_plural': 'Удаления пользователей',
+                'ordering': ['-requested'],
+            },
+        ),
+    ]
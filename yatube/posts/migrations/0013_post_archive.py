@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_archived',
+            field=models.BooleanField(default=False, editable=False, verbose_name='В архиве'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(is_archived=False), fields=['-pub_date'], name='posts_post_hot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(is_archived=False), fields=['group', '-pub_date'], name='posts_post_hot_group_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:44
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+EXCERPT_LENGTH = 300
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    # Копия posts.text.make_excerpt на момент миграции: миграция не должна
+    # меняться вместе с кодом приложения.
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip('.,;:!?-—–') + '…'
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    last_pk = 0
+    while True:
+        posts = list(Post.objects.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).only('pk', 'text')[:BATCH_SIZE])
+        if not posts:
+            break
+        for post in posts:
+            post.excerpt = make_excerpt(post.text)
+        Post.objects.bulk_update(posts, ['excerpt'])
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=301, verbose_name='Отрывок'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_renderer',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия рендерера'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_renderer',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия рендерера'),
+        ),
+    ]
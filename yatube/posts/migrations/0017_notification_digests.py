@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_tags_mentions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='is_emailed',
+            field=models.BooleanField(default=False, verbose_name='Отправлено в дайджесте'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('mention', 'Упоминание'), ('post', 'Новая запись')], max_length=16, verbose_name='Тип'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(is_read=False), fields=['user', 'is_emailed'], name='posts_notification_unread_idx'),
+        ),
+    ]
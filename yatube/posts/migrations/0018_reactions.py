@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_notification_digests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReactionCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', '👍'), ('fire', '🔥'), ('sad', '😢')], max_length=8)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reaction_counters', to='posts.Post')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('like', '👍'), ('fire', '🔥'), ('sad', '😢')], max_length=8, verbose_name='Реакция')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Реакция',
+                'verbose_name_plural': 'Реакции',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reactioncounter',
+            constraint=models.UniqueConstraint(fields=('post', 'kind', 'shard'), name='unique_reaction_counter'),
+        ),
+        migrations.AddConstraint(
+            model_name='reaction',
+            constraint=models.UniqueConstraint(fields=('user', 'post', 'kind'), name='unique_reaction'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkAction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('delete_posts', 'Удаление постов'), ('move_posts', 'Перенос постов в группу'), ('delete_comments', 'Удаление комментариев')], max_length=32, verbose_name='Действие')),
+                ('selection', models.BinaryField()),
+                ('requested', models.DateTimeField(auto_now_add=True, verbose_name='Запрошено')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Всего')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('last_pk', models.PositiveIntegerField(default=0, editable=False)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Group', verbose_name='Группа')),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кто запустил')),
+            ],
+            options={
+                'verbose_name': 'Массовое действие',
+                'verbose_name_plural': 'Массовые действия',
+                'ordering': ['-requested'],
+            },
+        ),
+    ]
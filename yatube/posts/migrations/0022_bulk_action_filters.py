@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:41
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def finish_pending(apps, schema_editor):
+    # Выборку в старом формате не восстановить: незавершённые действия
+    # закрываются, их нужно запустить из админки заново.
+    BulkAction = apps.get_model('posts', 'BulkAction')
+    BulkAction.objects.filter(finished__isnull=True).update(
+        finished=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_bulk_actions'),
+    ]
+
+    operations = [
+        migrations.RunPython(finish_pending, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='bulkaction',
+            name='selection',
+        ),
+        migrations.AddField(
+            model_name='bulkaction',
+            name='filters',
+            field=models.TextField(blank=True, editable=False, verbose_name='Выборка'),
+        ),
+        migrations.AddField(
+            model_name='bulkaction',
+            name='max_pk',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_bulk_action_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, verbose_name='Источник')),
+                ('kind', models.CharField(max_length=16, verbose_name='Тип')),
+                ('key', models.CharField(max_length=64, verbose_name='Ключ')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id в базе')),
+            ],
+            options={
+                'verbose_name': 'Импортированная строка',
+                'verbose_name_plural': 'Импортированные строки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importedrow',
+            constraint=models.UniqueConstraint(fields=('source', 'kind', 'key'), name='unique_imported_row'),
+        ),
+    ]
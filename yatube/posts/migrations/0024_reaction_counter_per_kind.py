@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:55
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def merge_shards(apps, schema_editor):
+    # Части счётчика складываются в одну строку с shard=0, после чего
+    # поле и старое ограничение можно убрать.
+    ReactionCounter = apps.get_model('posts', 'ReactionCounter')
+    totals = list(ReactionCounter.objects.values(
+        'post_id', 'kind'
+    ).annotate(total=Sum('count')).order_by())
+    ReactionCounter.objects.all().delete()
+    ReactionCounter.objects.bulk_create(
+        ReactionCounter(
+            post_id=row['post_id'], kind=row['kind'], shard=0,
+            count=row['total']
+        )
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_imported_rows'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_shards, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='reactioncounter',
+            name='unique_reaction_counter',
+        ),
+        migrations.RemoveField(
+            model_name='reactioncounter',
+            name='shard',
+        ),
+        migrations.AddConstraint(
+            model_name='reactioncounter',
+            constraint=models.UniqueConstraint(fields=('post', 'kind'), name='unique_reaction_counter'),
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+from .text import (ELLIPSIS, EXCERPT_LENGTH, RENDERER_VERSION, make_excerpt,
+                   plain_text, render_markup)
+
 User = get_user_model()
 
 
@@ -13,12 +17,30 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Посты без авторов, удалённых или ожидающих удаления."""
+        return self.filter(author__is_active=True)
+
+    def hot(self):
+        """Посты, ещё не ушедшие в архив; по ним строятся ленты."""
+        return self.filter(is_archived=False)
+
+    def for_list(self):
+        """Посты для лент: вместо полного текста хватает отрывка."""
+        return self.defer('text')
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
     )
-    pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    pub_date = models.DateTimeField(
+        'Дата публикации',
+        auto_now_add=True,
+        db_index=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -37,17 +59,91 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True
+    )
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False
+    )
+    text_html = models.TextField(
+        'Текст в HTML',
+        blank=True,
+        editable=False
+    )
+    text_renderer = models.PositiveSmallIntegerField(
+        'Версия рендерера',
+        default=0,
+        editable=False
     )
+    excerpt = models.CharField(
+        'Отрывок',
+        max_length=EXCERPT_LENGTH + len(ELLIPSIS),
+        blank=True,
+        editable=False
+    )
+    is_archived = models.BooleanField(
+        'В архиве',
+        default=False,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Частичные индексы покрывают только горячие посты: ленты читают
+        # их, не касаясь архивной части таблицы.
+        indexes = [
+            models.Index(
+                fields=['-pub_date'],
+                name='posts_post_hot_idx',
+                condition=models.Q(is_archived=False),
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='posts_post_hot_group_idx',
+                condition=models.Q(is_archived=False),
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    RENDERED_FIELDS = ('text_html', 'text_renderer', 'excerpt')
+
+    @property
+    def is_truncated(self):
+        return self.excerpt.endswith(ELLIPSIS)
+
+    def render_text(self):
+        self.text_html = render_markup(self.text)
+        self.text_renderer = RENDERER_VERSION
+        self.excerpt = make_excerpt(plain_text(self.text_html))
+
+    def save(self, *args, **kwargs):
+        deferred = self.get_deferred_fields()
+        update_fields = kwargs.get('update_fields')
+        if 'text' not in deferred:
+            self.render_text()
+            if update_fields is not None and 'text' in update_fields:
+                kwargs['update_fields'] = {
+                    *update_fields, *self.RENDERED_FIELDS
+                }
+        # Просмотры прибавляет только сброс буфера (posts.counters), иначе
+        # сохранение формы затёрло бы их значением, прочитанным раньше.
+        if not self._state.adding and update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'views'
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -61,7 +157,19 @@ class Comment(models.Model):
         related_name='comments',
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    text_html = models.TextField(
+        'Текст в HTML',
+        blank=True,
+        editable=False
+    )
+    text_renderer = models.PositiveSmallIntegerField(
+        'Версия рендерера',
+        default=0,
+        editable=False
+    )
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    RENDERED_FIELDS = ('text_html', 'text_renderer')
 
     class Meta:
         ordering = ['-created']
@@ -71,6 +179,20 @@ class Comment(models.Model):
     def __str__(self):
         return self.text[:15]
 
+    def render_text(self):
+        self.text_html = render_markup(self.text)
+        self.text_renderer = RENDERER_VERSION
+
+    def save(self, *args, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.render_text()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'text' in update_fields:
+                kwargs['update_fields'] = {
+                    *update_fields, *self.RENDERED_FIELDS
+                }
+        super().save(*args, **kwargs)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -93,3 +215,318 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class PostScore(models.Model):
+    """Рейтинг поста для «Популярного», см. posts.trending."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+    )
+    score = models.FloatField(db_index=True)
+
+
+class GroupScore(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+    )
+    score = models.FloatField(db_index=True)
+
+
+class FollowSuggestion(models.Model):
+    """Автор, на которого стоит подписаться; считается пакетно."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow_suggestion'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'],
+                name='posts_suggestion_user_idx'
+            ),
+        ]
+
+
+class UserDeletion(models.Model):
+    """Заявка на удаление пользователя и ход фоновой очистки."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='deletion',
+    )
+    username = models.CharField('Имя пользователя', max_length=150)
+    requested = models.DateTimeField('Запрошено', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+    comments_deleted = models.PositiveIntegerField(
+        'Удалено комментариев', default=0
+    )
+    posts_deleted = models.PositiveIntegerField('Удалено постов', default=0)
+    follows_deleted = models.PositiveIntegerField(
+        'Удалено подписок', default=0
+    )
+    files_deleted = models.PositiveIntegerField('Удалено файлов', default=0)
+
+    class Meta:
+        ordering = ['-requested']
+        verbose_name = 'Удаление пользователя'
+        verbose_name_plural = 'Удаления пользователей'
+
+    def __str__(self):
+        return self.username
+
+
+class BulkAction(models.Model):
+    """Массовое действие из админки и ход его выполнения в фоне."""
+    DELETE_POSTS = 'delete_posts'
+    MOVE_POSTS = 'move_posts'
+    DELETE_COMMENTS = 'delete_comments'
+    ACTIONS = (
+        (DELETE_POSTS, 'Удаление постов'),
+        (MOVE_POSTS, 'Перенос постов в группу'),
+        (DELETE_COMMENTS, 'Удаление комментариев'),
+    )
+
+    action = models.CharField('Действие', max_length=32, choices=ACTIONS)
+    # Параметры адреса списка в админке: выборка «все N объектов»
+    # хранится без списка из миллионов id и строится заново фильтрами
+    # списка; строки новее `max_pk` в неё не входят.
+    filters = models.TextField('Выборка', blank=True, editable=False)
+    max_pk = models.PositiveIntegerField(default=0, editable=False)
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Группа',
+        related_name='+',
+    )
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        verbose_name='Кто запустил',
+        related_name='+',
+    )
+    requested = models.DateTimeField('Запрошено', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', null=True, blank=True)
+    total = models.PositiveIntegerField('Всего', null=True, blank=True)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    last_pk = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ['-requested']
+        verbose_name = 'Массовое действие'
+        verbose_name_plural = 'Массовые действия'
+
+    def __str__(self):
+        return f'{self.get_action_display()} №{self.pk}'
+
+
+class Tag(models.Model):
+    name = models.CharField('Тег', max_length=64, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Тег поста; дата поста скопирована сюда для индекса ленты тега."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='post_tags',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'tag'],
+                name='unique_post_tag'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', '-pub_date'],
+                name='posts_posttag_feed_idx'
+            ),
+        ]
+
+
+class PostMention(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='mentions',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'user'],
+                name='unique_post_mention'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='posts_mention_user_idx'
+            ),
+        ]
+
+
+class Notification(models.Model):
+    MENTION = 'mention'
+    NEW_POST = 'post'
+    KINDS = (
+        (MENTION, 'Упоминание'),
+        (NEW_POST, 'Новая запись'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    kind = models.CharField('Тип', max_length=16, choices=KINDS)
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    is_read = models.BooleanField('Прочитано', default=False)
+    is_emailed = models.BooleanField('Отправлено в дайджесте', default=False)
+
+    class Meta:
+        ordering = ['-created']
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        indexes = [
+            models.Index(
+                fields=['user', '-created'],
+                name='posts_notification_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'is_emailed'],
+                name='posts_notification_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
+
+
+class Reaction(models.Model):
+    LIKE = 'like'
+    FIRE = 'fire'
+    SAD = 'sad'
+    KINDS = (
+        (LIKE, '👍'),
+        (FIRE, '🔥'),
+        (SAD, '😢'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+    )
+    kind = models.CharField('Реакция', max_length=8, choices=KINDS)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Реакция'
+        verbose_name_plural = 'Реакции'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post', 'kind'],
+                name='unique_reaction'
+            )
+        ]
+
+
+class ReactionCounter(models.Model):
+    """Число реакций одного вида на пост (posts.reactions)."""
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='reaction_counters',
+    )
+    kind = models.CharField(max_length=8, choices=Reaction.KINDS)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'kind'],
+                name='unique_reaction_counter'
+            )
+        ]
+
+
+class ImportedRow(models.Model):
+    """Строка файла импорта, уже записанная в базу (posts.importer)."""
+    source = models.CharField('Источник', max_length=255)
+    kind = models.CharField('Тип', max_length=16)
+    key = models.CharField('Ключ', max_length=64)
+    object_id = models.PositiveIntegerField('id в базе')
+
+    class Meta:
+        verbose_name = 'Импортированная строка'
+        verbose_name_plural = 'Импортированные строки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'kind', 'key'],
+                name='unique_imported_row'
+            )
+        ]
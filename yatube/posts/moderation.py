@@ -0,0 +1,179 @@
+"""Массовые действия модерации пачками в фоне.
+
+Админка только сохраняет параметры выборки в `BulkAction` и ставит
+задачу `run_bulk_action`. Задача проходит выборку по возрастанию
+первичного ключа пачками по `MODERATION_BATCH_SIZE` строк, каждая
+пачка — в своей короткой транзакции. Удаление идёт одним `DELETE` на
+таблицу без загрузки объектов и рассылки сигналов, поэтому кэши
+страниц, снимки и файлы картинок обновляются здесь же, один раз на
+пачку после её фиксации. Версия кэша страниц лежит в общем кэше,
+поэтому сброс из воркера видят все процессы сайта.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.db import models, transaction
+from django.db.models import F, Max
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.urls import reverse
+from django.utils import timezone
+
+from . import snapshots
+from .caching import invalidate_page_cache
+from .media import delete_image
+from .models import BulkAction, Comment, Notification, Post
+from .notifications import forget_unread
+
+MODELS = {
+    BulkAction.DELETE_POSTS: Post,
+    BulkAction.MOVE_POSTS: Post,
+    BulkAction.DELETE_COMMENTS: Comment,
+}
+
+
+def start_bulk_action(action, filters, user, group=None):
+    """Сохраняет выборку и ставит действие в очередь.
+
+    `filters` — строка параметров списка изменений в админке, как в его
+    адресе; отмеченные вручную строки передаются как `pk__in=1,2,3`.
+    """
+    from .tasks import schedule_bulk_action
+
+    bulk = BulkAction.objects.create(
+        action=action,
+        filters=filters,
+        max_pk=MODELS[action]._base_manager.aggregate(
+            last=Max('pk')
+        )['last'] or 0,
+        group=group,
+        requested_by=user,
+    )
+    schedule_bulk_action(bulk.pk)
+    return bulk
+
+
+def selection(bulk):
+    """Выборка действия: те же фильтры и поиск, что у списка в админке."""
+    model_admin = admin.site._registry[MODELS[bulk.action]]
+    return model_admin.selection(
+        bulk.filters, bulk.requested_by
+    ).filter(pk__lte=bulk.max_pk)
+
+
+def bulk_delete(queryset):
+    """Удаляет строки вместе с зависимыми, по одному DELETE на таблицу.
+
+    Сигналы `post_delete` не отправляются. Поддерживаются только связи
+    с `CASCADE`, `SET_NULL` и `DO_NOTHING`, остальное — ошибка.
+    """
+    # Те же связи, что обходит Collector, включая скрытые (related_name='+').
+    for relation in get_candidate_relations_to_delete(queryset.model._meta):
+        related = relation.related_model._base_manager.filter(**{
+            f'{relation.field.name}__in': queryset.values('pk')
+        })
+        if relation.on_delete is models.CASCADE:
+            bulk_delete(related)
+        elif relation.on_delete is models.SET_NULL:
+            related.update(**{relation.field.name: None})
+        elif relation.on_delete is not models.DO_NOTHING:
+            raise ValueError(f'Связь {relation} нельзя удалить пачкой')
+    return queryset._raw_delete(queryset.db)
+
+
+def _mark_snapshots(paths):
+    if settings.SNAPSHOTS_ENABLED and paths:
+        from .tasks import schedule_snapshot_flush
+
+        snapshots.mark_dirty(paths)
+        schedule_snapshot_flush()
+
+
+def _post_paths(post_ids):
+    if not settings.SNAPSHOTS_ENABLED:
+        return []
+    posts = Post.objects.filter(pk__in=post_ids).select_related(
+        'author', 'group'
+    ).only('pk', 'author__username', 'group__slug')
+    return [path for post in posts for path in snapshots.paths_for_post(post)]
+
+
+def delete_posts(post_ids, bulk):
+    posts = Post.objects.filter(pk__in=post_ids)
+    images = list(
+        posts.exclude(image='').values_list('image', flat=True).distinct()
+    )
+    readers = list(Notification.objects.filter(
+        post_id__in=post_ids, is_read=False
+    ).values_list('user_id', flat=True).distinct())
+    paths = _post_paths(post_ids)
+    bulk_delete(posts)
+    return [
+        lambda: _mark_snapshots(paths),
+        lambda: forget_unread(readers),
+        lambda: _delete_files(images),
+    ]
+
+
+def _delete_files(images):
+    for name in images:
+        delete_image(name)
+
+
+def move_posts(post_ids, bulk):
+    paths = _post_paths(post_ids)
+    Post.objects.filter(pk__in=post_ids).update(group=bulk.group)
+    paths += _post_paths(post_ids)
+    return [lambda: _mark_snapshots(paths)]
+
+
+def delete_comments(comment_ids, bulk):
+    comments = Comment.objects.filter(pk__in=comment_ids)
+    paths = []
+    if settings.SNAPSHOTS_ENABLED:
+        paths = [
+            reverse('posts:post_detail', args=(post_id,))
+            for post_id in comments.values_list(
+                'post_id', flat=True
+            ).distinct()
+        ]
+    bulk_delete(comments)
+    return [lambda: _mark_snapshots(paths)]
+
+
+HANDLERS = {
+    BulkAction.DELETE_POSTS: delete_posts,
+    BulkAction.MOVE_POSTS: move_posts,
+    BulkAction.DELETE_COMMENTS: delete_comments,
+}
+
+
+def bulk_action_step(bulk):
+    """Обрабатывает одну пачку; возвращает False, когда выборка пройдена."""
+    if bulk.total is None:
+        bulk.total = selection(bulk).count()
+        BulkAction.objects.filter(pk=bulk.pk).update(total=bulk.total)
+        return True
+    with transaction.atomic():
+        ids = list(selection(bulk).filter(
+            pk__gt=bulk.last_pk
+        ).order_by('pk').values_list(
+            'pk', flat=True
+        )[:settings.MODERATION_BATCH_SIZE])
+        if not ids:
+            bulk.finished = timezone.now()
+            BulkAction.objects.filter(pk=bulk.pk).update(
+                finished=bulk.finished
+            )
+            return False
+        # Обработчик возвращает то, что нужно сделать после фиксации
+        # пачки: сбросить кэши, отметить снимки, удалить файлы.
+        after_commit = HANDLERS[bulk.action](ids, bulk)
+        bulk.last_pk = ids[-1]
+        bulk.processed += len(ids)
+        BulkAction.objects.filter(pk=bulk.pk).update(
+            last_pk=bulk.last_pk,
+            processed=F('processed') + len(ids)
+        )
+    invalidate_page_cache()
+    for callback in after_commit:
+        callback()
+    return True
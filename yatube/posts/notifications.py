@@ -0,0 +1,158 @@
+"""Уведомления о новых записях и упоминаниях.
+
+Уведомления подписчикам пишутся фоновой задачей пачками: один
+`bulk_create` на `NOTIFY_BATCH_SIZE` подписчиков. Число непрочитанных
+хранится в общем кэше (`NOTIFICATION_CACHE`) по пользователю; новые
+уведомления, прочтение и массовое удаление сбрасывают ключи, а
+каскадные удаления видны не позже чем через `UNREAD_CACHE_TIMEOUT`.
+Непрочитанные уведомления раз в день уходят письмом-дайджестом;
+дайджест отмечает их отправленными, но не прочитанными, поэтому
+счётчик не меняет.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Follow, Notification, User
+
+
+UNREAD_KEY = 'notifications:unread:{}'
+
+
+def notification_cache():
+    return caches[settings.NOTIFICATION_CACHE]
+
+
+def unread_count(user_id):
+    cache = notification_cache()
+    key = UNREAD_KEY.format(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(
+            user_id=user_id, is_read=False
+        ).count()
+        cache.set(key, count, settings.UNREAD_CACHE_TIMEOUT)
+    return count
+
+
+def forget_unread(user_ids):
+    keys = [UNREAD_KEY.format(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    notification_cache().delete_many(keys)
+    # Параллельный запрос мог успеть положить в кэш данные до коммита.
+    transaction.on_commit(lambda: notification_cache().delete_many(keys))
+
+
+def notify(kind, post, user_ids):
+    if not user_ids:
+        return
+    Notification.objects.bulk_create(
+        Notification(
+            user_id=user_id,
+            kind=kind,
+            actor_id=post.author_id,
+            post_id=post.pk,
+        )
+        for user_id in user_ids
+    )
+    forget_unread(user_ids)
+
+
+def notify_followers(post):
+    """Уведомляет всех подписчиков автора; возвращает их число."""
+    notified = 0
+    last_pk = 0
+    while True:
+        batch = list(Follow.objects.filter(
+            author_id=post.author_id,
+            user__is_active=True,
+            pk__gt=last_pk
+        ).order_by('pk').values_list(
+            'pk', 'user_id'
+        )[:settings.NOTIFY_BATCH_SIZE])
+        if not batch:
+            return notified
+        last_pk = batch[-1][0]
+        notify(
+            Notification.NEW_POST, post, [user_id for _, user_id in batch]
+        )
+        notified += len(batch)
+
+
+def mark_read(user_id, notification_ids):
+    updated = Notification.objects.filter(
+        user_id=user_id, pk__in=notification_ids, is_read=False
+    ).update(is_read=True)
+    if updated:
+        forget_unread([user_id])
+
+
+def _digest_message(user, items, total):
+    context = {
+        'user': user,
+        'items': items,
+        'more': total - len(items),
+        'site_url': settings.SITE_URL,
+    }
+    return EmailMessage(
+        f'Yatube: {total} новых уведомлений',
+        render_to_string('posts/email/digest.txt', context),
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+
+
+def send_digests(on_batch=None):
+    """Рассылает дайджесты непрочитанных уведомлений.
+
+    Пользователи читаются пачками по `DIGEST_BATCH_SIZE`, письма пачки
+    уходят через одно соединение `EMAIL_BACKEND`; в памяти не больше
+    `DIGEST_MAX_ITEMS` уведомлений на пользователя пачки.
+    """
+    started = timezone.now()
+    sent = 0
+    last_pk = 0
+    connection = get_connection()
+    while True:
+        users = list(User.objects.filter(
+            is_active=True, pk__gt=last_pk
+        ).exclude(email='').order_by('pk').only(
+            'pk', 'username', 'email'
+        )[:settings.DIGEST_BATCH_SIZE])
+        if not users:
+            return sent
+        last_pk = users[-1].pk
+        pending = Notification.objects.filter(
+            user__in=users,
+            is_read=False,
+            is_emailed=False,
+            created__lte=started,
+            actor__is_active=True,
+        )
+        items = {}
+        totals = {}
+        for notification in pending.select_related(
+            'actor', 'post'
+        ).only(
+            'user', 'kind', 'created', 'actor__username', 'post__excerpt'
+        ).order_by('user_id', '-created').iterator():
+            totals[notification.user_id] = (
+                totals.get(notification.user_id, 0) + 1
+            )
+            shown = items.setdefault(notification.user_id, [])
+            if len(shown) < settings.DIGEST_MAX_ITEMS:
+                shown.append(notification)
+        messages = [
+            _digest_message(user, items[user.pk], totals[user.pk])
+            for user in users if user.pk in items
+        ]
+        if messages:
+            connection.send_messages(messages)
+            pending.update(is_emailed=True)
+        sent += len(messages)
+        if on_batch is not None:
+            on_batch(sent)
@@ -0,0 +1,149 @@
+"""Удаление пользователя с историей ограниченными пачками.
+
+`request_user_deletion` сразу скрывает пользователя и его контент
+(`is_active=False`), а фоновая задача `purge_user` удаляет реакции,
+уведомления, упоминания, комментарии, посты, подписки и картинки
+пачками по `PURGE_BATCH_SIZE` строк — каждая в своей короткой
+транзакции, чтобы не держать блокировку SQLite.
+Что осталось удалить, каждый шаг узнаёт из базы, поэтому очистку можно
+прервать и продолжить с любого места.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .caching import invalidate_page_cache
+from .media import delete_image
+from .notifications import forget_unread
+from .models import (Comment, Follow, FollowSuggestion, Notification, Post,
+                     PostMention, Reaction, UserDeletion)
+from .reactions import remove_reactions
+
+
+def request_user_deletion(user):
+    """Сразу скрывает пользователя и ставит в очередь его удаление."""
+    from .tasks import schedule_purge
+
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        deletion, _ = UserDeletion.objects.get_or_create(
+            user=user,
+            defaults={'username': user.username}
+        )
+    invalidate_page_cache()
+    schedule_purge(deletion.pk)
+    return deletion
+
+
+def _batch(queryset):
+    return list(queryset.order_by().values_list(
+        'pk', flat=True
+    )[:settings.PURGE_BATCH_SIZE])
+
+
+def _progress(deletion, **counters):
+    UserDeletion.objects.filter(pk=deletion.pk).update(**{
+        name: F(name) + value for name, value in counters.items()
+    })
+
+
+def purge_step(deletion):
+    """Удаляет одну пачку; возвращает False, когда удалять больше нечего."""
+    user_id = deletion.user_id
+    if user_id is None:
+        # Пользователя уже удалили другим путём (например, из админки).
+        _finish(deletion)
+        return False
+    with transaction.atomic():
+        reaction_ids = _batch(Reaction.objects.filter(user_id=user_id))
+        if reaction_ids:
+            # Через каскад счётчики реакций остались бы завышенными.
+            remove_reactions(reaction_ids)
+            return True
+        # Уведомления и упоминания удалились бы каскадом от пользователя
+        # или его постов — все сразу, одной большой транзакцией.
+        notification_ids = _batch(Notification.objects.filter(
+            Q(user_id=user_id) | Q(actor_id=user_id)
+        ))
+        if notification_ids:
+            notifications = Notification.objects.filter(
+                pk__in=notification_ids
+            )
+            # Чужие счётчики непрочитанных тоже уменьшаются.
+            readers = set(notifications.filter(
+                is_read=False
+            ).values_list('user_id', flat=True))
+            notifications.delete()
+            forget_unread(readers)
+            return True
+        mention_ids = _batch(PostMention.objects.filter(
+            Q(user_id=user_id) | Q(post__author_id=user_id)
+        ))
+        if mention_ids:
+            PostMention.objects.filter(pk__in=mention_ids).delete()
+            return True
+        comment_ids = _batch(Comment.objects.filter(author_id=user_id))
+        if comment_ids:
+            Comment.objects.filter(pk__in=comment_ids).delete()
+            _progress(deletion, comments_deleted=len(comment_ids))
+            return True
+        post_ids = _batch(Post.objects.filter(author_id=user_id))
+        if post_ids:
+            # Сначала чужие комментарии к этим постам, чтобы каскад от
+            # удаления постов тоже оставался в пределах пачки.
+            comment_ids = _batch(Comment.objects.filter(post_id__in=post_ids))
+            if comment_ids:
+                Comment.objects.filter(pk__in=comment_ids).delete()
+                _progress(deletion, comments_deleted=len(comment_ids))
+                return True
+            images = list(Post.objects.filter(
+                pk__in=post_ids
+            ).exclude(image='').values_list('image', flat=True))
+            Post.objects.filter(pk__in=post_ids).delete()
+            _progress(deletion, posts_deleted=len(post_ids))
+            transaction.on_commit(lambda: _delete_files(deletion, images))
+            return True
+        follow_ids = _batch(Follow.objects.filter(
+            Q(user_id=user_id) | Q(author_id=user_id)
+        ))
+        if follow_ids:
+            Follow.objects.filter(pk__in=follow_ids).delete()
+            _progress(deletion, follows_deleted=len(follow_ids))
+            return True
+        suggestion_ids = _batch(FollowSuggestion.objects.filter(
+            Q(user_id=user_id) | Q(author_id=user_id)
+        ))
+        if suggestion_ids:
+            FollowSuggestion.objects.filter(pk__in=suggestion_ids).delete()
+            return True
+        deletion.user.delete()
+        _finish(deletion)
+    return False
+
+
+def _finish(deletion):
+    deletion.finished = timezone.now()
+    UserDeletion.objects.filter(pk=deletion.pk).update(
+        finished=deletion.finished
+    )
+
+
+def purge_pending(on_step=None):
+    """Доводит до конца все незавершённые удаления в текущем процессе."""
+    deletions = UserDeletion.objects.filter(finished__isnull=True)
+    finished = []
+    for deletion in deletions.order_by('requested'):
+        while purge_step(deletion):
+            if on_step is not None:
+                deletion.refresh_from_db()
+                on_step(deletion)
+        finished.append(deletion)
+    return finished
+
+
+def _delete_files(deletion, images):
+    deleted = sum(delete_image(name) for name in images)
+    if deleted:
+        _progress(deletion, files_deleted=deleted)
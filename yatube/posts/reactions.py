@@ -0,0 +1,176 @@
+"""Реакции на посты со счётчиками, буферизованными в общем кэше.
+
+Сама реакция — строка `Reaction` с уникальностью (user, post, kind).
+Итоговое число реакций поста хранится в `ReactionCounter`, по строке
+на вид реакции. При `REACTION_BUFFER` запрос не трогает эту строку:
+реакция прибавляет единицу к счётчику «добавлено» или «снято» в кэше
+`REACTION_CACHE` и ставит отложенную задачу `flush_reactions`, которая
+через `REACTION_FLUSH_DELAY` секунд пересчитывает строки счётчиков
+поста одним запросом по таблице реакций. Поэтому потерянные или
+повторённые приращения в кэше не накапливают ошибку: после сброса
+счётчик снова точен. До сброса при чтении к сохранённому числу
+прибавляется то, что накопилось в кэше; для страницы ленты это один
+запрос к базе и одно обращение к кэшу.
+
+Без буфера счётчик обновляется в той же транзакции, что и реакция.
+Под SQLite это почти ничего не стоит: запись и так одна на всю базу,
+и разносить счётчик по нескольким строкам бесполезно.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Reaction, ReactionCounter
+
+ADDED_KEY = 'reactions:added:{}:{}'
+REMOVED_KEY = 'reactions:removed:{}:{}'
+SCHEDULED_KEY = 'reactions:scheduled:{}'
+
+
+def reaction_cache():
+    return caches[settings.REACTION_CACHE]
+
+
+def _pending_keys(post_ids):
+    return [
+        template.format(post_id, kind)
+        for post_id in post_ids
+        for kind, _ in Reaction.KINDS
+        for template in (ADDED_KEY, REMOVED_KEY)
+    ]
+
+
+def bump_counter(post_id, kind, delta):
+    counter = ReactionCounter.objects.filter(post_id=post_id, kind=kind)
+    if not counter.update(count=F('count') + delta):
+        ReactionCounter.objects.bulk_create(
+            [ReactionCounter(post_id=post_id, kind=kind)],
+            ignore_conflicts=True
+        )
+        counter.update(count=F('count') + delta)
+
+
+def _buffer(post_id, kind, added):
+    """Запоминает реакцию в кэше и ставит сброс счётчиков поста."""
+    from .tasks import schedule_reaction_flush
+
+    cache = reaction_cache()
+    key = (ADDED_KEY if added else REMOVED_KEY).format(post_id, kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+    # Задача уже стоит в очереди, если флажок ещё жив: не обращаемся
+    # к таблице задач на каждую реакцию.
+    if cache.add(SCHEDULED_KEY.format(post_id), 1,
+                 settings.REACTION_FLUSH_DELAY):
+        schedule_reaction_flush(post_id)
+
+
+def _count(post_id, kind, added):
+    if settings.REACTION_BUFFER:
+        transaction.on_commit(lambda: _buffer(post_id, kind, added))
+    else:
+        bump_counter(post_id, kind, 1 if added else -1)
+
+
+def toggle_reaction(user, post_id, kind):
+    """Ставит реакцию или снимает уже стоящую; True, если поставлена."""
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                Reaction.objects.create(user=user, post_id=post_id, kind=kind)
+        except IntegrityError:
+            deleted, _ = Reaction.objects.filter(
+                user=user, post_id=post_id, kind=kind
+            ).delete()
+            # Ту же реакцию мог одновременно снять другой запрос.
+            if deleted:
+                _count(post_id, kind, added=False)
+            return False
+        _count(post_id, kind, added=True)
+        return True
+
+
+def recount(post_ids):
+    """Пересчитывает сохранённые счётчики постов по таблице реакций."""
+    with transaction.atomic():
+        totals = Reaction.objects.filter(post_id__in=post_ids).values_list(
+            'post_id', 'kind'
+        ).annotate(total=Count('pk')).order_by()
+        ReactionCounter.objects.filter(post_id__in=post_ids).delete()
+        ReactionCounter.objects.bulk_create(
+            ReactionCounter(post_id=post_id, kind=kind, count=total)
+            for post_id, kind, total in totals
+        )
+
+
+def flush_buffer(post_ids):
+    """Переносит накопленные в кэше реакции в счётчики постов."""
+    cache = reaction_cache()
+    # Кэш читается до пересчёта: всё, что в нём есть, уже записано в
+    # базу и попадёт в пересчёт. Вычитается ровно прочитанное, а
+    # пришедшее после останется до следующего сброса.
+    pending = cache.get_many(_pending_keys(post_ids))
+    recount(post_ids)
+    for key, value in pending.items():
+        if value:
+            cache.decr(key, value)
+
+
+def remove_reactions(reaction_ids):
+    """Удаляет реакции и пересчитывает счётчики их постов."""
+    with transaction.atomic():
+        post_ids = set(Reaction.objects.filter(
+            pk__in=reaction_ids
+        ).values_list('post_id', flat=True))
+        Reaction.objects.filter(pk__in=reaction_ids).delete()
+        recount(post_ids)
+
+
+def reaction_counts(post_ids):
+    """`{post_id: {kind: count}}`: один запрос к базе и один к кэшу."""
+    totals = defaultdict(lambda: defaultdict(int))
+    rows = ReactionCounter.objects.filter(
+        post_id__in=post_ids
+    ).values_list('post_id', 'kind', 'count')
+    for post_id, kind, count in rows:
+        totals[post_id][kind] += count
+    if settings.REACTION_BUFFER and post_ids:
+        pending = reaction_cache().get_many(_pending_keys(post_ids))
+        for post_id in post_ids:
+            for kind, _ in Reaction.KINDS:
+                totals[post_id][kind] += (
+                    pending.get(ADDED_KEY.format(post_id, kind), 0)
+                    - pending.get(REMOVED_KEY.format(post_id, kind), 0)
+                )
+    counts = defaultdict(dict)
+    for post_id, kinds in totals.items():
+        for kind, total in kinds.items():
+            if total > 0:
+                counts[post_id][kind] = total
+    return counts
+
+
+def attach_reactions(posts):
+    """Проставляет постам `reactions_summary`: [(значок, kind, число)]."""
+    posts = list(posts)
+    counts = reaction_counts([post.pk for post in posts])
+    for post in posts:
+        post.reactions_summary = [
+            (label, kind, counts[post.pk].get(kind, 0))
+            for kind, label in Reaction.KINDS
+        ]
+    return posts
+
+
+def user_reactions(user, post_id):
+    if not user.is_authenticated:
+        return set()
+    return set(Reaction.objects.filter(
+        user=user, post_id=post_id
+    ).values_list('kind', flat=True))
@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import follows, live, snapshots, tags, trending
+from .tasks import schedule_follower_notifications, schedule_snapshot_flush
+from .caching import invalidate_pages, post_page_scopes
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_init, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    # Пост могут перенести в другую группу — её страницы тоже устареют.
+    # Отложенное поле не читаем: это был бы запрос на каждый пост.
+    if 'group_id' not in instance.get_deferred_fields():
+        instance._previous_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def expire_post_pages(sender, instance, **kwargs):
+    invalidate_pages(post_page_scopes(
+        instance, getattr(instance, '_previous_group_id', None)
+    ))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_comment_pages(sender, instance, **kwargs):
+    invalidate_pages([f'post:{instance.post_id}'])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def expire_group_pages(sender, instance, **kwargs):
+    invalidate_pages([f'group:{instance.slug}'])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def mark_post_snapshots(sender, instance, **kwargs):
+    if settings.SNAPSHOTS_ENABLED:
+        snapshots.mark_dirty(snapshots.paths_for_post(
+            instance, getattr(instance, '_previous_group_id', None)
+        ))
+        schedule_snapshot_flush()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def mark_comment_snapshots(sender, instance, **kwargs):
+    if settings.SNAPSHOTS_ENABLED:
+        snapshots.mark_dirty(
+            [reverse('posts:post_detail', args=(instance.post_id,))]
+        )
+        schedule_snapshot_flush()
+
+
+@receiver(post_save, sender=Comment)
+def score_comment(sender, instance, created, **kwargs):
+    if created:
+        trending.record_comment(instance)
+
+
+@receiver(post_save, sender=Post)
+def score_post(sender, instance, created, **kwargs):
+    if created:
+        trending.record_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_live_post(sender, instance, created, **kwargs):
+    if created:
+        live.record_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_live_comment(sender, instance, created, **kwargs):
+    if created:
+        live.record_comment(instance)
+
+
+@receiver(post_save, sender=Post)
+def notify_followers(sender, instance, created, **kwargs):
+    if created:
+        schedule_follower_notifications(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def index_tags(sender, instance, update_fields, **kwargs):
+    if 'text' in instance.get_deferred_fields():
+        return
+    if update_fields is not None and 'text' not in update_fields:
+        return
+    tags.index_posts([instance])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def uncache_follow(sender, instance, **kwargs):
+    follows.forget_follows([instance.user_id], [instance.author_id])
+    # На странице автора показано число подписчиков.
+    if instance.author_id is not None:
+        invalidate_pages([f'profile:{instance.author.username}'])
@@ -0,0 +1,216 @@
+"""Карты сайта для постов, профилей и групп.
+
+Адреса делятся на куски по диапазонам первичного ключа: кусок `n`
+раздела `posts` — это посты с pk от `n * SITEMAP_CHUNK_SIZE` до
+`(n + 1) * SITEMAP_CHUNK_SIZE - 1`, поэтому в файле не больше
+`SITEMAP_CHUNK_SIZE` адресов (протокол разрешает до 50 000), а выборка
+куска идёт по индексу pk без OFFSET. Строки читаются через `.iterator()`
+и сразу пишутся в файл, так что память не зависит от размера таблиц.
+
+Файлы лежат в `SITEMAP_ROOT` и могут отдаваться nginx напрямую:
+
+    location = /sitemap.xml { root /var/www/yatube/sitemaps; }
+    location /sitemaps/ { alias /var/www/yatube/sitemaps/; }
+
+При обновлении для каждого раздела одним запросом с GROUP BY считается
+отпечаток всех кусков (число строк, сумма pk, последняя дата) и
+сравнивается с `manifest.json`. Пересобираются только куски, чей
+отпечаток изменился, поэтому изменения в обход сигналов (импорт,
+массовая модерация, удаление пользователей) тоже замечаются.
+Переименование группы или пользователя отпечаток не меняет — такие
+правки подхватывает полная пересборка (`build_sitemaps --full`).
+"""
+import json
+import os
+from datetime import datetime, timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, Max, Sum
+from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+from .files import remove_file, write_atomic
+from .models import Group, Post, User
+
+INDEX_NAME = 'sitemap.xml'
+MANIFEST_NAME = 'manifest.json'
+QUERY_CHUNK_SIZE = 2000
+# Подходит под конвертеры int, slug и str.
+PLACEHOLDER = '918273645546372819'
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def url_template(view_name):
+    """Разбирает адрес вида на части до и после единственного аргумента.
+
+    `reverse()` на каждую из миллионов строк стоит дороже самой выборки,
+    поэтому адрес раскрывается один раз, а аргумент подставляется
+    с тем же экранированием, что делает `reverse()`.
+    """
+    prefix, suffix = reverse(view_name, args=(PLACEHOLDER,)).split(
+        PLACEHOLDER
+    )
+    safe = RFC3986_SUBDELIMS + '/~:@'
+    return lambda value: prefix + quote(str(value), safe=safe) + suffix
+
+
+class Section:
+    """Раздел карты: какие строки брать и по какому виду строить адреса."""
+
+    def __init__(self, name, queryset, fields, view_name, date_field=None):
+        self.name = name
+        self.queryset = queryset
+        self.fields = fields
+        self.view_name = view_name
+        self.date_field = date_field
+
+    def rows(self):
+        return self.queryset()
+
+    def fingerprints(self, size):
+        """Отпечатки всех непустых кусков одним агрегирующим запросом."""
+        aggregates = {'count': Count('pk'), 'pk_sum': Sum('pk')}
+        if self.date_field:
+            aggregates['lastmod'] = Max(self.date_field)
+        rows = self.rows().annotate(
+            chunk=F('pk') / size
+        ).order_by('chunk').values('chunk').annotate(**aggregates)
+        return {
+            str(row['chunk']): [
+                row['count'],
+                row['pk_sum'],
+                row['lastmod'].isoformat() if row.get('lastmod') else None,
+            ]
+            for row in rows
+        }
+
+    def entries(self, number, size):
+        rows = self.rows().filter(
+            pk__gte=number * size, pk__lt=(number + 1) * size
+        ).order_by('pk').values_list(*self.fields)
+        location = url_template(self.view_name)
+        for row in rows.iterator(chunk_size=QUERY_CHUNK_SIZE):
+            yield location(row[0]), row[-1] if self.date_field else None
+
+
+SECTIONS = (
+    Section(
+        'posts',
+        lambda: Post.objects.visible(),
+        ('pk', 'pub_date'),
+        'posts:post_detail',
+        date_field='pub_date',
+    ),
+    Section(
+        'profiles',
+        lambda: User.objects.filter(is_active=True),
+        ('username',),
+        'posts:profile',
+    ),
+    Section(
+        'groups',
+        lambda: Group.objects.all(),
+        ('slug',),
+        'posts:group_list',
+    ),
+)
+
+
+def absolute(path):
+    return escape(settings.SITE_URL.rstrip('/') + path)
+
+
+def chunk_name(section, number):
+    return f'{section}-{number}.xml'
+
+
+def chunk_file(name):
+    return os.path.join(settings.SITEMAP_ROOT, name)
+
+
+def load_manifest():
+    try:
+        with open(chunk_file(MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest):
+    write_atomic(
+        chunk_file(MANIFEST_NAME),
+        json.dumps(manifest, indent=2).encode()
+    )
+
+
+def write_chunk(section, number, size):
+    """Пишет файл куска построчно и возвращает число адресов в нём."""
+    filename = chunk_file(chunk_name(section.name, number))
+    os.makedirs(settings.SITEMAP_ROOT, exist_ok=True)
+    tmp_name = f'{filename}.tmp{os.getpid()}'
+    urls = 0
+    with open(tmp_name, 'w', encoding='utf-8') as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="{XMLNS}">\n'
+        )
+        for path, lastmod in section.entries(number, size):
+            f.write(f'<url><loc>{absolute(path)}</loc>')
+            if lastmod is not None:
+                f.write(f'<lastmod>{lastmod.date().isoformat()}</lastmod>')
+            f.write('</url>\n')
+            urls += 1
+        f.write('</urlset>\n')
+    os.replace(tmp_name, filename)
+    return urls
+
+
+def write_index(manifest):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<sitemapindex xmlns="{XMLNS}">\n',
+    ]
+    for section in SECTIONS:
+        chunks = manifest.get(section.name, {})
+        for number in sorted(chunks, key=int):
+            name = chunk_name(section.name, number)
+            lines.append(
+                f'<sitemap><loc>{absolute("/sitemaps/" + name)}</loc>'
+                f'<lastmod>{chunks[number]["built"]}</lastmod></sitemap>\n'
+            )
+    lines.append('</sitemapindex>\n')
+    write_atomic(chunk_file(INDEX_NAME), ''.join(lines).encode())
+
+
+def build_sitemaps(full=False):
+    """Пересобирает изменившиеся куски и индекс; возвращает имена файлов.
+
+    С `full=True` пересобираются все куски независимо от отпечатков.
+    """
+    size = settings.SITEMAP_CHUNK_SIZE
+    manifest = load_manifest()
+    if manifest.get('chunk_size') != size:
+        full = True
+        manifest = {}
+    manifest['chunk_size'] = size
+    built = []
+    now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    for section in SECTIONS:
+        known = manifest.setdefault(section.name, {})
+        fingerprints = section.fingerprints(size)
+        for number in set(known) - set(fingerprints):
+            remove_file(chunk_file(chunk_name(section.name, number)))
+            del known[number]
+        for number, fingerprint in fingerprints.items():
+            if not full and known.get(number, {}).get('fingerprint') == (
+                fingerprint
+            ):
+                continue
+            write_chunk(section, int(number), size)
+            known[number] = {'fingerprint': fingerprint, 'built': now}
+            built.append(chunk_name(section.name, number))
+    write_index(manifest)
+    save_manifest(manifest)
+    return built
@@ -0,0 +1,233 @@
+"""Статические HTML-снимки горячих страниц для анонимных посетителей.
+
+Снимки лежат в `SNAPSHOT_ROOT` в виде `<путь>/index.html`, поэтому
+nginx может отдавать их напрямую:
+
+    location / {
+        try_files /snapshots$uri/index.html @django;
+    }
+
+Изменения постов и комментариев дописывают затронутые адреса в журнал
+`pending.log` и ставят фоновую задачу, которая через `SNAPSHOT_DEBOUNCE`
+секунд перестраивает накопившиеся снимки. Без обработчика задач то же
+делает `build_snapshots --pending` из cron.
+"""
+import hashlib
+import json
+import os
+import time
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import Http404, HttpResponseNotFound
+from django.urls import reverse
+
+from .caching import anonymous_request
+from .files import remove_file, write_atomic
+from .models import Group, Post, User
+
+MANIFEST_NAME = 'manifest.json'
+PENDING_NAME = 'pending.log'
+
+
+def snapshot_paths():
+    paths = [reverse('posts:index')]
+    groups = Group.objects.annotate(
+        posts_count=Count('posts')
+    ).filter(posts_count__gt=0).order_by('-posts_count')
+    paths += [
+        reverse('posts:group_list', args=(slug,))
+        for slug in groups.values_list(
+            'slug', flat=True
+        )[:settings.SNAPSHOT_TOP_GROUPS]
+    ]
+    authors = User.objects.annotate(
+        posts_count=Count('posts')
+    ).filter(posts_count__gt=0).order_by('-posts_count')
+    paths += [
+        reverse('posts:profile', args=(username,))
+        for username in authors.values_list(
+            'username', flat=True
+        )[:settings.SNAPSHOT_TOP_AUTHORS]
+    ]
+    posts = Post.objects.annotate(
+        comments_count=Count('comments')
+    ).filter(comments_count__gt=0).order_by('-comments_count')
+    paths += [
+        reverse('posts:post_detail', args=(pk,))
+        for pk in posts.values_list(
+            'pk', flat=True
+        )[:settings.SNAPSHOT_TOP_POSTS]
+    ]
+    return paths
+
+
+def paths_for_post(post, previous_group_id=None):
+    """Страницы с постом; при переносе — и страница прежней группы."""
+    paths = [
+        reverse('posts:index'),
+        reverse('posts:profile', args=(post.author.username,)),
+        reverse('posts:post_detail', args=(post.pk,)),
+    ]
+    if post.group_id:
+        paths.append(reverse('posts:group_list', args=(post.group.slug,)))
+    if previous_group_id not in (None, post.group_id):
+        paths += [
+            reverse('posts:group_list', args=(slug,))
+            for slug in Group.objects.filter(
+                pk=previous_group_id
+            ).values_list('slug', flat=True)
+        ]
+    return paths
+
+
+def snapshot_file(path):
+    return os.path.join(
+        settings.SNAPSHOT_ROOT, path.strip('/'), 'index.html'
+    )
+
+
+def render_anonymous(path):
+    """Отрисовывает страницу так, как её увидит анонимный посетитель."""
+    request = anonymous_request(path)
+    view, args, kwargs = request.resolver_match
+    try:
+        response = view(request, *args, **kwargs)
+    except Http404:
+        return HttpResponseNotFound()
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def load_manifest():
+    try:
+        with open(os.path.join(settings.SNAPSHOT_ROOT, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest):
+    write_atomic(
+        os.path.join(settings.SNAPSHOT_ROOT, MANIFEST_NAME),
+        json.dumps(manifest, ensure_ascii=False, indent=2).encode()
+    )
+
+
+def build_snapshot(path, manifest):
+    """Перестраивает один снимок; возвращает False, если его не стало."""
+    response = render_anonymous(path)
+    filename = snapshot_file(path)
+    if response.status_code != 200:
+        remove_file(filename)
+        manifest.pop(path, None)
+        return False
+    write_atomic(filename, response.content)
+    manifest[path] = {
+        'sha256': hashlib.sha256(response.content).hexdigest(),
+        'built': time.time(),
+    }
+    return True
+
+
+def rebuild_all():
+    manifest = load_manifest()
+    paths = snapshot_paths()
+    for stale_path in set(manifest) - set(paths):
+        remove_file(snapshot_file(stale_path))
+        del manifest[stale_path]
+    built = [path for path in paths if build_snapshot(path, manifest)]
+    save_manifest(manifest)
+    return built
+
+
+def _append_pending(entries):
+    """Дописывает записи в журнал; короткая запись с O_APPEND атомарна."""
+    lines = ''.join(f'{marked:.3f} {path}\n' for path, marked in entries)
+    os.makedirs(settings.SNAPSHOT_ROOT, exist_ok=True)
+    fd = os.open(
+        os.path.join(settings.SNAPSHOT_ROOT, PENDING_NAME),
+        os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+        0o644
+    )
+    try:
+        os.write(fd, lines.encode())
+    finally:
+        os.close(fd)
+
+
+def mark_dirty(paths):
+    now = time.time()
+    _append_pending((path, now) for path in paths)
+
+
+def _take_pending():
+    pending_file = os.path.join(settings.SNAPSHOT_ROOT, PENDING_NAME)
+    taken_file = f'{pending_file}.{os.getpid()}'
+    try:
+        os.replace(pending_file, taken_file)
+    except FileNotFoundError:
+        return {}
+    pending = {}
+    with open(taken_file) as f:
+        for line in f:
+            marked, path = line.rstrip('\n').split(' ', 1)
+            pending.setdefault(path, float(marked))
+    os.remove(taken_file)
+    return pending
+
+
+def has_pending():
+    return os.path.exists(os.path.join(settings.SNAPSHOT_ROOT, PENDING_NAME))
+
+
+def flush_pending(debounce=None):
+    """Перестраивает снимки, изменения которых успели «устояться».
+
+    Пересобираются только уже существующие снимки: набор горячих
+    страниц определяет полная пересборка.
+    """
+    if debounce is None:
+        debounce = settings.SNAPSHOT_DEBOUNCE
+    pending = _take_pending()
+    deadline = time.time() - debounce
+    not_ready = [
+        (path, marked) for path, marked in pending.items()
+        if marked > deadline
+    ]
+    manifest = load_manifest()
+    rebuilt = [
+        path for path, marked in pending.items()
+        if marked <= deadline
+        and path in manifest
+        and build_snapshot(path, manifest)
+    ]
+    save_manifest(manifest)
+    if not_ready:
+        _append_pending(not_ready)
+    return rebuilt
+
+
+def check_snapshots():
+    """Сравнивает снимки на диске со свежей отрисовкой страниц.
+
+    Возвращает словарь `{путь: причина}` для всех расхождений.
+    """
+    manifest = load_manifest()
+    problems = {}
+    for path in snapshot_paths():
+        filename = snapshot_file(path)
+        if not os.path.exists(filename):
+            problems[path] = 'missing'
+            continue
+        with open(filename, 'rb') as f:
+            on_disk = f.read()
+        response = render_anonymous(path)
+        if response.status_code != 200 or response.content != on_disk:
+            problems[path] = 'stale'
+        elif manifest.get(path, {}).get('sha256') != (
+            hashlib.sha256(on_disk).hexdigest()
+        ):
+            problems[path] = 'not in manifest'
+    return problems
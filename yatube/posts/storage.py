@@ -0,0 +1,79 @@
+"""Хранилище картинок, адресуемых по содержимому.
+
+Файл сохраняется под именем `<каталог>/ab/cd/<sha256>.<расширение>`,
+где хэш считается по содержимому кусками прямо во время загрузки.
+Одинаковые загрузки получают одно и то же имя, поэтому у них общий
+оригинал и общий набор миниатюр sorl (миниатюры привязаны к имени).
+
+Сохранение и удаление (`posts.media.delete_image`) проходят под общей
+файловой блокировкой `content_lock`. Загрузка уже существующего файла
+обновляет его время изменения: пост, который вот-вот на него сошлётся,
+ещё не записан в базу, и удаление не трогает свежие файлы.
+"""
+import fcntl
+import hashlib
+import os
+import posixpath
+import uuid
+from contextlib import contextmanager
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def content_name(directory, digest, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return posixpath.join(
+        directory, digest[:2], digest[2:4], f'{digest}{extension}'
+    )
+
+
+def file_digest(content):
+    sha256 = hashlib.sha256()
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+LOCK_NAME = '.content.lock'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменит хэш содержимого, а совпадение имён
+        # означает совпадение содержимого — переименовывать нечего.
+        return name
+
+    @contextmanager
+    def content_lock(self):
+        """Блокировка между процессами на проверку и удаление файлов."""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, LOCK_NAME), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        name = content_name(directory, file_digest(content), name)
+        with self.content_lock():
+            if self.exists(name):
+                os.utime(self.path(name))
+                return name
+        # Пишем во временный файл и атомарно переименовываем: параллельная
+        # загрузка того же файла не увидит его недописанным. Блокировку
+        # на время записи не держим — новый файл и так свежий.
+        tmp_name = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(tmp_name), self.path(name))
+        return name
+
+    def is_content_addressed(self, name):
+        digest = posixpath.splitext(posixpath.basename(name))[0]
+        return (
+            len(digest) == 64
+            and all(char in '0123456789abcdef' for char in digest)
+            and name.endswith(content_name('', digest, name))
+        )
@@ -0,0 +1,104 @@
+"""Индекс тегов и упоминаний в текстах постов.
+
+Теги и упоминания извлекаются из текста при сохранении поста и
+складываются в таблицы `PostTag` и `PostMention` вместе с датой поста:
+лента тега — это выборка по индексу `(tag, -pub_date)`, а не поиск
+`LIKE '%#тег%'` по всем текстам.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from . import notifications
+from .models import Notification, Post, PostMention, PostTag, Tag, User
+from .text import extract_mentions, extract_tags
+
+
+def _tag_ids(names):
+    Tag.objects.bulk_create(
+        (Tag(name=name) for name in names), ignore_conflicts=True
+    )
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+def index_posts(posts, notify=True):
+    """Обновляет теги и упоминания пачки постов.
+
+    Новым упомянутым пользователям создаются уведомления, если
+    `notify` не выключен (при переиндексации старых постов).
+    """
+    tags = {post.pk: extract_tags(post.text) for post in posts}
+    mentions = {post.pk: extract_mentions(post.text) for post in posts}
+    all_tags = set().union(*tags.values())
+    all_mentions = set().union(*mentions.values())
+    with transaction.atomic():
+        tag_ids = _tag_ids(all_tags) if all_tags else {}
+        user_ids = dict(User.objects.filter(
+            username__in=all_mentions, is_active=True
+        ).values_list('username', 'pk')) if all_mentions else {}
+        PostTag.objects.filter(post__in=posts).delete()
+        PostTag.objects.bulk_create(
+            PostTag(post=post, tag_id=tag_ids[name], pub_date=post.pub_date)
+            for post in posts
+            for name in tags[post.pk]
+        )
+        wanted = {
+            (post.pk, user_ids[name])
+            for post in posts
+            for name in mentions[post.pk]
+            if name in user_ids and user_ids[name] != post.author_id
+        }
+        existing = set(PostMention.objects.filter(
+            post__in=posts
+        ).values_list('post_id', 'user_id'))
+        removed = Q()
+        for post_id, user_id in existing - wanted:
+            removed |= Q(post_id=post_id, user_id=user_id)
+        if removed:
+            PostMention.objects.filter(removed).delete()
+        by_pk = {post.pk: post for post in posts}
+        added = sorted(wanted - existing)
+        PostMention.objects.bulk_create(
+            PostMention(
+                post_id=post_id,
+                user_id=user_id,
+                pub_date=by_pk[post_id].pub_date
+            )
+            for post_id, user_id in added
+        )
+        if notify:
+            for post in posts:
+                notifications.notify(Notification.MENTION, post, [
+                    user_id for post_id, user_id in added
+                    if post_id == post.pk
+                ])
+
+
+def reindex_all(batch_size=500, on_batch=None, pk_range=None):
+    """Переиндексирует посты потоковыми пачками по pk.
+
+    `pk_range` — пара (первый, последний) pk, если нужны не все посты.
+    """
+    processed = 0
+    last_pk = 0
+    queryset = Post.objects.all()
+    if pk_range is not None:
+        last_pk = pk_range[0] - 1
+        queryset = queryset.filter(pk__lte=pk_range[1])
+    while True:
+        posts = list(queryset.filter(pk__gt=last_pk).order_by(
+            'pk'
+        ).only('pk', 'text', 'author_id', 'pub_date')[:batch_size])
+        if not posts:
+            return processed
+        index_posts(posts, notify=False)
+        last_pk = posts[-1].pk
+        processed += len(posts)
+        if on_batch is not None:
+            on_batch(processed)
+
+
+def tag_feed(tag):
+    """Посты тега от новых к старым по индексу `(tag, -pub_date)`."""
+    return Post.objects.visible().hot().for_list().filter(
+        post_tags__tag=tag
+    ).order_by('-post_tags__pub_date')
@@ -0,0 +1,144 @@
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+from core.jobs import enqueue, task
+
+from . import (moderation, notifications, purge, reactions, sitemaps,
+               snapshots, suggestions)
+from .models import BulkAction, Post, UserDeletion
+
+# Должно совпадать с параметрами тега {% thumbnail %} в шаблонах.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+DIGEST_INTERVAL = 24 * 60 * 60
+
+
+@task
+def generate_thumbnails(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+@task
+def flush_snapshots():
+    snapshots.flush_pending()
+    if snapshots.has_pending():
+        schedule_snapshot_flush()
+
+
+def schedule_snapshot_flush():
+    enqueue(
+        flush_snapshots,
+        key='snapshots:flush',
+        delay=settings.SNAPSHOT_DEBOUNCE,
+    )
+
+
+@task
+def flush_reactions(post_id):
+    reactions.flush_buffer([post_id])
+
+
+def schedule_reaction_flush(post_id):
+    enqueue(
+        flush_reactions,
+        args=(post_id,),
+        key=f'reactions:flush:{post_id}',
+        delay=settings.REACTION_FLUSH_DELAY,
+    )
+
+
+@task
+def compute_suggestions():
+    suggestions.rebuild_suggestions()
+
+
+@task
+def purge_user(deletion_id):
+    """Удаляет несколько пачек и, если осталось ещё, ставит себя снова."""
+    deletion = UserDeletion.objects.filter(
+        pk=deletion_id, finished__isnull=True
+    ).first()
+    if deletion is None:
+        return
+    for _ in range(settings.PURGE_STEPS_PER_JOB):
+        if not purge.purge_step(deletion):
+            return
+    schedule_purge(deletion_id)
+
+
+def schedule_purge(deletion_id):
+    enqueue(
+        purge_user,
+        args=(deletion_id,),
+        key=f'purge_user:{deletion_id}',
+        priority=-10,
+    )
+
+
+@task
+def notify_followers(post_id):
+    post = Post.objects.filter(pk=post_id).only('pk', 'author_id').first()
+    if post is not None:
+        notifications.notify_followers(post)
+
+
+def schedule_follower_notifications(post_id):
+    enqueue(notify_followers, args=(post_id,), key=f'notify:{post_id}')
+
+
+@task
+def send_daily_digests():
+    """Рассылает дайджесты и ставит следующую рассылку через сутки."""
+    notifications.send_digests()
+    schedule_daily_digests(delay=DIGEST_INTERVAL)
+
+
+def schedule_daily_digests(delay=None):
+    return enqueue(
+        send_daily_digests,
+        key='digests:daily',
+        delay=delay,
+        priority=-10,
+    )
+
+
+@task
+def run_bulk_action(bulk_id):
+    """Обрабатывает несколько пачек и, если осталось ещё, ставит себя снова."""
+    bulk = BulkAction.objects.filter(
+        pk=bulk_id, finished__isnull=True
+    ).first()
+    if bulk is None:
+        return
+    for _ in range(settings.MODERATION_STEPS_PER_JOB):
+        if not moderation.bulk_action_step(bulk):
+            return
+    schedule_bulk_action(bulk_id)
+
+
+def schedule_bulk_action(bulk_id):
+    enqueue(
+        run_bulk_action,
+        args=(bulk_id,),
+        key=f'bulk_action:{bulk_id}',
+        priority=-5,
+    )
+
+
+@task
+def refresh_sitemaps():
+    """Пересобирает изменившиеся куски карты сайта и ставит себя снова."""
+    sitemaps.build_sitemaps()
+    schedule_sitemap_refresh(delay=settings.SITEMAP_REFRESH_INTERVAL)
+
+
+def schedule_sitemap_refresh(delay=None):
+    return enqueue(
+        refresh_sitemaps,
+        key='sitemaps:refresh',
+        delay=delay,
+        priority=-10,
+    )
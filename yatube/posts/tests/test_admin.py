@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@ya.ru', password='pass'
+        )
+        self.client.force_login(self.admin)
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def add_posts(self, count):
+        start = Post.objects.count()
+        for number in range(start, start + count):
+            author = User.objects.create_user(username=f'author{number}')
+            post = Post.objects.create(
+                author=author, group=self.group, text=f'Пост {number}'
+            )
+            Comment.objects.create(post=post, author=author, text='Текст')
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_posts(2)
+        few = {
+            model: self.changelist_queries(model)
+            for model in ('post', 'comment')
+        }
+        self.add_posts(8)
+        for model, queries in few.items():
+            self.assertEqual(self.changelist_queries(model), queries)
+
+    @override_settings(ADMIN_ESTIMATE_THRESHOLD=1)
+    def test_unfiltered_changelist_uses_estimate(self):
+        self.add_posts(3)
+        Post.objects.filter(text='Пост 1').delete()
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url)
+        last_pk = Post.objects.latest('pk').pk
+        self.assertEqual(response.context['cl'].result_count, last_pk)
+        response = self.client.get(url, {'q': 'Пост 2'})
+        self.assertEqual(response.context['cl'].result_count, 1)
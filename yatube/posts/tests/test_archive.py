@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_old_posts
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(ARCHIVE_AFTER_DAYS=30, ARCHIVE_BATCH_SIZE=2)
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        posts = [
+            Post.objects.create(
+                author=self.author, group=self.group, text=f'Пост {number}'
+            )
+            for number in range(5)
+        ]
+        self.fresh = posts[0]
+        self.old = posts[1:]
+        Post.objects.filter(pk__in=[post.pk for post in self.old]).update(
+            pub_date=timezone.now() - timedelta(days=60)
+        )
+        self.client = Client()
+
+    def test_old_posts_leave_feeds(self):
+        self.assertEqual(archive_old_posts(), 4)
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_list', args=(self.group.slug,))):
+            response = self.client.get(url)
+            self.assertEqual(list(response.context['page_obj']), [self.fresh])
+
+    def test_archived_posts_still_resolve(self):
+        archive_old_posts()
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.old[0].pk,))
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+    def test_feed_uses_hot_index(self):
+        plan = Post.objects.hot().order_by('-pub_date')[:10].explain()
+        self.assertIn('posts_post_hot_idx', plan)
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..counters import ViewCounter, view_counter
+from ..models import Post
+
+User = get_user_model()
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.other_post = Post.objects.create(
+            author=cls.user, text='Другой пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        view_counter.flush()
+
+    def test_views_are_buffered_until_threshold(self):
+        counter = ViewCounter(flush_size=2, flush_interval=3600)
+        counter.add(self.post.pk)
+        counter.add(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+        counter.add(self.other_post.pk)
+        self.post.refresh_from_db()
+        self.other_post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+        self.assertEqual(self.other_post.views, 1)
+
+    def test_post_detail_counts_cached_views(self):
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        for _ in range(3):
+            self.client.get(url)
+        view_counter.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
+
+    def test_saving_post_keeps_flushed_views(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        counter = ViewCounter(flush_size=1, flush_interval=3600)
+        counter.add(self.post.pk, 5)
+        stale.text = 'Отредактированный пост'
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 5)
+        self.assertEqual(self.post.text, 'Отредактированный пост')
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.models import Job
+
+from ..models import (Comment, Follow, Group, Notification, Post, PostMention,
+                      UserDeletion)
+from ..notifications import unread_count
+from ..purge import purge_pending, purge_step, request_user_deletion
+from ..tasks import purge_user
+
+User = get_user_model()
+
+
+@override_settings(PURGE_BATCH_SIZE=2, PURGE_STEPS_PER_JOB=3)
+class UserDeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.user = User.objects.create_user(username='leaving')
+        self.other = User.objects.create_user(username='staying')
+        posts = [
+            Post.objects.create(
+                author=self.user, text=f'Пост {number}', group=self.group
+            )
+            for number in range(3)
+        ]
+        self.kept = Post.objects.create(author=self.other, text='Останется')
+        for post in posts:
+            Comment.objects.create(post=post, author=self.other, text='Чужой')
+        Comment.objects.create(post=self.kept, author=self.user, text='Свой')
+        Follow.objects.create(user=self.user, author=self.other)
+        Follow.objects.create(user=self.other, author=self.user)
+        self.client = Client()
+
+    def test_content_is_hidden_immediately(self):
+        post = self.user.posts.first()
+        request_user_deletion(self.user)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:profile', args=(self.user.username,))
+            ).status_code,
+            404
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:post_detail', args=(post.pk,))
+            ).status_code,
+            404
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.kept]
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.kept.pk,))
+        )
+        self.assertFalse(response.context['comments'])
+
+    def test_purge_runs_in_bounded_resumable_jobs(self):
+        deletion = request_user_deletion(self.user)
+        job = Job.objects.get(key=f'purge_user:{deletion.pk}')
+        job.status = Job.RUNNING
+        job.save()
+        purge_user(deletion.pk)
+        deletion.refresh_from_db()
+        self.assertIsNone(deletion.finished)
+        # Задача не успела всё за одну попытку и поставила себя снова.
+        self.assertTrue(Job.objects.filter(
+            key=f'purge_user:{deletion.pk}', status=Job.QUEUED
+        ).exists())
+        while purge_step(deletion):
+            pass
+        deletion.refresh_from_db()
+        self.assertIsNotNone(deletion.finished)
+        self.assertFalse(User.objects.filter(username='leaving').exists())
+        self.assertEqual(deletion.posts_deleted, 3)
+        self.assertEqual(deletion.comments_deleted, 4)
+        self.assertEqual(deletion.follows_deleted, 2)
+        self.assertEqual(list(Post.objects.all()), [self.kept])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+    def test_notifications_and_mentions_are_purged_in_batches(self):
+        for post in self.user.posts.all():
+            Notification.objects.create(
+                user=self.other, actor=self.user, post=post,
+                kind=Notification.NEW_POST,
+            )
+        Notification.objects.create(
+            user=self.user, actor=self.other, post=self.kept,
+            kind=Notification.NEW_POST,
+        )
+        PostMention.objects.create(
+            post=self.kept, user=self.user, pub_date=self.kept.pub_date
+        )
+        self.assertEqual(unread_count(self.other.pk), 3)
+        deletion = request_user_deletion(self.user)
+        purge_step(deletion)
+        self.assertEqual(Notification.objects.count(), 2)
+        purge_step(deletion)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(unread_count(self.other.pk), 0)
+        self.assertTrue(PostMention.objects.exists())
+        purge_step(deletion)
+        self.assertFalse(PostMention.objects.exists())
+        self.assertEqual(Comment.objects.count(), 4)
+        while purge_step(deletion):
+            pass
+        self.assertEqual(list(Post.objects.all()), [self.kept])
+
+    def test_purge_pending_finishes_everything(self):
+        request_user_deletion(self.user)
+        finished = purge_pending()
+        self.assertEqual(len(finished), 1)
+        self.assertFalse(
+            UserDeletion.objects.filter(finished__isnull=True).exists()
+        )
+        self.assertTrue(User.objects.filter(username='staying').exists())
@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from .test_media import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer')
+        self.other = User.objects.create_user(username='other')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.image_post = Post.objects.create(
+            author=self.user,
+            group=self.group,
+            text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        for number in range(4):
+            post = Post.objects.create(author=self.user, text=f'Пост {number}')
+        Comment.objects.create(post=post, author=self.user, text='Свой')
+        Comment.objects.create(
+            post=self.image_post, author=self.other, text='Чужой'
+        )
+        Post.objects.create(author=self.other, text='Не мой')
+        self.client.force_login(self.user)
+
+    def download(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_user_export_jsonl(self):
+        lines = self.download(reverse('posts:export')).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [(row['type'], row['author']) for row in rows],
+            [('post', 'writer')] * 5 + [('comment', 'writer')]
+        )
+        self.assertEqual(rows[0]['image'], self.image_post.image.name)
+
+    def test_user_export_csv(self):
+        content = self.download(reverse('posts:export'), format='csv')
+        lines = content.decode().splitlines()
+        self.assertEqual(
+            lines[0], 'type,id,post_id,date,author,group,text,image'
+        )
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(
+            self.client.get(reverse('posts:export'), {'format': 'xml'})
+            .status_code, 400
+        )
+
+    def test_zip_contains_images(self):
+        content = self.download(reverse('posts:export'), images='1')
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(archive.namelist(), [
+                'content.jsonl',
+                f'images/{self.image_post.image.name}',
+            ])
+            self.assertEqual(
+                archive.read(f'images/{self.image_post.image.name}'),
+                SMALL_GIF
+            )
+            self.assertEqual(
+                len(archive.read('content.jsonl').splitlines()), 6
+            )
+
+    def test_group_export_is_for_staff(self):
+        url = reverse('posts:export_group', args=(self.group.slug,))
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        rows = self.download(url).decode().splitlines()
+        self.assertEqual(
+            [json.loads(row)['text'] for row in rows],
+            ['С картинкой', 'Чужой']
+        )
+
+    def test_command_writes_file(self):
+        output = os.path.join(TEMP_MEDIA_ROOT, 'export.csv')
+        call_command(
+            'export_content', '--user', 'writer', '--format', 'csv',
+            '--output', output, stderr=io.StringIO()
+        )
+        with open(output, encoding='utf-8') as f:
+            self.assertEqual(len(f.read().splitlines()), 7)
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Follow, Group, Post
+from ..utils import MAX_NUM_OF_POSTS
+from .test_live import MEMORY_CACHES
+
+User = get_user_model()
+
+POSTS_COUNT = 25
+
+
+@override_settings(CACHES=MEMORY_CACHES)
+class FeedFragmentTests(TestCase):
+    def setUp(self):
+        for alias in MEMORY_CACHES:
+            caches[alias].clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f'Пост {number}')
+            for number in range(POSTS_COUNT)
+        )
+        # Одинаковые даты: порядок держится на pk.
+        Post.objects.update(pub_date=timezone.now())
+        Post.objects.create(author=self.reader, text='Чужой пост')
+
+    def walk(self, page_url, fragment_url):
+        """Первая страница и все фрагменты за ней: pk постов по порядку."""
+        response = self.client.get(page_url)
+        pks = [post.pk for post in response.context['page_obj']]
+        token = response.context['page_obj'].next_token
+        self.assertContains(response, f'data-next="{token}"')
+        while token:
+            response = self.client.get(fragment_url, {'after': token})
+            self.assertNotContains(response, '<html')
+            self.assertLessEqual(
+                response.content.count(b'<article>'), MAX_NUM_OF_POSTS
+            )
+            pks += [post.pk for post in response.context['posts']]
+            token = response.get('X-Next-Cursor')
+        return pks
+
+    def test_fragments_continue_pages(self):
+        for page_url, fragment_url, posts in (
+            (reverse('posts:index'), reverse('posts:index_fragment'),
+             Post.objects.all()),
+            (reverse('posts:group_list', args=(self.group.slug,)),
+             reverse('posts:group_fragment', args=(self.group.slug,)),
+             self.group.posts.all()),
+            (reverse('posts:profile', args=(self.author.username,)),
+             reverse('posts:profile_fragment', args=(self.author.username,)),
+             self.author.posts.all()),
+        ):
+            with self.subTest(page_url=page_url):
+                self.assertEqual(
+                    self.walk(page_url, fragment_url),
+                    list(posts.order_by(
+                        '-pub_date', '-pk'
+                    ).values_list('pk', flat=True))
+                )
+
+    def test_follow_fragment_is_private(self):
+        url = reverse('posts:follow_fragment')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        self.assertEqual(
+            len(self.walk(reverse('posts:follow_index'), url)), POSTS_COUNT
+        )
+        self.assertIn('private', self.client.get(url)['Cache-Control'])
+
+    def test_bad_cursor_starts_from_the_top(self):
+        # Посты с авторами и группами одним запросом, реакции — вторым.
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('posts:index_fragment'), {'after': 'x.1'}
+            )
+        self.assertEqual(len(response.context['posts']), MAX_NUM_OF_POSTS)
+        self.assertContains(response, 'Чужой пост')
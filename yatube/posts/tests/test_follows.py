@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..follows import (followers_count, following_count, following_states,
+                       is_following)
+from ..models import Follow
+from .test_live import MEMORY_CACHES
+
+User = get_user_model()
+
+
+@override_settings(CACHES=MEMORY_CACHES)
+class FollowCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(12)
+        ]
+        for author in cls.authors[:11]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_page_of_follow_checks_needs_one_query(self):
+        ids = [author.pk for author in self.authors]
+        with self.assertNumQueries(1):
+            followed = following_states(self.reader, ids)
+            self.assertTrue(is_following(self.reader, ids[0]))
+        self.assertEqual(followed, set(ids[:11]))
+
+    def test_follow_without_author_is_skipped(self):
+        Follow.objects.create(user=self.reader, author=None)
+        self.assertEqual(following_count(self.reader.pk), 11)
+        self.assertFalse(is_following(self.reader, self.authors[11].pk))
+
+    def test_follow_views_update_cache(self):
+        author = self.authors[11]
+        self.assertFalse(is_following(self.reader, author.pk))
+        self.assertEqual(followers_count(author.pk), 0)
+        self.client.get(
+            reverse('posts:profile_follow', args=(author.username,))
+        )
+        self.assertTrue(is_following(self.reader, author.pk))
+        self.assertEqual(followers_count(author.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_following(self.reader, author.pk))
+            self.assertEqual(followers_count(author.pk), 1)
+            self.assertEqual(following_count(self.reader.pk), 12)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=(author.username,))
+        )
+        self.assertFalse(is_following(self.reader, author.pk))
+        self.assertEqual(followers_count(author.pk), 0)
+
+    def test_following_list_is_paginated_by_cursor(self):
+        url = reverse('posts:following', args=(self.reader.username,))
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['people']), 10)
+        next_cursor = response.context['next_cursor']
+        self.assertIsNotNone(next_cursor)
+        response = self.client.get(url, {'after': next_cursor})
+        self.assertEqual(response.context['people'], [self.authors[0]])
+        self.assertIsNone(response.context['next_cursor'])
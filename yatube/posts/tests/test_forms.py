@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from hashlib import sha256
 
 
 from django.conf import settings
@@ -9,6 +10,7 @@ from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
 from ..models import Post, Group, Comment
+from ..storage import content_name
 
 User = get_user_model()
 
@@ -68,7 +70,9 @@ class PostFormTests(TestCase):
         self.assertTrue(Post.objects.filter(
             text='Тестовый пост из формы',
             group=self.group.id,
-            image='posts/small.gif'
+            image=content_name(
+                'posts', sha256(small_gif).hexdigest(), 'small.gif'
+            )
         ).exists())
 
     def test_form_edit(self):
@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..export import export_lines, user_content
+from ..follows import followers_count
+from ..importer import ContentImporter
+from ..models import Comment, Follow, Group, Notification, Post, PostTag
+
+User = get_user_model()
+
+ROWS = [
+    {'type': 'user', 'username': 'leo', 'email': 'leo@ya.ru'},
+    {'type': 'user', 'username': 'sonya'},
+    {'type': 'group', 'slug': 'cats', 'title': 'Коты',
+     'description': 'Всё про котов'},
+    {'type': 'post', 'id': 10, 'author': 'leo', 'group': 'cats',
+     'date': '2015-03-01T10:00:00+00:00', 'text': 'Про #котов'},
+    {'type': 'post', 'id': 11, 'author': 'sonya',
+     'date': '2015-03-02T10:00:00+00:00', 'text': '**Жирный** текст'},
+    {'type': 'comment', 'post_id': 10, 'author': 'sonya',
+     'date': '2015-03-03T10:00:00+00:00', 'text': 'Мяу'},
+    {'type': 'follow', 'user': 'sonya', 'author': 'leo'},
+    {'type': 'post', 'author': 'nobody', 'date': '2015-03-01', 'text': 'x'},
+    {'type': 'comment', 'post_id': 99, 'author': 'leo', 'date': '2015',
+     'text': 'Куда?'},
+    {'type': 'unknown'},
+]
+
+
+class ImportContentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def run_import(self, rows, batch_size=2):
+        importer = ContentImporter(batch_size=batch_size)
+        importer.read(json.dumps(row, ensure_ascii=False) for row in rows)
+        return importer
+
+    def test_rows_are_imported_in_batches(self):
+        importer = self.run_import(ROWS)
+        self.assertEqual(
+            (importer.counts['user'], importer.counts['group'],
+             importer.counts['post'], importer.counts['comment'],
+             importer.counts['follow'], importer.counts['errors']),
+            (2, 1, 2, 1, 1, 3)
+        )
+        self.assertEqual(
+            sorted(line for line, _ in importer.errors), [8, 9, 10]
+        )
+        post = Post.objects.get(text='Про #котов')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group, Group.objects.get(slug='cats'))
+        self.assertTrue(
+            PostTag.objects.filter(post=post, tag__name='котов').exists()
+        )
+        bold = Post.objects.get(author__username='sonya')
+        self.assertIn('<strong>Жирный</strong>', bold.text_html)
+        self.assertEqual(bold.excerpt, 'Жирный текст')
+        comment = Comment.objects.get()
+        self.assertEqual((comment.post, comment.created.day), (post, 3))
+        self.assertFalse(Notification.objects.exists())
+
+    def test_existing_users_are_reused(self):
+        leo = User.objects.create_user(username='leo')
+        self.assertEqual(followers_count(leo.pk), 0)
+        self.run_import(ROWS)
+        # Подписки записаны в обход сигналов, но кэш счётчика сброшен.
+        self.assertEqual(followers_count(leo.pk), 1)
+        self.assertEqual(User.objects.filter(username='leo').count(), 1)
+        self.assertEqual(Post.objects.get(text='Про #котов').author, leo)
+        self.assertTrue(Follow.objects.filter(author=leo).exists())
+
+    def test_posts_get_one_pk_range(self):
+        author = User.objects.create_user(username='leo')
+        Post.objects.create(author=author, text='Старый')
+        last_pk = Post.objects.latest('pk').pk
+        self.run_import([
+            {'type': 'post', 'author': 'leo', 'text': f'Пост {number}',
+             'date': '2020-01-01T00:00:00'}
+            for number in range(5)
+        ])
+        self.assertEqual(
+            list(Post.objects.filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', flat=True)),
+            list(range(last_pk + 1, last_pk + 6))
+        )
+        # После импорта обычное создание продолжает нумерацию.
+        self.assertEqual(
+            Post.objects.create(author=author, text='Новый').pk, last_pk + 6
+        )
+
+    def test_rerun_after_failure_skips_written_rows(self):
+        def fail_after_posts(importer):
+            if importer.counts['post']:
+                raise RuntimeError('обрыв')
+
+        importer = ContentImporter(batch_size=2, on_batch=fail_after_posts)
+        with self.assertRaises(RuntimeError):
+            importer.read(json.dumps(row) for row in ROWS)
+        self.assertEqual((Post.objects.count(), Comment.objects.count()),
+                         (2, 0))
+        importer = self.run_import(ROWS)
+        self.assertEqual(
+            (importer.counts['post'], importer.counts['comment']), (0, 1)
+        )
+        self.assertEqual((Post.objects.count(), Comment.objects.count()),
+                         (2, 1))
+        self.assertEqual(
+            Comment.objects.get().post, Post.objects.get(text='Про #котов')
+        )
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_export_round_trip(self):
+        self.run_import(ROWS)
+        leo = User.objects.get(username='leo')
+        exported = list(export_lines(*user_content(leo), 'jsonl'))
+        Post.objects.filter(author=leo).delete()
+        importer = ContentImporter(source='export')
+        importer.read(exported)
+        self.assertEqual(importer.errors, [])
+        self.assertEqual(importer.counts['post'], 1)
+        self.assertEqual(
+            Post.objects.get(author=leo).pub_date.isoformat(),
+            '2015-03-01T10:00:00+00:00'
+        )
+
+    def test_command_reports_throughput(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'content.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                for row in ROWS[:3]:
+                    f.write(json.dumps(row, ensure_ascii=False) + '\n')
+            call_command('import_content', path, stdout=out)
+        self.assertIn('в секунду', out.getvalue())
+        self.assertTrue(Group.objects.filter(slug='cats').exists())
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+
+IDLE_CONNECTIONS = 300
+
+# Общий кэш в памяти вместо таблицы в базе — так ведёт себя memcached.
+MEMORY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    },
+}
+
+
+@override_settings(
+    CACHES=MEMORY_CACHES, LIVE_POLL_INTERVAL=0, LIVE_HEARTBEAT=0
+)
+class LiveEventsTests(TestCase):
+    def setUp(self):
+        for alias in MEMORY_CACHES:
+            caches[alias].clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def connect(self, **params):
+        response = self.client.get(reverse('posts:live'), params)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = iter(response.streaming_content)
+        self.assertTrue(next(events).startswith(b'retry:'))
+        return events
+
+    def test_new_post_event(self):
+        events = self.connect(feed='index')
+        self.assertEqual(next(events), b': ping\n\n')
+        Post.objects.create(author=self.author, text='Новый')
+        Post.objects.create(author=self.reader, text='Ещё')
+        self.assertEqual(
+            next(events), b'event: posts\ndata: {"count": 2}\n\n'
+        )
+
+    def test_page_counter_is_the_starting_point(self):
+        live_url = self.client.get(reverse('posts:index')).context['live_url']
+        Post.objects.create(author=self.author, text='Новый')
+        response = self.client.get(live_url)
+        events = iter(response.streaming_content)
+        next(events)
+        self.assertIn(b'"count": 1', next(events))
+
+    def test_follow_feed_counts_followed_authors(self):
+        self.assertEqual(
+            self.client.get(reverse('posts:live'), {'feed': 'follow'})
+            .status_code, 400
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        events = self.connect(feed='follow')
+        Post.objects.create(author=self.reader, text='Свой')
+        self.assertEqual(next(events), b': ping\n\n')
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertIn(b'"count": 1', next(events))
+
+    def test_comment_event(self):
+        events = self.connect(feed='post', post=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        self.assertEqual(
+            next(events), b'event: comments\ndata: {"count": 1}\n\n'
+        )
+
+    def test_idle_connections_do_not_query_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            streams = [
+                self.connect(feed='index')
+                for _ in range(IDLE_CONNECTIONS // 2)
+            ] + [
+                self.connect(feed='post', post=self.post.pk)
+                for _ in range(IDLE_CONNECTIONS // 2)
+            ]
+            for _ in range(3):
+                for events in streams:
+                    self.assertEqual(next(events), b': ping\n\n')
+        self.assertEqual(len(queries), 0)
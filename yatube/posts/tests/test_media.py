@@ -0,0 +1,177 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import get_thumbnail
+
+from ..media import dedupe_images, delete_image, external_sort, merge_join
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def make_gif(shade):
+    """Та же картинка, но с другим цветом — и другим содержимым."""
+    return SMALL_GIF.replace(b'\xFF\xFF\xFF', bytes([shade] * 3), 1)
+
+
+class ExternalSortTests(TestCase):
+    def test_sorts_through_temporary_runs(self):
+        items = [f'posts/{number % 37}.gif' for number in range(500)]
+        self.assertEqual(
+            list(external_sort(items, chunk_size=16)),
+            sorted(set(items))
+        )
+
+    def test_merge_join_marks_matches(self):
+        self.assertEqual(
+            list(merge_join(['a', 'b', 'd'], ['b', 'c', 'd'])),
+            [('a', False), ('b', True), ('d', True)]
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class CleanMediaTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # sorl держит свои ключи и в кэше, а тестовая база откатывается.
+        cache.clear()
+        author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            author=author,
+            text='С картинкой',
+            image=SimpleUploadedFile(
+                'kept.gif', make_gif(1), 'image/gif'
+            ),
+        )
+        self.thumbnail = self.make_thumbnail(self.post.image)
+        orphan = Post.objects.create(
+            author=author,
+            text='Удалят',
+            image=SimpleUploadedFile(
+                'gone.gif', make_gif(2), 'image/gif'
+            ),
+        )
+        self.orphan = orphan.image.name
+        Post.objects.filter(pk=orphan.pk).delete()
+        # Миниатюра, оригинал которой удалили мимо sorl.
+        deleted = Post.objects.create(
+            author=author,
+            text='Удалили',
+            image=SimpleUploadedFile(
+                'deleted.gif', make_gif(3), 'image/gif'
+            ),
+        )
+        self.orphan_thumbnail = self.make_thumbnail(deleted.image)
+        deleted.image.storage.delete(deleted.image.name)
+        deleted.delete()
+
+    def make_thumbnail(self, image):
+        return get_thumbnail(image, '2x1', upscale=False).name
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name))
+
+    def test_dry_run_only_reports(self):
+        out = StringIO()
+        call_command('clean_media', dry_run=True, min_age=0, stdout=out)
+        self.assertIn(self.orphan, out.getvalue())
+        self.assertIn(self.orphan_thumbnail, out.getvalue())
+        self.assertNotIn(self.post.image.name, out.getvalue())
+        self.assertTrue(self.exists(self.orphan))
+
+    def test_removes_only_orphans(self):
+        call_command('clean_media', min_age=0, stdout=StringIO())
+        self.assertFalse(self.exists(self.orphan))
+        self.assertFalse(self.exists(self.orphan_thumbnail))
+        self.assertTrue(self.exists(self.post.image.name))
+        self.assertTrue(self.exists(self.thumbnail))
+
+    def test_young_files_are_kept(self):
+        call_command('clean_media', stdout=StringIO())
+        self.assertTrue(self.exists(self.orphan))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+
+    def upload(self, name):
+        return Post.objects.create(
+            author=self.author,
+            text='Картинка',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload('meme.gif')
+        second = self.upload('repost.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        first.delete()
+        call_command('clean_media', min_age=0, stdout=StringIO())
+        self.assertTrue(os.path.exists(second.image.path))
+
+    def test_reupload_keeps_file_from_deletion(self):
+        post = self.upload('meme.gif')
+        name, path = post.image.name, post.image.path
+        os.utime(path, (0, 0))
+        post.delete()
+        # Ту же картинку загрузили снова, а пост ещё не записан в базу.
+        post.image.storage.save('posts/again.gif', ContentFile(SMALL_GIF))
+        self.assertFalse(delete_image(name))
+        self.assertTrue(os.path.exists(path))
+        os.utime(path, (0, 0))
+        self.assertTrue(delete_image(name))
+        self.assertFalse(os.path.exists(path))
+
+    def test_dedupe_moves_legacy_files(self):
+        legacy = FileSystemStorage()
+        names = [
+            legacy.save(f'posts/legacy{number}.gif', ContentFile(SMALL_GIF))
+            for number in range(2)
+        ]
+        posts = [self.upload('new.gif')]
+        for name in names:
+            post = self.upload('other.gif')
+            Post.objects.filter(pk=post.pk).update(image=name)
+            posts.append(post)
+        self.assertEqual(
+            dedupe_images(),
+            {'moved': 0, 'shared': 2, 'missing': 0}
+        )
+        self.assertEqual(
+            Post.objects.values('image').distinct().count(), 1
+        )
+        for name in names:
+            self.assertFalse(legacy.exists(name))
+        self.assertTrue(legacy.exists(posts[0].image.name))
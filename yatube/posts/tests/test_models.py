@@ -1,8 +1,10 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 
 from ..models import Group, Post
+from ..text import EXCERPT_LENGTH
+from .test_live import MEMORY_CACHES
 
 User = get_user_model()
 
@@ -25,3 +27,20 @@ class PostGroupModelTest(TestCase):
     def test_models_have_str(self):
         self.assertEqual(self.post.text[:15], str(self.post))
         self.assertEqual(self.group.title, str(self.group))
+
+    @override_settings(CACHES=MEMORY_CACHES)
+    def test_excerpt_follows_text(self):
+        self.assertEqual(self.post.excerpt, self.post.text)
+        self.assertFalse(self.post.is_truncated)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'длинное слово ' * 100
+        post.save(update_fields=['text'])
+        # Автор нужен сигналу, сбрасывающему кэш страницы профиля.
+        post = Post.objects.for_list().select_related('author').get(
+            pk=self.post.pk
+        )
+        self.assertLessEqual(len(post.excerpt), EXCERPT_LENGTH + 1)
+        self.assertTrue(post.is_truncated)
+        self.assertTrue(post.excerpt.startswith('длинное слово'))
+        with self.assertNumQueries(1):
+            post.save()
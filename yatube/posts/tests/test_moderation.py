@@ -0,0 +1,112 @@
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.jobs import work
+
+from ..models import (BulkAction, Comment, Group, Notification, Post,
+                      PostTag, Reaction, ReactionCounter)
+from ..moderation import bulk_action_step, start_bulk_action
+from ..notifications import unread_count
+from ..reactions import toggle_reaction
+
+User = get_user_model()
+
+
+@override_settings(MODERATION_BATCH_SIZE=2)
+class BulkModerationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin', email='admin@ya.ru', password='pass'
+        )
+        self.client.force_login(self.admin)
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.posts = [
+            Post.objects.create(author=self.admin, text=f'Пост #тег {number}')
+            for number in range(5)
+        ]
+        for post in self.posts:
+            Comment.objects.create(post=post, author=self.reader, text='Да')
+            toggle_reaction(self.reader, post.pk, Reaction.LIKE)
+        Notification.objects.bulk_create(
+            Notification(user=self.reader, post=post, actor=self.admin,
+                         kind=Notification.NEW_POST)
+            for post in self.posts
+        )
+
+    def run_action(self, model, action, data=None):
+        response = self.client.post(
+            reverse(f'admin:posts_{model}_changelist'),
+            {'action': action, 'select_across': '1', 'index': '0',
+             ACTION_CHECKBOX_NAME: [self.posts[0].pk], **(data or {})}
+        )
+        work(burst=True)
+        return response
+
+    def test_delete_posts_in_chunks(self):
+        self.assertEqual(unread_count(self.reader.pk), 5)
+        response = self.run_action('post', 'delete_posts')
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Post.objects.exists())
+        for model in (Comment, Reaction, ReactionCounter, Notification,
+                      PostTag):
+            self.assertFalse(model.objects.exists(), model)
+        bulk = BulkAction.objects.get()
+        self.assertEqual((bulk.total, bulk.processed), (5, 5))
+        self.assertIsNotNone(bulk.finished)
+        self.assertEqual(unread_count(self.reader.pk), 0)
+        self.assertContains(
+            self.client.get(reverse('admin:posts_bulkaction_changelist')),
+            '5 из 5 (100%)'
+        )
+
+    def test_step_queries_do_not_depend_on_batch_size(self):
+        bulk = start_bulk_action(BulkAction.DELETE_POSTS, '', self.admin)
+        bulk_action_step(bulk)
+        with CaptureQueriesContext(connection) as two_posts:
+            bulk_action_step(bulk)
+        with override_settings(MODERATION_BATCH_SIZE=3):
+            with CaptureQueriesContext(connection) as three_posts:
+                bulk_action_step(bulk)
+        self.assertEqual(len(two_posts), len(three_posts))
+        self.assertFalse(Post.objects.exists())
+
+    def test_selection_keeps_filters_and_upper_bound(self):
+        url = reverse('admin:posts_post_changelist')
+        self.client.post(url + '?q=тег+1', {
+            'action': 'delete_posts', 'select_across': '1', 'index': '0',
+            ACTION_CHECKBOX_NAME: [self.posts[1].pk],
+        })
+        self.client.post(url, {
+            'action': 'delete_posts', 'select_across': '0', 'index': '0',
+            ACTION_CHECKBOX_NAME: [self.posts[3].pk],
+        })
+        # Пост, добавленный после запуска, выборке не принадлежит.
+        late = Post.objects.create(author=self.admin, text='Поздний #тег 1')
+        work(burst=True)
+        self.assertEqual(
+            set(Post.objects.all()),
+            {self.posts[0], self.posts[2], self.posts[4], late}
+        )
+
+    def test_move_posts_asks_for_group(self):
+        response = self.run_action('post', 'move_posts')
+        self.assertContains(response, 'Перенести')
+        self.assertFalse(BulkAction.objects.exists())
+        self.run_action(
+            'post', 'move_posts', {'apply': '1', 'group': self.group.pk}
+        )
+        self.assertEqual(self.group.posts.count(), 5)
+
+    def test_delete_comments(self):
+        self.run_action('comment', 'delete_comments')
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(Post.objects.count(), 5)
@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import caches
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from core.models import Job
+
+from ..models import Follow, Notification, Post
+from ..notifications import notify_followers, send_digests, unread_count
+from ..tasks import notify_followers as notify_followers_task
+from .test_live import MEMORY_CACHES
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES=MEMORY_CACHES, NOTIFY_BATCH_SIZE=2, DIGEST_BATCH_SIZE=2
+)
+class NotificationTests(TestCase):
+    def setUp(self):
+        for alias in MEMORY_CACHES:
+            caches[alias].clear()
+        self.author = User.objects.create_user(username='author')
+        self.readers = [
+            User.objects.create_user(
+                username=f'reader{number}', email=f'reader{number}@ya.ru'
+            )
+            for number in range(5)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=self.author) for reader in self.readers
+        )
+        self.post = Post.objects.create(author=self.author, text='Новость')
+
+    def test_new_post_enqueues_notifications(self):
+        job = Job.objects.get(key=f'notify:{self.post.pk}')
+        self.assertEqual(job.task, notify_followers_task.task_name)
+
+    def test_followers_are_notified_in_batches(self):
+        # По запросу подписчиков и одной вставке на пачку из двух,
+        # плюс пустой запрос в конце.
+        with self.assertNumQueries(7):
+            self.assertEqual(notify_followers(self.post), 5)
+        self.assertEqual(
+            set(Notification.objects.values_list('user_id', flat=True)),
+            {reader.pk for reader in self.readers}
+        )
+
+    def test_unread_count_is_cached(self):
+        reader = self.readers[0]
+        self.assertEqual(unread_count(reader.pk), 0)
+        notify_followers(self.post)
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(reader.pk), 1)
+            self.assertEqual(unread_count(reader.pk), 1)
+        client = Client()
+        client.force_login(reader)
+        client.get(reverse('posts:notifications'))
+        self.assertEqual(unread_count(reader.pk), 0)
+
+    def test_digest_is_sent_once(self):
+        notify_followers(self.post)
+        Notification.objects.filter(user=self.readers[0]).update(is_read=True)
+        self.assertEqual(send_digests(), 4)
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertIn('Новость', mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].to, [self.readers[1].email])
+        self.assertEqual(send_digests(), 0)
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import IntegrityError
+from django.test import (TestCase, TransactionTestCase, Client,
+                         override_settings)
+from django.urls import reverse
+
+from core.models import Job
+
+from ..models import Post, Reaction, ReactionCounter
+from ..purge import purge_pending, request_user_deletion
+from ..reactions import (attach_reactions, flush_buffer, reaction_counts,
+                         toggle_reaction)
+from .test_live import MEMORY_CACHES
+
+User = get_user_model()
+
+
+@override_settings(REACTION_BUFFER=False)
+class ReactionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.fan = User.objects.create_user(username='fan')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def likes(self):
+        return reaction_counts([self.post.pk])[self.post.pk].get(
+            Reaction.LIKE, 0
+        )
+
+    def test_toggle_adds_and_removes(self):
+        self.assertTrue(toggle_reaction(self.fan, self.post.pk, Reaction.LIKE))
+        self.assertEqual(self.likes(), 1)
+        self.assertFalse(
+            toggle_reaction(self.fan, self.post.pk, Reaction.LIKE)
+        )
+        self.assertEqual(self.likes(), 0)
+        self.assertFalse(Reaction.objects.exists())
+
+    def test_concurrent_removal_is_counted_once(self):
+        toggle_reaction(self.author, self.post.pk, Reaction.LIKE)
+        toggle_reaction(self.fan, self.post.pk, Reaction.LIKE)
+        toggle_reaction(self.fan, self.post.pk, Reaction.LIKE)
+        # Второй запрос на снятие: вставка упала на ещё стоявшей
+        # реакции, а удалять к его DELETE уже нечего.
+        with mock.patch.object(
+            Reaction.objects, 'create', side_effect=IntegrityError
+        ):
+            self.assertFalse(
+                toggle_reaction(self.fan, self.post.pk, Reaction.LIKE)
+            )
+        self.assertEqual(self.likes(), 1)
+
+    def test_feed_reads_counts_in_one_query(self):
+        for number in range(5):
+            post = Post.objects.create(author=self.author, text=f'{number}')
+            toggle_reaction(self.fan, post.pk, Reaction.LIKE)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '👍 1', count=5)
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            attach_reactions(posts)
+        liked = [post for post in posts if post.pk != self.post.pk]
+        for post in liked:
+            self.assertEqual(post.reactions_summary, [
+                ('👍', Reaction.LIKE, 1),
+                ('🔥', Reaction.FIRE, 0),
+                ('😢', Reaction.SAD, 0),
+            ])
+
+    def test_purge_subtracts_reactions(self):
+        toggle_reaction(self.fan, self.post.pk, Reaction.LIKE)
+        request_user_deletion(self.fan)
+        purge_pending()
+        self.assertEqual(self.likes(), 0)
+
+    def test_react_view(self):
+        client = Client()
+        client.force_login(self.fan)
+        url = reverse('posts:react', args=(self.post.pk, Reaction.SAD))
+        client.get(url)
+        self.assertEqual(self.likes(), 0)
+        self.assertFalse(Reaction.objects.exists())
+        response = client.post(url)
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertTrue(Reaction.objects.filter(
+            user=self.fan, kind=Reaction.SAD
+        ).exists())
+
+
+@override_settings(
+    CACHES=MEMORY_CACHES, REACTION_BUFFER=True, REACTION_FLUSH_DELAY=60
+)
+class BufferedReactionTests(TransactionTestCase):
+    def setUp(self):
+        for alias in MEMORY_CACHES:
+            caches[alias].clear()
+        self.author = User.objects.create_user(username='author')
+        self.fans = [
+            User.objects.create_user(username=f'fan{number}')
+            for number in range(3)
+        ]
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def likes(self):
+        return reaction_counts([self.post.pk])[self.post.pk].get(
+            Reaction.LIKE, 0
+        )
+
+    def test_reactions_are_buffered_until_flush(self):
+        for fan in self.fans:
+            toggle_reaction(fan, self.post.pk, Reaction.LIKE)
+        toggle_reaction(self.fans[0], self.post.pk, Reaction.LIKE)
+        self.assertFalse(ReactionCounter.objects.exists())
+        self.assertEqual(self.likes(), 2)
+        self.assertEqual(
+            Job.objects.filter(key=f'reactions:flush:{self.post.pk}').count(),
+            1
+        )
+        flush_buffer([self.post.pk])
+        self.assertEqual(
+            ReactionCounter.objects.get(post=self.post).count, 2
+        )
+        self.assertEqual(self.likes(), 2)
+
+    def test_flush_repairs_lost_increments(self):
+        toggle_reaction(self.fans[0], self.post.pk, Reaction.LIKE)
+        # Кэш потерял приращения (например, memcached вытеснил ключ).
+        caches['shared'].clear()
+        self.assertEqual(self.likes(), 0)
+        flush_buffer([self.post.pk])
+        self.assertEqual(self.likes(), 1)
@@ -0,0 +1,107 @@
+import shutil
+import tempfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..sitemaps import XMLNS, build_sitemaps, chunk_file
+
+User = get_user_model()
+
+TEMP_SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def locations(name):
+    tree = ElementTree.parse(chunk_file(name))
+    return [loc.text for loc in tree.iter(f'{{{XMLNS}}}loc')]
+
+
+@override_settings(
+    SITEMAP_ROOT=TEMP_SITEMAP_ROOT,
+    SITEMAP_CHUNK_SIZE=2,
+    SITE_URL='https://yatube.test',
+)
+class SitemapTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='writer')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='-'
+        )
+        self.posts = [
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+            for number in range(5)
+        ]
+
+    def post_chunk(self, post):
+        return f'posts-{post.pk // 2}.xml'
+
+    def test_chunks_cover_all_urls(self):
+        names = build_sitemaps()
+        post_urls = [
+            url for name in names if name.startswith('posts-')
+            for url in locations(name)
+        ]
+        self.assertEqual(post_urls, [
+            f'https://yatube.test/posts/{post.pk}/' for post in self.posts
+        ])
+        self.assertTrue(all(
+            len(locations(name)) <= 2 for name in names
+        ))
+        self.assertIn(
+            'https://yatube.test/profile/writer/',
+            locations(f'profiles-{self.user.pk // 2}.xml')
+        )
+        self.assertEqual(
+            len(locations('sitemap.xml')), len(names)
+        )
+
+    def test_only_changed_chunks_are_rebuilt(self):
+        build_sitemaps()
+        self.assertEqual(build_sitemaps(), [])
+        # Удаление в обход сигналов тоже меняет отпечаток куска.
+        post = next(
+            post for post in self.posts[:-1] if post.pk % 2 == 0
+        )
+        Post.objects.filter(pk=post.pk).delete()
+        self.assertEqual(build_sitemaps(), [self.post_chunk(post)])
+        self.user.is_active = False
+        self.user.save()
+        # Посты и профиль неактивного автора пропадают из карты.
+        self.assertEqual(build_sitemaps(), [])
+        self.assertEqual(locations('sitemap.xml'), [
+            f'https://yatube.test/sitemaps/groups-{self.group.pk // 2}.xml'
+        ])
+
+    def test_views_serve_files(self):
+        self.assertEqual(
+            self.client.get(reverse('posts:sitemap')).status_code, 404
+        )
+        build_sitemaps()
+        response = self.client.get(reverse('posts:sitemap'))
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        chunk = self.post_chunk(self.posts[-1])
+        self.assertIn(
+            f'/sitemaps/{chunk}', b''.join(response.streaming_content).decode()
+        )
+        response = self.client.get(
+            reverse('posts:sitemap_chunk', args=(chunk,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:sitemap_chunk', args=('manifest.json',))
+            ).status_code,
+            404
+        )
@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..counters import view_counter
+from ..models import Comment, Group, Post
+from ..snapshots import (check_snapshots, flush_pending, rebuild_all,
+                         snapshot_file)
+
+User = get_user_model()
+
+TEMP_SNAPSHOT_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    SNAPSHOT_ROOT=TEMP_SNAPSHOT_ROOT,
+    SNAPSHOTS_ENABLED=True,
+)
+class SnapshotTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Тестовый пост',
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SNAPSHOT_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_SNAPSHOT_ROOT, ignore_errors=True)
+
+    def test_rebuild_writes_hot_pages(self):
+        paths = rebuild_all()
+        self.assertIn('/', paths)
+        self.assertIn('/group/test-slug/', paths)
+        self.assertIn('/profile/test/', paths)
+        with open(snapshot_file('/'), encoding='utf-8') as f:
+            self.assertIn('Тестовый пост', f.read())
+        self.assertEqual(check_snapshots(), {})
+
+    def test_pending_changes_refresh_snapshots(self):
+        rebuild_all()
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(check_snapshots().get('/'), 'stale')
+        self.assertEqual(flush_pending(debounce=60), [])
+        self.assertIn('/', flush_pending(debounce=0))
+        self.assertEqual(check_snapshots(), {})
+
+    def test_moved_post_refreshes_previous_group(self):
+        other = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание'
+        )
+        Post.objects.create(author=self.user, group=other, text='Другой')
+        rebuild_all()
+        post = Post.objects.get(text='Тестовый пост')
+        post.group = other
+        post.save()
+        rebuilt = flush_pending(debounce=0)
+        self.assertIn('/group/test-slug/', rebuilt)
+        self.assertIn('/group/other/', rebuilt)
+        with open(snapshot_file('/group/test-slug/'), encoding='utf-8') as f:
+            self.assertNotIn('Тестовый пост', f.read())
+
+    def test_missing_snapshot_is_reported(self):
+        rebuild_all()
+        os.remove(snapshot_file('/profile/test/'))
+        self.assertEqual(check_snapshots(), {'/profile/test/': 'missing'})
+
+    def test_snapshot_renders_are_not_views(self):
+        post = Post.objects.get(text='Тестовый пост')
+        Comment.objects.create(post=post, author=self.user, text='Коммент')
+        view_counter.flush()
+        post.refresh_from_db()
+        views = post.views
+        self.assertIn(f'/posts/{post.pk}/', rebuild_all())
+        rebuild_all()
+        check_snapshots()
+        view_counter.flush()
+        post.refresh_from_db()
+        self.assertEqual(post.views, views)
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion, Group, Post
+from ..suggestions import SparseGraph, rebuild_suggestions
+
+User = get_user_model()
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.star = User.objects.create_user(username='star')
+        cls.neighbour = User.objects.create_user(username='neighbour')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.star)
+        Post.objects.create(author=cls.reader, group=cls.group, text='Пост')
+        Post.objects.create(
+            author=cls.neighbour, group=cls.group, text='Пост соседа'
+        )
+
+    def test_sparse_graph_neighbours(self):
+        graph = SparseGraph([(1, 2), (1, 3), (4, 1)])
+        self.assertEqual(list(graph.neighbours(1)), [2, 3])
+        self.assertEqual(list(graph.neighbours(4)), [1])
+        self.assertEqual(list(graph.neighbours(2)), [])
+
+    def test_friends_of_friends_and_group_authors_are_suggested(self):
+        rebuild_suggestions()
+        suggested = set(FollowSuggestion.objects.filter(
+            user=self.reader
+        ).values_list('author__username', flat=True))
+        self.assertEqual(suggested, {'star', 'neighbour'})
+
+    def test_reader_without_group_posts(self):
+        lurker = User.objects.create_user(username='lurker')
+        Follow.objects.create(user=lurker, author=self.friend)
+        rebuild_suggestions()
+        self.assertEqual(
+            list(FollowSuggestion.objects.filter(
+                user=lurker
+            ).values_list('author__username', 'score')),
+            [('star', 1.0)]
+        )
+
+    def test_suggestions_are_shown_on_follow_page(self):
+        rebuild_suggestions()
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        authors = [s.author for s in response.context['suggestions']]
+        self.assertIn(self.star, authors)
+        Follow.objects.create(user=self.reader, author=self.star)
+        response = client.get(reverse('posts:follow_index'))
+        authors = [s.author for s in response.context['suggestions']]
+        self.assertNotIn(self.star, authors)
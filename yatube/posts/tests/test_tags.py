@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Notification, Post, PostMention, PostTag
+from ..tags import tag_feed
+from ..text import extract_mentions, extract_tags
+
+User = get_user_model()
+
+
+class ExtractTests(TestCase):
+    def test_tags_and_mentions(self):
+        text = 'Про #Django и #веб, спасибо @leo. Почта a@b.ru, &#39; site/#x'
+        self.assertEqual(extract_tags(text), {'django', 'веб'})
+        self.assertEqual(extract_mentions(text), {'leo'})
+
+
+class TagIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.client = Client()
+
+    def test_tags_are_indexed_on_save(self):
+        post = Post.objects.create(author=self.author, text='#one #two')
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'one', 'two'}
+        )
+        post.text = '#two #three'
+        post.save()
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'two', 'three'}
+        )
+        self.assertIn('href="/tag/two/"', post.text_html)
+
+    def test_tag_feed_page(self):
+        tagged = Post.objects.create(author=self.author, text='Про #Python')
+        Post.objects.create(author=self.author, text='Без тега про python')
+        response = self.client.get(reverse('posts:tag', args=('python',)))
+        self.assertEqual(list(response.context['page_obj']), [tagged])
+        tag = PostTag.objects.get().tag
+        self.assertIn('posts_posttag_feed_idx', tag_feed(tag).explain())
+
+    def test_tag_feed_links_truncated_posts(self):
+        Post.objects.create(
+            author=self.author, text='#длинно ' + 'слово ' * 100
+        )
+        response = self.client.get(reverse('posts:tag', args=('длинно',)))
+        self.assertContains(response, 'читать полностью')
+
+    def test_mention_creates_one_notification(self):
+        post = Post.objects.create(
+            author=self.author, text='Привет, @reader и @nobody'
+        )
+        post.save()
+        self.assertEqual(PostMention.objects.get().user, self.reader)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.user, self.reader)
+        self.assertEqual(notification.actor, self.author)
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertEqual(list(response.context['page_obj']), [notification])
+        notification.refresh_from_db()
+        self.assertTrue(notification.is_read)
+
+    def test_backfill_skips_notifications(self):
+        Post.objects.create(author=self.author, text='#old @reader')
+        PostTag.objects.all().delete()
+        PostMention.objects.all().delete()
+        Notification.objects.all().delete()
+        call_command('index_tags', batch_size=1, stdout=StringIO())
+        self.assertEqual(PostTag.objects.count(), 1)
+        self.assertEqual(PostMention.objects.count(), 1)
+        self.assertFalse(Notification.objects.exists())
@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..text import RENDERER_VERSION, render_markup
+
+User = get_user_model()
+
+
+class RenderMarkupTests(TestCase):
+    def test_user_html_is_escaped(self):
+        self.assertEqual(
+            render_markup('<script>alert(1)</script> **жирный**'),
+            '<p>&lt;script&gt;alert(1)&lt;/script&gt; '
+            '<strong>жирный</strong></p>'
+        )
+
+    def test_only_safe_links(self):
+        rendered = render_markup(
+            '[сайт](https://example.com/?a="1") [xss](javascript:alert(1))'
+        )
+        self.assertIn('href="https://example.com/?a=&quot;1&quot;"', rendered)
+        self.assertNotIn('href="javascript', rendered)
+
+    def test_blocks(self):
+        self.assertEqual(
+            render_markup('# Тема\n- раз\n- два\n\n```\n*код*\n```'),
+            '<h3>Тема</h3><ul><li>раз</li><li>два</li></ul>\n'
+            '<pre><code>*код*</code></pre>'
+        )
+
+
+class StoredHtmlTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.user, text='*Пост*')
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.user, text='**Ответ**'
+        )
+        self.client = Client()
+
+    def test_html_is_rendered_on_save(self):
+        self.assertEqual(self.post.text_html, '<p><em>Пост</em></p>')
+        self.assertEqual(self.post.excerpt, 'Пост')
+        self.assertEqual(self.post.text_renderer, RENDERER_VERSION)
+        self.assertEqual(
+            self.comment.text_html, '<p><strong>Ответ</strong></p>'
+        )
+
+    def test_stale_rows_are_rendered_on_view(self):
+        Post.objects.update(text_html='', text_renderer=0)
+        Comment.objects.update(text_html='', text_renderer=0)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        self.assertContains(response, '<em>Пост</em>')
+        self.assertContains(response, '<strong>Ответ</strong>')
+        self.assertEqual(
+            Post.objects.get().text_renderer, RENDERER_VERSION
+        )
+
+    def test_command_renders_stale_rows(self):
+        Comment.objects.update(text_html='', text_renderer=0)
+        call_command('render_markup', stdout=StringIO())
+        self.assertEqual(
+            Comment.objects.get().text_html, '<p><strong>Ответ</strong></p>'
+        )
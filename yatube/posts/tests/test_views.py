@@ -274,3 +274,74 @@ class PaginatorViewsTest(TestCase):
                     len(response.context['page_obj']),
                     count
                 )
+
+
+class AnonymousCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост для кэша',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_anonymous_pages_are_cached_and_public(self):
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Тихая правка', excerpt='Тихая правка'
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тестовый пост для кэша')
+
+    def test_new_post_expires_anonymous_cache(self):
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.create(author=self.user, text='Свежий пост')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_authorized_user_bypasses_cache(self):
+        self.guest_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Тихая правка', excerpt='Тихая правка'
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тихая правка')
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_comment_expires_only_its_post_page(self):
+        index_url = reverse('posts:index')
+        post_url = reverse('posts:post_detail', args=(self.post.pk,))
+        self.guest_client.get(index_url)
+        self.guest_client.get(post_url)
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Тихая правка', excerpt='Тихая правка'
+        )
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        self.assertContains(self.guest_client.get(post_url), 'Комментарий')
+        self.assertContains(
+            self.guest_client.get(index_url), 'Тестовый пост для кэша'
+        )
+
+    def test_moved_post_expires_both_group_pages(self):
+        old = Group.objects.create(title='Старая', slug='old')
+        new = Group.objects.create(title='Новая', slug='new')
+        post = Post.objects.create(author=self.user, group=old, text='Переезд')
+        old_url = reverse('posts:group_list', args=(old.slug,))
+        new_url = reverse('posts:group_list', args=(new.slug,))
+        self.guest_client.get(old_url)
+        self.guest_client.get(new_url)
+        post.group = new
+        post.save()
+        self.assertNotContains(self.guest_client.get(old_url), 'Переезд')
+        self.assertContains(self.guest_client.get(new_url), 'Переезд')
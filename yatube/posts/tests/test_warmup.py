@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import warmup
+from ..models import Group, Post
+from .test_live import MEMORY_CACHES
+from .test_media import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    CACHES=MEMORY_CACHES,
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    SITE_URL='http://testserver',
+    WARMUP_INDEX_PAGES=2,
+)
+class WarmupTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        for alias in MEMORY_CACHES:
+            caches[alias].clear()
+        warmup.STATE.clear()
+        warmup.STATE['state'] = 'cold'
+        self.author = User.objects.create_user(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.image_post = Post.objects.create(
+            author=self.author,
+            group=self.group,
+            text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        for number in range(12):
+            Post.objects.create(author=self.author, text=f'Пост {number}')
+
+    @mock.patch('posts.warmup.get_thumbnail')
+    def test_hot_pages_are_served_from_cache(self, get_thumbnail):
+        result = warmup.run_warmup(workers=1)
+        self.assertEqual(result['errors'], [])
+        get_thumbnail.assert_called_once_with(
+            self.image_post.image.name, warmup.THUMBNAIL_GEOMETRY,
+            **warmup.THUMBNAIL_OPTIONS
+        )
+        # Две страницы главной, группа и автор; одна картинка.
+        self.assertEqual((result['pages'], result['thumbnails']), (4, 1))
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+        ):
+            with self.subTest(url=url), self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    @mock.patch('posts.warmup.threading.Thread')
+    def test_ready_after_warmup(self, thread):
+        response = self.client.get(reverse('posts:ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['state'], 'warming')
+        thread.return_value.start.assert_called_once()
+        self.client.get(reverse('posts:ready'))
+        thread.assert_called_once()
+        warmup.run_warmup(workers=1)
+        response = self.client.get(reverse('posts:ready'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['pages'], 4)
+
+    @mock.patch('posts.warmup.threading.Thread')
+    def test_state_inherited_through_fork_is_ignored(self, thread):
+        warmup.STATE.update(state='ready', pid=-1)
+        warmup.ensure_warmup()
+        thread.return_value.start.assert_called_once()
+        self.assertEqual(warmup.STATE['state'], 'warming')
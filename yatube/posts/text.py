@@ -0,0 +1,195 @@
+"""Обработка текста постов и комментариев при сохранении.
+
+Разметка — небольшое подмножество Markdown: абзацы, переносы строк,
+заголовки `#`, цитаты `>`, списки `-`/`*`/`1.`, блоки кода в тройных
+обратных кавычках, **жирный**, *курсив*, `код`, ссылки
+[текст](https://...), теги `#тег` и упоминания `@имя`. Текст сначала
+целиком экранируется, и только потом разметка превращается
+в фиксированный набор тегов, поэтому пользовательский HTML в результат
+попасть не может.
+
+HTML хранится в базе вместе с `RENDERER_VERSION`; при изменении
+правил рендеринга версию нужно увеличить, и устаревшие строки будут
+перерисованы при показе или командой `render_markup`.
+"""
+import html
+import re
+
+from django.urls import reverse
+from django.utils.html import strip_tags
+
+RENDERER_VERSION = 2
+EXCERPT_LENGTH = 300
+ELLIPSIS = '…'
+
+CODE_SPAN = re.compile(r'`([^`\n]+)`')
+LINK = re.compile(r'\[([^\]\n]+)\]\(((?:https?://|mailto:)[^)\s]+)\)')
+TAG = re.compile(r'(?<![\w&#/])#(\w{1,64})')
+MENTION = re.compile(r'(?<![\w@/])@([\w.+-]{1,150})')
+BOLD = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*')
+ITALIC = re.compile(r'(?<![\w*])([*_])(?=[^\s*_])(.+?)(?<=[^\s*_])\1(?![\w*])')
+HEADING = re.compile(r'(#{1,3}) +(.*)')
+BULLET = re.compile(r'[-*] +(.*)')
+NUMBERED = re.compile(r'\d{1,9}[.)] +(.*)')
+PLACEHOLDER = '\x00{}\x00'
+BLOCK_END = re.compile(r'<(?:br|/p|/li|/h\d|/pre|/blockquote)>')
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Начало текста для лент, обрезанное по границе слова."""
+    text = ' '.join(text.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut.rstrip('.,;:!?-—–') + ELLIPSIS
+
+
+def extract_tags(text):
+    return {name.lower() for name in TAG.findall(text)}
+
+
+def extract_mentions(text):
+    # Точка в конце — обычно конец предложения, а не часть имени.
+    return {name.rstrip('.') for name in MENTION.findall(text)} - {''}
+
+
+def plain_text(rendered):
+    """Текст без разметки — из него делается отрывок."""
+    return html.unescape(strip_tags(BLOCK_END.sub(' ', rendered)))
+
+
+def render_inline(escaped):
+    """Строчная разметка в уже экранированном тексте."""
+    stash = []
+
+    def keep(html_fragment):
+        # Готовый HTML прячется за меткой, чтобы следующие правила
+        # не трогали ни его текст, ни атрибуты.
+        stash.append(html_fragment)
+        return PLACEHOLDER.format(len(stash) - 1)
+
+    def link_tag(match):
+        url = reverse('posts:tag', args=(match.group(1).lower(),))
+        return keep(f'<a href="{url}">#{match.group(1)}</a>')
+
+    def link_mention(match):
+        username = match.group(1).rstrip('.')
+        if not username:
+            return match.group(0)
+        url = reverse('posts:profile', args=(username,))
+        return keep(
+            f'<a href="{url}">@{username}</a>'
+            + match.group(1)[len(username):]
+        )
+
+    escaped = CODE_SPAN.sub(
+        lambda match: keep(f'<code>{match.group(1)}</code>'), escaped
+    )
+    escaped = LINK.sub(
+        lambda match: keep(
+            f'<a href="{match.group(2)}" rel="nofollow noopener" '
+            f'target="_blank">{match.group(1)}</a>'
+        ),
+        escaped
+    )
+    escaped = TAG.sub(link_tag, escaped)
+    escaped = MENTION.sub(link_mention, escaped)
+    escaped = BOLD.sub(r'<strong>\1</strong>', escaped)
+    escaped = ITALIC.sub(r'<em>\2</em>', escaped)
+    return re.sub(
+        '\x00(\\d+)\x00', lambda match: stash[int(match.group(1))], escaped
+    )
+
+
+def _list_block(lines, pattern, tag):
+    items = ''.join(
+        f'<li>{render_inline(pattern.fullmatch(line).group(1))}</li>'
+        for line in lines
+    )
+    return f'<{tag}>{items}</{tag}>'
+
+
+def _render_block(lines):
+    if all(BULLET.fullmatch(line) for line in lines):
+        return _list_block(lines, BULLET, 'ul')
+    if all(NUMBERED.fullmatch(line) for line in lines):
+        return _list_block(lines, NUMBERED, 'ol')
+    if all(line.startswith('&gt;') for line in lines):
+        quoted = [line[len('&gt;'):].lstrip() for line in lines]
+        return f'<blockquote>{_render_paragraph(quoted)}</blockquote>'
+    heading = HEADING.fullmatch(lines[0])
+    if heading is not None:
+        # Заголовки постов начинаются с h3: выше — заголовки страницы.
+        level = len(heading.group(1)) + 2
+        title = f'<h{level}>{render_inline(heading.group(2))}</h{level}>'
+        if len(lines) == 1:
+            return title
+        return title + _render_block(lines[1:])
+    return _render_paragraph(lines)
+
+
+def _render_paragraph(lines):
+    return '<p>{}</p>'.format('<br>'.join(
+        render_inline(line) for line in lines
+    ))
+
+
+def render_markup(text):
+    """Превращает текст с разметкой в безопасный HTML."""
+    escaped = html.escape(text.replace('\r\n', '\n').replace('\x00', ''))
+    blocks = []
+    lines = []
+    code = None
+    for line in escaped.split('\n'):
+        if code is not None:
+            if line.strip() == '```':
+                blocks.append('<pre><code>{}</code></pre>'.format(
+                    '\n'.join(code)
+                ))
+                code = None
+            else:
+                code.append(line)
+            continue
+        if line.strip().startswith('```'):
+            if lines:
+                blocks.append(_render_block(lines))
+                lines = []
+            code = []
+        elif line.strip():
+            lines.append(line.strip())
+        elif lines:
+            blocks.append(_render_block(lines))
+            lines = []
+    if code is not None:
+        blocks.append('<pre><code>{}</code></pre>'.format('\n'.join(code)))
+    if lines:
+        blocks.append(_render_block(lines))
+    return '\n'.join(blocks)
+
+
+def refresh_rendered(objects):
+    """Перерисовывает объекты со старой версией HTML и сохраняет их."""
+    stale = [obj for obj in objects if obj.text_renderer != RENDERER_VERSION]
+    for obj in stale:
+        obj.render_text()
+    if stale:
+        type(stale[0]).objects.bulk_update(stale, stale[0].RENDERED_FIELDS)
+    return objects
+
+
+def render_stale(model, batch_size=500):
+    """Перерисовывает все устаревшие строки модели; возвращает их число."""
+    rendered = 0
+    last_pk = 0
+    while True:
+        batch = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only(
+            'pk', 'text', 'text_renderer'
+        )[:batch_size])
+        if not batch:
+            return rendered
+        last_pk = batch[-1].pk
+        stale = [obj for obj in batch if obj.text_renderer != RENDERER_VERSION]
+        refresh_rendered(stale)
+        rendered += len(stale)
@@ -0,0 +1,97 @@
+"""Рейтинг популярных постов и групп с затуханием по времени.
+
+Каждое событие (комментарий, просмотры, новый пост в группе) весом `w`
+в момент `t` добавляет к рейтингу `w * 2 ** ((t - EPOCH) / HALF_LIFE)`.
+Слагаемое растёт вдвое за каждый период полураспада, поэтому старые
+события относительно теряют вес, а порядок строк не меняется со
+временем — пересчитывать таблицу по часам не нужно. Чтобы числа не
+переполнялись, хранится двоичный логарифм суммы.
+"""
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import GroupScore, PostScore
+
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+
+def log_weight(weight, when):
+    elapsed = (when - EPOCH).total_seconds()
+    return math.log2(weight) + elapsed / settings.TRENDING_HALF_LIFE
+
+
+def log_add(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def current_score(score, now=None):
+    """Переводит хранимое значение в «вес на текущий момент»."""
+    return 2 ** (score - log_weight(1, now or timezone.now()))
+
+
+def bump_many(model, weights, when=None):
+    """Прибавляет события к рейтингам: `weights` — {pk: вес}.
+
+    Два запроса на выборку и запись, сколько бы строк ни менялось.
+    """
+    when = when or timezone.now()
+    try:
+        _bump_many(model, weights, when)
+    except IntegrityError:
+        # Строку рейтинга одновременно создал другой процесс.
+        _bump_many(model, weights, when)
+
+
+def _bump_many(model, weights, when):
+    with transaction.atomic():
+        existing = model.objects.select_for_update().in_bulk(list(weights))
+        missing = set(weights) - set(existing)
+        if missing:
+            # Пост или группу могли удалить, пока событие шло до нас.
+            missing = set(model._meta.pk.related_model.objects.filter(
+                pk__in=missing
+            ).values_list('pk', flat=True))
+        created = []
+        for pk, weight in weights.items():
+            added = log_weight(weight, when)
+            if pk in existing:
+                existing[pk].score = log_add(existing[pk].score, added)
+            elif pk in missing:
+                created.append(model(pk=pk, score=added))
+        model.objects.bulk_update(existing.values(), ['score'])
+        model.objects.bulk_create(created)
+
+
+def record_comment(comment):
+    bump_many(
+        PostScore,
+        {comment.post_id: settings.TRENDING_COMMENT_WEIGHT},
+        comment.created
+    )
+
+
+def record_views(counts):
+    bump_many(PostScore, {
+        post_id: count * settings.TRENDING_VIEW_WEIGHT
+        for post_id, count in counts.items()
+    })
+
+
+def record_post(post):
+    if post.group_id:
+        bump_many(GroupScore, {post.group_id: 1}, post.pub_date)
+
+
+def fold_events(events):
+    """Сворачивает поток (pk, вес, время) в {pk: рейтинг}."""
+    scores = {}
+    for pk, weight, when in events:
+        added = log_weight(weight, when)
+        scores[pk] = log_add(scores[pk], added) if pk in scores else added
+    return scores
@@ -6,15 +6,45 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('sitemap.xml', views.sitemap_index, name='sitemap'),
+    path(
+        'sitemaps/<str:name>', views.sitemap_chunk, name='sitemap_chunk'
+    ),
+    path('trending/', views.trending, name='trending'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/export/',
+        views.export_group,
+        name='export_group'
+    ),
+    path('tag/<str:name>/', views.tag_posts, name='tag'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/followers/',
+        views.followers,
+        name='followers'
+    ),
+    path(
+        'profile/<str:username>/following/',
+        views.following,
+        name='following'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/react/<str:kind>/',
+        views.react,
+        name='react'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('live/', views.live_events, name='live'),
+    path('ready/', views.ready, name='ready'),
+    path('notifications/', views.notifications, name='notifications'),
+    path('export/', views.export_content, name='export'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -25,4 +55,18 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('fragments/feed/', views.index_fragment, name='index_fragment'),
+    path(
+        'fragments/group/<slug:slug>/',
+        views.group_fragment,
+        name='group_fragment'
+    ),
+    path(
+        'fragments/profile/<str:username>/',
+        views.profile_fragment,
+        name='profile_fragment'
+    ),
+    path(
+        'fragments/follow/', views.follow_fragment, name='follow_fragment'
+    ),
 ]
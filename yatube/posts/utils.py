@@ -1,10 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
 from django.core.paginator import Paginator
+from django.db.models import Q
+
+from .follows import following_states
+from .models import FollowSuggestion, Post
+from .reactions import attach_reactions
 
 
 MAX_NUM_OF_POSTS = 10
+MAX_NUM_OF_SUGGESTIONS = 5
+# Порядок лент; от него зависят и страницы, и продолжение по курсору.
+FEED_ORDERING = ('-pub_date', '-pk')
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def feed_posts(posts):
+    """Порядок и связи, общие для страниц лент и их фрагментов."""
+    return posts.for_list().select_related(
+        'author', 'group'
+    ).order_by(*FEED_ORDERING)
+
+
+def index_feed():
+    return feed_posts(Post.objects.visible().hot())
+
+
+def group_feed(group):
+    return feed_posts(group.posts.visible().hot())
+
+
+def profile_feed(author):
+    return feed_posts(author.posts.all())
+
+
+def follow_feed(user):
+    return feed_posts(Post.objects.visible().hot().filter(
+        author__following__user=user
+    ))
 
 
 def paginator_obj(request, posts):
     paginator = Paginator(posts, MAX_NUM_OF_POSTS)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def posts_page(request, posts):
+    """Страница ленты со счётчиками реакций, прочитанными одним запросом.
+
+    Для лент в порядке `FEED_ORDERING` `page_obj.next_token` — курсор,
+    с которого фрагмент ленты продолжит страницу без OFFSET.
+    """
+    page_obj = paginator_obj(request, posts)
+    page_obj.object_list = attach_reactions(page_obj.object_list)
+    page_obj.next_token = (
+        feed_token(page_obj.object_list[-1]) if page_obj.has_next() else None
+    )
+    return page_obj
+
+
+def feed_token(post):
+    """Курсор ленты: время публикации в микросекундах и pk поста."""
+    micros = (post.pub_date - EPOCH) // timedelta(microseconds=1)
+    return f'{micros}.{post.pk}'
+
+
+def parse_feed_token(token):
+    micros, _, pk = (token or '').partition('.')
+    if not (micros.isdigit() and pk.isdigit()):
+        return None
+    return EPOCH + timedelta(microseconds=int(micros)), int(pk)
+
+
+def feed_page(request, posts, size=MAX_NUM_OF_POSTS):
+    """Следующая порция ленты после `?after=<курсор>` и курсор за ней.
+
+    Продолжение ищется по индексу на `pub_date`, поэтому порция стоит
+    одинаково на любой глубине ленты.
+    """
+    cursor = parse_feed_token(request.GET.get('after'))
+    if cursor is not None:
+        pub_date, pk = cursor
+        posts = posts.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )
+    items = list(posts.order_by(*FEED_ORDERING)[:size + 1])
+    next_token = feed_token(items[size - 1]) if len(items) > size else None
+    return attach_reactions(items[:size]), next_token
+
+
+def suggestions_for(user):
+    if not user.is_authenticated:
+        return []
+    # Часть рекомендаций может оказаться уже подписками: берём с запасом
+    # и отсеиваем их в памяти по кэшу подписок.
+    suggestions = list(FollowSuggestion.objects.filter(
+        user=user, author__is_active=True
+    ).select_related('author')[:MAX_NUM_OF_SUGGESTIONS * 2])
+    followed = following_states(user, [s.author_id for s in suggestions])
+    return [
+        suggestion for suggestion in suggestions
+        if suggestion.author_id not in followed
+    ][:MAX_NUM_OF_SUGGESTIONS]
+
+
+def cursor_page(request, queryset, size=MAX_NUM_OF_POSTS):
+    """Страница по курсору: `?after=<pk>` вместо номера страницы.
+
+    `queryset` должен быть упорядочен по убыванию pk. Возвращает записи
+    страницы и курсор следующей (или None).
+    """
+    after = request.GET.get('after')
+    if after and after.isdigit():
+        queryset = queryset.filter(pk__lt=int(after))
+    items = list(queryset[:size + 1])
+    next_cursor = items[size - 1].pk if len(items) > size else None
+    return items[:size], next_cursor
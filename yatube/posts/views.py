@@ -1,29 +1,73 @@
+import os
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.http import (FileResponse, Http404, HttpResponseBadRequest,
+                         JsonResponse, StreamingHttpResponse)
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-from .models import Post, Group, User, Follow
+from core.jobs import enqueue
+from core.ratelimit import rate_limit
+from .caching import anonymous_cache_page, private_response
+from .counters import counts_views
+from .export import FORMATS, export_stream, group_content, user_content
+from .live import channel, live_url, stream, total
+from .follows import (followers_count, following_count, following_states,
+                      is_following)
+from .models import (Post, Group, User, Follow, PostScore, GroupScore, Tag,
+                     Reaction)
+from .notifications import mark_read
+from .reactions import attach_reactions, toggle_reaction, user_reactions
+from . import warmup
+from .sitemaps import INDEX_NAME, chunk_file
 from .forms import PostForm, CommentForm
-from .utils import paginator_obj
+from .tags import tag_feed
+from .tasks import generate_thumbnails
+from .text import refresh_rendered
+from .utils import (cursor_page, feed_page, follow_feed, group_feed,
+                    index_feed, paginator_obj, posts_page, profile_feed,
+                    suggestions_for)
+
+
+def feed_fragment(request, posts):
+    """Следующая порция карточек ленты без обвязки страницы.
+
+    Курсор продолжения отдаётся в заголовке `X-Next-Cursor`; его нет,
+    если лента закончилась.
+    """
+    items, next_token = feed_page(request, posts)
+    response = render(
+        request,
+        'posts/includes/post_cards.html',
+        {'posts': items, 'continued': True},
+    )
+    if next_token:
+        response['X-Next-Cursor'] = next_token
+    return response
 
 
-@cache_page(20)
+@anonymous_cache_page('index')
 def index(request):
-    posts = Post.objects.order_by('-pub_date')
-    page_obj = paginator_obj(request, posts)
+    posts = index_feed()
+    page_obj = posts_page(request, posts)
     template = 'posts/index.html'
     title = "Последние обновления на сайте"
     context = {
         'title': title,
         'posts': posts,
         'page_obj': page_obj,
+        'live_url': live_url('index', request.user),
     }
     return render(request, template, context)
 
 
+@anonymous_cache_page('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = paginator_obj(request, posts)
+    posts = group_feed(group)
+    page_obj = posts_page(request, posts)
     template = 'posts/group_list.html'
     title = "Записи сообщества"
     context = {
@@ -34,42 +78,86 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@anonymous_cache_page()
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    page_obj = posts_page(request, tag_feed(tag))
+    template = 'posts/tag.html'
+    context = {
+        'title': f'Записи с тегом #{tag.name}',
+        'tag': tag,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@anonymous_cache_page('profile:{username}')
 def profile(request, username):
-    user_author = get_object_or_404(User, username=username)
+    user_author = get_object_or_404(
+        User, username=username, is_active=True
+    )
     template = 'posts/profile.html'
-    posts = user_author.posts.all()
+    posts = profile_feed(user_author)
     user_number = posts.count()
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=user_author
-    ).exists()
-    page_obj = paginator_obj(request, posts)
+    following = is_following(request.user, user_author.pk)
+    page_obj = posts_page(request, posts)
     context = {
         'author': user_author,
         'page_obj': page_obj,
         'user_number': user_number,
         'following': following,
+        'followers_count': followers_count(user_author.pk),
+        'following_count': following_count(user_author.pk),
+        'suggestions': suggestions_for(request.user),
     }
     return render(request, template, context)
 
 
+@counts_views
+@anonymous_cache_page('post:{post_id}')
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
+    refresh_rendered([post])
     user_number = Post.objects.select_related('author').filter(
         author=post.author).count()
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = refresh_rendered(list(
+        post.comments.filter(author__is_active=True).select_related('author')
+    ))
+    attach_reactions([post])
     context = {
         'post': post,
         'user_number': user_number,
         'form': form,
         'comments': comments,
+        'my_reactions': user_reactions(request.user, post.pk),
+        'live_url': live_url('post', request.user, post.pk),
+    }
+    return render(request, template, context)
+
+
+@anonymous_cache_page()
+def trending(request):
+    template = 'posts/trending.html'
+    scores = PostScore.objects.select_related(
+        'post__author', 'post__group'
+    ).defer('post__text').filter(
+        post__author__is_active=True
+    ).order_by('-score')[:settings.TRENDING_SIZE]
+    group_scores = GroupScore.objects.select_related(
+        'group'
+    ).order_by('-score')[:settings.TRENDING_SIZE]
+    context = {
+        'title': 'Популярное',
+        'posts': [score.post for score in scores],
+        'groups': [score.group for score in group_scores],
     }
     return render(request, template, context)
 
 
 @login_required
+@rate_limit('post')
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -77,6 +165,8 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            enqueue(generate_thumbnails, args=(post.pk,))
         return redirect('posts:profile', post.author.username)
     context = {
         'form': form,
@@ -100,6 +190,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data and post.image:
+            enqueue(generate_thumbnails, args=(post.pk,))
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -111,6 +203,15 @@ def post_edit(request, post_id):
 
 
 @login_required
+def react(request, post_id, kind):
+    post = get_object_or_404(Post.objects.visible(), pk=post_id)
+    if request.method == 'POST' and kind in dict(Reaction.KINDS):
+        toggle_reaction(request.user, post.pk, kind)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@rate_limit('comment')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
@@ -125,15 +226,117 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_obj(request, posts)
+    posts = follow_feed(request.user)
+    page_obj = posts_page(request, posts)
     context = {
         'page_obj': page_obj,
+        'suggestions': suggestions_for(request.user),
+        'live_url': live_url('follow', request.user),
     }
     return render(request, template, context)
 
 
+@anonymous_cache_page('index')
+def index_fragment(request):
+    return feed_fragment(request, index_feed())
+
+
+@anonymous_cache_page('group:{slug}')
+def group_fragment(request, slug):
+    return feed_fragment(
+        request, group_feed(get_object_or_404(Group, slug=slug))
+    )
+
+
+@anonymous_cache_page('profile:{username}')
+def profile_fragment(request, username):
+    author = get_object_or_404(User, username=username, is_active=True)
+    return feed_fragment(request, profile_feed(author))
+
+
+@login_required
+def follow_fragment(request):
+    return private_response(
+        feed_fragment(request, follow_feed(request.user))
+    )
+
+
+def live_events(request):
+    """Поток Server-Sent Events о новых постах ленты или комментариях."""
+    post_id = request.GET.get('post', '')
+    found = channel(
+        request.GET.get('feed'),
+        request.user,
+        int(post_id) if post_id.isdigit() else None,
+    )
+    if found is None:
+        return HttpResponseBadRequest()
+    event, keys = found
+    since = request.GET.get('since', '')
+    response = StreamingHttpResponse(
+        stream(event, keys, int(since) if since.isdigit() else total(keys)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Не даём nginx копить события в буфере.
+    response['X-Accel-Buffering'] = 'no'
+    # Поток читает только кэш, а соединение с базой (сессия, подписки)
+    # иначе оставалось бы занятым до конца потока.
+    connection.close()
+    return response
+
+
 @login_required
+def notifications(request):
+    template = 'posts/notifications.html'
+    items = request.user.notifications.select_related(
+        'actor', 'post'
+    ).defer('post__text')
+    page_obj = paginator_obj(request, items)
+    unread = [item.pk for item in page_obj if not item.is_read]
+    response = render(request, template, {'page_obj': page_obj})
+    mark_read(request.user.pk, unread)
+    return response
+
+
+def follow_list(request, username, followers):
+    author = get_object_or_404(User, username=username)
+    if followers:
+        follows = author.following.filter(
+            user__is_active=True
+        ).select_related('user')
+        title = f'Подписчики {author.username}'
+    else:
+        follows = author.follower.filter(
+            author__is_active=True
+        ).select_related('author')
+        title = f'Подписки {author.username}'
+    items, next_cursor = cursor_page(request, follows.order_by('-pk'))
+    people = [
+        follow.user if followers else follow.author for follow in items
+    ]
+    context = {
+        'title': title,
+        'author': author,
+        'people': people,
+        'followed': following_states(
+            request.user, [person.pk for person in people]
+        ),
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def followers(request, username):
+    return follow_list(request, username, followers=True)
+
+
+def following(request, username):
+    return follow_list(request, username, followers=False)
+
+
+@login_required
+@rate_limit('follow', methods=None)
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
@@ -152,3 +355,69 @@ def profile_unfollow(request, username):
         author=get_object_or_404(User, username=username)
     ).delete()
     return redirect('posts:profile', username)
+
+
+def export_response(request, posts, comments, name):
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest(f'Неизвестный формат {fmt}')
+    stream, content_type, extension = export_stream(
+        posts, comments, fmt, images=request.GET.get('images') == '1'
+    )
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}.{extension}"'
+    )
+    return private_response(response)
+
+
+@login_required
+@rate_limit('export', methods=None)
+def export_content(request):
+    posts, comments = user_content(request.user)
+    return export_response(
+        request, posts, comments, f'yatube-{request.user.username}'
+    )
+
+
+@staff_member_required
+def export_group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    posts, comments = group_content(group)
+    return export_response(
+        request, posts, comments, f'yatube-group-{group.slug}'
+    )
+
+
+SITEMAP_CHUNK_RE = re.compile(r'(posts|profiles|groups)-\d+\.xml')
+
+
+def sitemap_response(name):
+    filename = chunk_file(name)
+    if not os.path.exists(filename):
+        raise Http404
+    return FileResponse(open(filename, 'rb'), content_type='application/xml')
+
+
+def sitemap_index(request):
+    """Отдаёт индекс карты сайта, собранный командой build_sitemaps."""
+    return sitemap_response(INDEX_NAME)
+
+
+def sitemap_chunk(request, name):
+    if not SITEMAP_CHUNK_RE.fullmatch(name):
+        raise Http404
+    return sitemap_response(name)
+
+
+def ready(request):
+    """Проба готовности: 503, пока этот процесс не прогрел кэш.
+
+    Отвечает только за процесс, которому достался запрос; если прогрев
+    в нём ещё не запускался, запускает его в фоновом потоке.
+    """
+    warmup.ensure_warmup()
+    state = dict(warmup.STATE)
+    return private_response(JsonResponse(
+        state, status=200 if state['state'] == 'ready' else 503
+    ))
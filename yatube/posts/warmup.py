@@ -0,0 +1,193 @@
+"""Прогрев кэша страниц и миниатюр после выкладки или перезапуска.
+
+Горячие страницы — первые `WARMUP_INDEX_PAGES` страниц главной, первые
+страницы `WARMUP_TOP_GROUPS` групп и `WARMUP_TOP_AUTHORS` авторов —
+отрисовываются для анонимного посетителя через обычные представления,
+так что ответы ложатся в кэш страниц под теми же ключами, что и у
+настоящих запросов. Ключ зависит от адреса сайта, поэтому `SITE_URL`
+должен совпадать с публичным адресом. Миниатюры картинок с этих страниц
+создаются заранее. Страницы и миниатюры обрабатываются параллельно
+в `WARMUP_WORKERS` потоках.
+
+Страницы живут в кэше всего `PAGE_CACHE_TIMEOUT` секунд и пропадают
+раньше, если в их области что-то изменилось: главная — при первой же
+новой записи. Поэтому прогрев страниц только сглаживает первые секунды
+после запуска; основная польза — миниатюры на диске, которые иначе
+создавал бы первый посетитель каждой страницы.
+
+LocMemCache у каждого процесса свой, поэтому прогревать его нужно
+изнутри процесса: при `WARMUP_ON_START` каждый воркер WSGI-сервера
+запускает прогрев в фоновом потоке при загрузке `yatube.wsgi`. Проба
+готовности `/ready/` отвечает 503, пока не прогрет процесс, которому
+достался запрос, — про остальные воркеры она ничего не знает. Все
+воркеры начинают прогрев одновременно и заканчивают примерно вместе,
+но строгая проба получается только с одним воркером на экземпляр.
+Команда `warm_caches` выполняет тот же прогрев в своём процессе: это
+полезно для миниатюр на диске.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Sum
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from .caching import anonymous_request
+from .models import Group, User
+from .tasks import THUMBNAIL_GEOMETRY, THUMBNAIL_OPTIONS
+from .utils import MAX_NUM_OF_POSTS, group_feed, index_feed, profile_feed
+
+MAX_ERRORS = 20
+
+STATE = {'state': 'cold'}
+_lock = threading.Lock()
+
+
+def top_groups(limit):
+    """Группы по «Популярному», а если их мало — по числу постов."""
+    groups = list(Group.objects.filter(
+        score__isnull=False
+    ).order_by('-score__score')[:limit])
+    if len(groups) < limit:
+        groups += Group.objects.exclude(
+            pk__in=[group.pk for group in groups]
+        ).annotate(
+            posts_count=Count('posts')
+        ).filter(posts_count__gt=0).order_by(
+            '-posts_count'
+        )[:limit - len(groups)]
+    return groups
+
+
+def top_authors(limit):
+    """Активные авторы по просмотрам их постов и числу постов."""
+    return list(User.objects.filter(is_active=True).annotate(
+        posts_count=Count('posts'), posts_views=Sum('posts__views')
+    ).filter(posts_count__gt=0).order_by(
+        '-posts_views', '-posts_count'
+    )[:limit])
+
+
+def hot_pages():
+    """Горячие страницы и посты на них: [(путь, параметры, посты)]."""
+    pages = []
+    index = reverse('posts:index')
+    for number in range(1, settings.WARMUP_INDEX_PAGES + 1):
+        offset = (number - 1) * MAX_NUM_OF_POSTS
+        pages.append((
+            index,
+            {'page': number} if number > 1 else {},
+            index_feed()[offset:offset + MAX_NUM_OF_POSTS],
+        ))
+    for group in top_groups(settings.WARMUP_TOP_GROUPS):
+        pages.append((
+            reverse('posts:group_list', args=(group.slug,)),
+            {},
+            group_feed(group)[:MAX_NUM_OF_POSTS],
+        ))
+    for author in top_authors(settings.WARMUP_TOP_AUTHORS):
+        pages.append((
+            reverse('posts:profile', args=(author.username,)),
+            {},
+            profile_feed(author)[:MAX_NUM_OF_POSTS],
+        ))
+    return pages
+
+
+def render_page(path, params):
+    """Отрисовывает страницу как для анонима с публичного адреса сайта."""
+    request = anonymous_request(path, params)
+    view, args, kwargs = request.resolver_match
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200:
+        raise ValueError(f'ответ {response.status_code}')
+
+
+def make_thumbnail(name):
+    get_thumbnail(name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+
+
+def warm(workers=None):
+    """Прогревает страницы и миниатюры; возвращает сводку."""
+    if workers is None:
+        workers = settings.WARMUP_WORKERS
+    started = time.perf_counter()
+    pages = hot_pages()
+    images = sorted({
+        name
+        for _, _, posts in pages
+        for name in posts.values_list('image', flat=True)
+        if name
+    })
+    tasks = [
+        (f'{path}?page={params["page"]}' if params else path,
+         render_page, (path, params))
+        for path, params, _ in pages
+    ] + [(name, make_thumbnail, (name,)) for name in images]
+    errors = []
+
+    def run(task):
+        label, func, args = task
+        try:
+            func(*args)
+        except Exception as exc:
+            errors.append(f'{label}: {exc!r}')
+        finally:
+            if workers > 1:
+                # У каждого потока своё соединение с базой.
+                connection.close()
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(run, tasks))
+    else:
+        for task in tasks:
+            run(task)
+    return {
+        'pages': len(pages),
+        'thumbnails': len(images),
+        'errors': errors[:MAX_ERRORS],
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def run_warmup(workers=None):
+    STATE.update(state='warming')
+    try:
+        result = warm(workers)
+    except Exception as exc:
+        # Прогрев не должен навсегда оставить процесс неготовым.
+        result = {
+            'pages': 0, 'thumbnails': 0, 'seconds': 0,
+            'errors': [repr(exc)],
+        }
+    STATE.update(state='ready', **result)
+    return STATE
+
+
+def _run_in_background():
+    try:
+        run_warmup()
+    finally:
+        connection.close()
+
+
+def ensure_warmup():
+    """Запускает прогрев в фоне, если этот процесс ещё не прогревался.
+
+    Состояние, унаследованное через fork от родителя (gunicorn
+    --preload), не считается: поток прогрева в дочерний процесс не
+    переходит.
+    """
+    with _lock:
+        if STATE['state'] != 'cold' and STATE.get('pid') == os.getpid():
+            return
+        STATE.clear()
+        STATE.update(state='warming', pid=os.getpid())
+    threading.Thread(target=_run_in_background, daemon=True).start()
@@ -0,0 +1,13 @@
+from django.core.mail import EmailMultiAlternatives
+
+from core.jobs import task
+
+
+@task
+def send_email(subject, body, from_email, recipient_list, html_body=None):
+    message = EmailMultiAlternatives(
+        subject, body, from_email, recipient_list
+    )
+    if html_body is not None:
+        message.attach_alternative(html_body, 'text/html')
+    message.send()
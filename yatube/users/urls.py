@@ -1,7 +1,9 @@
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import (LoginView, LogoutView,
+                                       PasswordResetView)
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 
 app_name = 'users'
@@ -18,4 +20,9 @@ urlpatterns = [
         LoginView.as_view(template_name='users/login.html'),
         name='login'
     ),
+    path(
+        'password_reset/',
+        PasswordResetView.as_view(form_class=QueuedPasswordResetForm),
+        name='password_reset'
+    ),
 ]
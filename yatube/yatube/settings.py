@@ -80,6 +80,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.notifications',
             ]
         },
     }
@@ -145,9 +146,148 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
+# Картинки моложе стольких секунд не удаляются вместе с постами: такую
+# же могли только что загрузить для нового поста (posts.media).
+IMAGE_DELETE_MIN_AGE = 5 * 60
+
+# 'default' — память процесса: кэш страниц и прочее, что можно потерять.
+# 'shared' — кэш, общий для всех процессов сайта и воркера задач: лимиты
+# частоты, счётчики живых уведомлений, версия кэша страниц. В продакшене
+# это memcached (MEMCACHED_LOCATION=127.0.0.1:11211, можно несколько
+# через запятую); без него — таблица в базе (создаётся миграцией core):
+# она тоже общая, но каждое обращение к ней — запрос к базе.
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': MEMCACHED_LOCATION.split(','),
+    } if MEMCACHED_LOCATION else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
+}
+
+# Время жизни страниц, закэшированных для анонимных посетителей, кэш
+# самих страниц и кэш с версиями их ключей (общий: их сдвигает и
+# воркер задач).
+PAGE_CACHE_TIMEOUT = 20
+PAGE_CACHE = 'default'
+PAGE_CACHE_VERSION_CACHE = 'shared'
+
+# Статические снимки горячих страниц для отдачи через nginx.
+SNAPSHOTS_ENABLED = False
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, 'snapshots')
+SNAPSHOT_DEBOUNCE = 5
+SNAPSHOT_TOP_GROUPS = 10
+SNAPSHOT_TOP_AUTHORS = 10
+SNAPSHOT_TOP_POSTS = 20
+
+# Прогрев кэша после выкладки (posts.warmup, команда warm_caches):
+# прогревать ли каждый процесс сервера при запуске, сколько страниц
+# главной, групп и авторов отрисовать и в скольких потоках.
+WARMUP_ON_START = True
+WARMUP_INDEX_PAGES = 3
+WARMUP_TOP_GROUPS = 10
+WARMUP_TOP_AUTHORS = 10
+WARMUP_WORKERS = 4
+
+# Карта сайта (команда build_sitemaps): адресов в одном файле
+# и как часто пересобирать изменившиеся куски в фоне.
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_CHUNK_SIZE = 50000
+SITEMAP_REFRESH_INTERVAL = 60 * 60
+
+# Фоновые задачи (core.jobs).
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_DELAY = 10
+JOB_RETRY_MAX_DELAY = 60 * 60
+# Выполняемая задача раз в JOB_HEARTBEAT_INTERVAL секунд отмечается в
+# базе; без отметки дольше JOB_LOCK_TIMEOUT её обработчик считается
+# умершим, и задача возвращается в очередь.
+JOB_HEARTBEAT_INTERVAL = 30
+JOB_LOCK_TIMEOUT = 5 * 60
+
+# Буфер просмотров постов: сколько постов или секунд копить до записи.
+VIEW_COUNTER_FLUSH_SIZE = 200
+VIEW_COUNTER_FLUSH_INTERVAL = 30
+
+# «Популярное»: период полураспада рейтинга в секундах и веса событий.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_COMMENT_WEIGHT = 5
+TRENDING_VIEW_WEIGHT = 1
+TRENDING_SIZE = 20
+
+# Рекомендации «на кого подписаться» (команда compute_suggestions).
+SUGGESTION_COUNT = 10
+SUGGESTION_FOLLOW_WEIGHT = 1
+SUGGESTION_GROUP_WEIGHT = 0.5
+SUGGESTION_FANOUT_LIMIT = 1000
+
+# Живые уведомления (posts.live): кэш со счётчиками изменений (должен
+# быть общим для всех процессов), как часто поток читает счётчики,
+# через сколько секунд тишины шлёт пинг и закрывает соединение.
+LIVE_CACHE = 'shared'
+LIVE_POLL_INTERVAL = 2
+LIVE_HEARTBEAT = 15
+LIVE_STREAM_TIMEOUT = 60
+LIVE_COUNTER_TIMEOUT = 7 * 24 * 60 * 60
+
+# Кэш подписок пользователей и сколько секунд его хранить: изменения
+# в обход сигналов (массовые) видны не позже чем через это время.
+FOLLOW_CACHE = 'shared'
+FOLLOW_CACHE_TIMEOUT = 60
+
+# Удаление пользователей: строк в одной пачке и пачек на одну задачу.
+PURGE_BATCH_SIZE = 500
+PURGE_STEPS_PER_JOB = 20
+
+# Архив: посты старше стольких дней уходят из лент (команда archive_posts).
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 1000
+
+# Уведомления: подписчиков в одной пачке, кэш счётчика непрочитанных
+# и время его жизни (столько видны каскадные удаления в обход сброса),
+# параметры ежедневного дайджеста (команда send_digests).
+NOTIFY_BATCH_SIZE = 1000
+NOTIFICATION_CACHE = 'shared'
+UNREAD_CACHE_TIMEOUT = 5 * 60
+DIGEST_BATCH_SIZE = 500
+DIGEST_MAX_ITEMS = 20
+# Адрес сайта для ссылок в письмах.
+SITE_URL = 'http://localhost:8000'
+
+# Реакции копятся в общем кэше и через REACTION_FLUSH_DELAY секунд
+# переносятся в счётчики постов (posts.reactions). Буфер имеет смысл
+# только с memcached: кэш в таблице базы — такая же запись в базу.
+REACTION_BUFFER = bool(MEMCACHED_LOCATION)
+REACTION_CACHE = 'shared'
+REACTION_FLUSH_DELAY = 10
+
+# Ограничение частоты записей (core.ratelimit): «число/период» на
+# пользователя и на IP-адрес, период — s, m, h или d.
+RATE_LIMITS = {
+    'comment': {'user': '10/m', 'ip': '30/m'},
+    'post': {'user': '5/m', 'ip': '20/m'},
+    'follow': {'user': '30/m', 'ip': '60/m'},
+    'signup': {'ip': '5/h'},
+    'export': {'user': '5/h'},
 }
+RATE_LIMIT_CACHE = 'shared'
+# Откуда брать адрес клиента; за nginx — 'HTTP_X_REAL_IP'.
+RATE_LIMIT_IP_HEADER = 'REMOTE_ADDR'
+
+# С какого числа строк админка показывает оценку вместо точного COUNT(*).
+ADMIN_ESTIMATE_THRESHOLD = 100000
+
+# Массовые действия в админке: строк в одной пачке и пачек на одну задачу.
+MODERATION_BATCH_SIZE = 500
+MODERATION_STEPS_PER_JOB = 20
+
+# Выгрузка постов и комментариев: строк, читаемых из базы за раз.
+EXPORT_CHUNK_SIZE = 2000
+
+# Импорт из JSONL (команда import_content): строк одного типа в пачке.
+IMPORT_BATCH_SIZE = 5000
@@ -9,8 +9,16 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.WARMUP_ON_START:
+    # Кэш страниц у каждого процесса свой: каждый воркер сервера
+    # прогревает себя сам, не дожидаясь пробы /ready/.
+    from posts.warmup import ensure_warmup
+
+    ensure_warmup()